@@ -0,0 +1,534 @@
+# benchmark.py
+# Performance benchmarks. Each run prints one JSON object on stdout so results
+# can be diffed / collected across versions.
+#
+#   python benchmark.py navigation --phones +919640733498,+918143755467 --rounds 5
+#       (needs Chrome + a logged-in WhatsApp Web session)
+#   python benchmark.py intents --iterations 20000 --extra-keywords 0,100,400
+#   python benchmark.py startup send_reminders --runs 5
+#   python benchmark.py replay --rows 10000,100000,1000000 --queries 20000
+
+import argparse
+import datetime
+import json
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+
+# ==========================================================
+#                 STATS HELPERS
+# ==========================================================
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile (pct in 0..100) of an unsorted list.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(seconds: List[float]) -> Dict[str, float]:
+    """
+    Latency summary in milliseconds.
+    """
+    ms = [s * 1000 for s in seconds]
+    return {
+        "n": len(ms),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p90_ms": round(percentile(ms, 90), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "mean_ms": round(statistics.fmean(ms), 3) if ms else 0.0,
+        "max_ms": round(max(ms), 3) if ms else 0.0,
+    }
+
+
+def emit(result: dict):
+    json.dump(result, sys.stdout, ensure_ascii=False)
+    sys.stdout.write("\n")
+    sys.stdout.flush()
+
+
+# ==========================================================
+#                 CHAT NAVIGATION
+# ==========================================================
+def bench_navigation(driver, phones: List[str], rounds: int, strategies=("url", "search", "link")) -> dict:
+    """
+    Time chat switches per strategy. Phones are visited in rotation so every
+    measurement is a real switch; `fallbacks` counts switches where the
+    in-app strategy could not confirm the chat and the URL method was used.
+    """
+    from whatsapp_web import open_chat
+
+    results = {}
+    for strategy in strategies:
+        samples = []
+        fallbacks = 0
+        for _ in range(rounds):
+            for phone in phones:
+                t0 = time.perf_counter()
+                used = open_chat(driver, phone, mode=strategy)
+                samples.append(time.perf_counter() - t0)
+                if used not in (strategy, "current"):
+                    fallbacks += 1
+        results[strategy] = dict(summarize(samples), fallbacks=fallbacks)
+    return {"benchmark": "navigation", "phones": len(phones), "rounds": rounds, "strategies": results}
+
+
+def _cmd_navigation(args):
+    from whatsapp_web import build_driver, wait_for_whatsapp_ready
+
+    phones = [p.strip() for p in args.phones.split(",") if p.strip()]
+    if len(phones) < 2:
+        raise SystemExit("navigation benchmark needs at least 2 phones (so each step switches chats)")
+
+    driver = build_driver()
+    try:
+        driver.get("https://web.whatsapp.com")
+        print("Scan the QR code if asked...", file=sys.stderr)
+        wait_for_whatsapp_ready(driver, timeout=args.login_timeout)
+        emit(bench_navigation(driver, phones, args.rounds, tuple(args.strategies.split(","))))
+    finally:
+        driver.quit()
+
+
+# ==========================================================
+#                 INTENT PARSING
+# ==========================================================
+INTENT_QUERIES = [
+    "next hearing", "hearing", "my next hearing", "case history", "full history",
+    "case 12345", "12345", "status of case 987654 please", "hi", "thank you sir",
+    "when is my hearing", "all hearings", "తదుపరి విచారణ", "केस 4567",
+    "please tell me the next hearing date for my land case as soon as possible",
+]
+
+INTENT_VOICE_KEYWORDS = [
+    "case", "history", "hearing", "next hearing", "all hearings",
+    "full history", "case history", "hearing history",
+    "కేసు", "విచారణ", "చరిత్ర", "केस", "सुनवाई", "इतिहास",
+]
+
+
+def make_legacy_classifier(voice_keywords: List[str], keywords: Optional[Dict[str, List[str]]] = None):
+    """
+    The pre-IntentMatcher chain from search_case + should_send_audio_for_message,
+    given the same keyword lists as the matcher.
+    """
+    import re
+    from intents import INTENT_KEYWORDS
+
+    keywords = keywords or INTENT_KEYWORDS
+    history_keywords = keywords["history"]
+    next_keywords = keywords["next_hearing"]
+
+    def classify(query_text: str):
+        voice = any(k in (query_text or "").lower() for k in voice_keywords)
+        query_text = (query_text or "").lower().strip()
+        m = re.search(r"\b(\d{3,10})\b", query_text)
+        case_id = m.group(1) if m else None
+        if any(k in query_text for k in history_keywords):
+            return "history", case_id, voice
+        if any(k in query_text for k in next_keywords) or query_text.endswith("hearing"):
+            return "next_hearing", case_id, voice
+        return ("case" if case_id else None), case_id, voice
+
+    return classify
+
+
+def _padded_keywords(extra: int, seed: int = 1) -> Dict[str, List[str]]:
+    """
+    INTENT_KEYWORDS plus `extra` random phrases per intent that match none of
+    INTENT_QUERIES (stand-ins for more languages / synonyms).
+    """
+    from intents import INTENT_KEYWORDS
+
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return {
+        intent: list(words) + ["".join(rng.choice(letters) for _ in range(rng.randint(6, 14)))
+                               for _ in range(extra)]
+        for intent, words in INTENT_KEYWORDS.items()
+    }
+
+
+def bench_intents(iterations: int, extra_keywords: int = 0) -> dict:
+    """
+    Per-query cost of the old keyword chain vs the compiled IntentMatcher
+    (same query mix, same keywords). With today's short keyword lists the two
+    are within noise of each other; extra_keywords shows how each scales as
+    the lists grow.
+    """
+    from intents import IntentMatcher
+
+    keywords = _padded_keywords(extra_keywords)
+    matcher = IntentMatcher(keywords=keywords, voice_keywords=INTENT_VOICE_KEYWORDS)
+    legacy_classify = make_legacy_classifier(INTENT_VOICE_KEYWORDS, keywords)
+    candidates = {"legacy_chain": legacy_classify, "intent_matcher": matcher.classify}
+
+    for q in INTENT_QUERIES:
+        if tuple(matcher.classify(q)) != legacy_classify(q):
+            raise AssertionError(f"matcher and chain disagree on {q!r}")
+
+    results = {}
+    for name, fn in candidates.items():
+        samples = []
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            for q in INTENT_QUERIES:
+                fn(q)
+            samples.append((time.perf_counter() - t0) / len(INTENT_QUERIES))
+        s = summarize(samples)
+        s["ns_per_query"] = round(statistics.fmean(samples) * 1e9, 1)
+        results[name] = s
+    return {"benchmark": "intents", "queries": len(INTENT_QUERIES), "iterations": iterations,
+            "keywords": sum(len(v) for v in keywords.values()), "results": results}
+
+
+def _cmd_intents(args):
+    for extra in [int(n) for n in args.extra_keywords.split(",") if n.strip()]:
+        emit(bench_intents(args.iterations, extra))
+
+
+# ==========================================================
+#                 COLD START
+# ==========================================================
+_STARTUP_CHILD = """
+import importlib, json, sys, time
+t0 = time.perf_counter()
+mod = importlib.import_module(sys.argv[1])
+t1 = time.perf_counter()
+if sys.argv[2]:
+    exec(sys.argv[2], {"mod": mod})
+t2 = time.perf_counter()
+try:
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        rss_kb //= 1024
+except ImportError:
+    rss_kb = None
+heavy = sorted(m for m in ("pandas", "numpy", "selenium", "webdriver_manager", "gtts", "pywhatkit", "schedule")
+               if m in sys.modules)
+print(json.dumps({"import_s": t1 - t0, "call_s": t2 - t1, "maxrss_kb": rss_kb, "heavy_modules": heavy}))
+"""
+
+
+def bench_startup(module: str, runs: int, call: str = "") -> dict:
+    """
+    Cold start of `module` in a fresh interpreter per run: whole-process wall
+    time, import time, optional first call (`call`, with the module as `mod`)
+    and peak RSS. `heavy_modules` lists the big dependencies that got loaded.
+    """
+    wall, imports, calls, rss = [], [], [], []
+    heavy: List[str] = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        out = subprocess.run(
+            [sys.executable, "-c", _STARTUP_CHILD, module, call],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        wall.append(time.perf_counter() - t0)
+        child = json.loads(out.strip().splitlines()[-1])
+        imports.append(child["import_s"])
+        calls.append(child["call_s"])
+        if child["maxrss_kb"] is not None:
+            rss.append(child["maxrss_kb"])
+        heavy = child["heavy_modules"]
+    result = {
+        "benchmark": "startup",
+        "module": module,
+        "runs": runs,
+        "process": summarize(wall),
+        "import": summarize(imports),
+        "peak_rss_mb": round(max(rss) / 1024, 1) if rss else None,
+        "heavy_modules": heavy,
+    }
+    if call:
+        result["call"] = call
+        result["first_call"] = summarize(calls)
+    return result
+
+
+def _cmd_startup(args):
+    for module in args.modules:
+        emit(bench_startup(module, args.runs, args.call))
+
+
+# ==========================================================
+#          REPLAY: search_case / reminder planner
+# ==========================================================
+# Synthetic cases.db files are generated from a seed (same seed + rows + day ->
+# same file) and cached in --data-dir. Phones are stored in the mixed formats
+# found in hand-maintained sheets; hearings spread from a year back to six
+# months ahead, most of them within a few weeks of today.
+REPLAY_DATA_DIR = "bench_data"
+REPLAY_HEARINGS_PER_CLIENT = (1, 8)
+REPLAY_FIRST_NAMES = ["Bharath", "Lokesh", "Rajendra", "Lakshmi", "Sravani", "Venkata", "Anjali", "Suresh"]
+
+# Query mix: (weight, kind); "stranger" = message from an unregistered number
+REPLAY_MIX = [
+    (40, "next_hearing"),
+    (20, "history"),
+    (20, "case"),
+    (10, "chatter"),
+    (10, "stranger"),
+]
+
+_REPLAY_TEXTS = {
+    "next_hearing": ["next hearing", "hearing", "when is my next hearing", "తదుపరి విచారణ", "अगली सुनवाई"],
+    "history": ["history", "case history", "all hearings", "చరిత్ర"],
+    "case": ["case {cid}", "{cid}", "status of case {cid} please", "కేసు {cid}"],
+    "chatter": ["hi", "thank you sir", "ok", "good morning"],
+}
+
+
+class ReplayQuery(NamedTuple):
+    text: str
+    phone: str        # sender as extracted from WhatsApp (+<country><number>)
+
+
+def _stored_phone(rng: random.Random, last10: str) -> str:
+    fmt = rng.randrange(5)
+    if fmt == 0:
+        return "+91" + last10
+    if fmt == 1:
+        return "91" + last10
+    if fmt == 2:
+        return last10
+    if fmt == 3:
+        return f"+91 {last10[:5]} {last10[5:]}"
+    return f"0{last10[:5]}-{last10[5:]}"
+
+
+def _hearing_offset(rng: random.Random) -> int:
+    """
+    Days from today: a third in the past year, the rest mostly in the next weeks.
+    """
+    if rng.random() < 0.33:
+        return -rng.randint(1, 365)
+    return min(int(rng.expovariate(1 / 21)), 180)
+
+
+def make_replay_db(path: str, rows: int, seed: int, today: datetime.date) -> dict:
+    """
+    Write a synthetic cases.db with `rows` hearings. Returns what the query
+    generator needs: {"clients": [(last10, [case_id, ...]), ...]}.
+    """
+    from db_setup import ensure_schema
+    from db_pool import open_connection
+
+    rng = random.Random(seed)
+    if os.path.exists(path):
+        os.remove(path)
+    ensure_schema(path)
+    conn = open_connection(path)
+
+    clients = []
+    batch = []
+    made = 0
+    next_case = 100000
+    while made < rows:
+        last10 = str(rng.choice("6789")) + "".join(rng.choice("0123456789") for _ in range(9))
+        phone = _stored_phone(rng, last10)
+        name = f"{rng.choice(REPLAY_FIRST_NAMES)} {len(clients)}"
+        case_ids = []
+        for _ in range(min(rng.randint(*REPLAY_HEARINGS_PER_CLIENT), rows - made)):
+            if not case_ids or rng.random() < 0.3:
+                next_case += 1
+                case_ids.append(str(next_case))
+            day = today + datetime.timedelta(days=_hearing_offset(rng))
+            batch.append((name, phone, case_ids[-1], day.isoformat(), f"{rng.randint(9, 17):02d}:{rng.choice((0, 15, 30, 45)):02d}"))
+            made += 1
+        clients.append((last10, case_ids))
+        if len(batch) >= 50000:
+            with conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO cases(client_name, phone, case_id, hearing_date, hearing_time) VALUES (?, ?, ?, ?, ?)",
+                    batch,
+                )
+            batch = []
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO cases(client_name, phone, case_id, hearing_date, hearing_time) VALUES (?, ?, ?, ?, ?)",
+            batch,
+        )
+        conn.execute("DELETE FROM case_changes")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    return {"clients": clients}
+
+
+def make_replay_queries(clients, count: int, seed: int) -> List[ReplayQuery]:
+    """
+    Deterministic query mix over the DB's clients (REPLAY_MIX weights). Busy
+    clients ask more often (Zipf-like), as in real traffic.
+    """
+    rng = random.Random(seed + 1)
+    kinds = [k for w, k in REPLAY_MIX for _ in range(w)]
+    # A few hundred active clients dominate a day's messages
+    active = [clients[rng.randrange(len(clients))] for _ in range(min(len(clients), 500))]
+    weights = [1 / (i + 1) for i in range(len(active))]
+
+    queries = []
+    for _ in range(count):
+        kind = rng.choice(kinds)
+        last10, case_ids = rng.choices(active, weights)[0]
+        phone = "+91" + last10
+        if kind == "stranger":
+            phone = "+91" + "5" + "".join(rng.choice("0123456789") for _ in range(9))
+            kind = "next_hearing"
+        text = rng.choice(_REPLAY_TEXTS[kind]).format(cid=rng.choice(case_ids))
+        queries.append(ReplayQuery(text, phone))
+    return queries
+
+
+def load_replay_queries(path: str) -> List[ReplayQuery]:
+    """
+    Recorded mix: JSON lines {"text": ..., "phone": ...}.
+    """
+    with open(path, encoding="utf-8") as f:
+        return [ReplayQuery(d["text"], d["phone"]) for d in map(json.loads, f) if d]
+
+
+def _point_bot_at(bot, db_file: str, reply_cache_entries: int):
+    """
+    Rebind the bot's DB-backed singletons to `db_file`.
+    """
+    from phone_index import PhoneIndex
+    from reply_cache import ReplyCache
+
+    bot.PHONE_INDEX.close()
+    bot.REPLY_CACHE.close()
+    bot.SETTINGS.close()
+    bot.DB_FILE = db_file
+    bot.PHONE_INDEX = PhoneIndex(db_file)
+    bot.REPLY_CACHE = ReplyCache(db_file, max_entries=reply_cache_entries)
+    bot.SETTINGS.db_file = db_file
+
+
+def _replay(fn, args_list) -> dict:
+    samples = []
+    started = time.perf_counter()
+    for args in args_list:
+        t0 = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    result = summarize(samples)
+    result["ops_per_s"] = round(len(samples) / elapsed, 1) if elapsed else 0.0
+    return result
+
+
+def bench_replay(rows: int, queries: Optional[List[ReplayQuery]], query_count: int, seed: int,
+                 data_dir: str = REPLAY_DATA_DIR) -> dict:
+    """
+    Replay a query mix through search_case (reply cache on and off) and
+    normalize_phone, and the reminder planner over every hearing day in
+    range, against a synthetic DB of `rows` hearings.
+    """
+    import interactive_bot_dec_22nd as bot
+
+    today = datetime.date.today()
+    os.makedirs(data_dir, exist_ok=True)
+    db_file = os.path.join(data_dir, f"cases_{rows}_{seed}_{today.isoformat()}.db")
+    meta_file = db_file + ".json"
+
+    build_s = 0.0
+    if os.path.exists(db_file) and os.path.exists(meta_file):
+        with open(meta_file, encoding="utf-8") as f:
+            meta = json.load(f)
+    else:
+        t0 = time.perf_counter()
+        meta = make_replay_db(db_file, rows, seed, today)
+        build_s = time.perf_counter() - t0
+        with open(meta_file, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    if queries is None:
+        queries = make_replay_queries(meta["clients"], query_count, seed)
+
+    _point_bot_at(bot, db_file, bot.REPLY_CACHE_MAX_ENTRIES)
+    bot.PHONE_INDEX.refresh(force=True)
+    bot.SETTINGS.refresh(force=True)
+    targets = {}
+
+    targets["normalize_phone"] = _replay(bot.normalize_phone, [(q.phone,) for q in queries])
+    targets["search_case"] = _replay(bot.search_case, [(q.text, q.phone) for q in queries])
+    _point_bot_at(bot, db_file, 0)
+    bot.PHONE_INDEX.refresh(force=True)
+    targets["search_case_uncached"] = _replay(bot.search_case, [(q.text, q.phone) for q in queries])
+
+    # The planner as the bot runs it: one call per day (09:00) in range
+    from reminders import plan_due_reminders, plan_pending_reminders
+
+    conn = bot.db_conn()
+    reminder_days = bot.SETTINGS.get("reminder_days")
+    nows = [(conn, datetime.datetime.combine(today + datetime.timedelta(days=d), datetime.time(9, 0)),
+             reminder_days) for d in range(-30, 60)]
+    targets["plan_due_reminders"] = _replay(plan_due_reminders, nows)
+    targets["plan_pending_reminders"] = _replay(plan_pending_reminders, nows)
+
+    return {
+        "benchmark": "replay",
+        "rows": rows,
+        "seed": seed,
+        "queries": len(queries),
+        "db_build_s": round(build_s, 2),
+        "db_mb": round(os.path.getsize(db_file) / 1024 / 1024, 1),
+        "targets": targets,
+    }
+
+
+def _cmd_replay(args):
+    queries = load_replay_queries(args.mix) if args.mix else None
+    for rows in [int(r) for r in args.rows.split(",") if r.strip()]:
+        emit(bench_replay(rows, queries, args.queries, args.seed, args.data_dir))
+
+
+# ==========================================================
+#                 CLI
+# ==========================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Advocate bot benchmarks (JSON output)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    nav = sub.add_parser("navigation", help="chat switch time: URL reload vs in-app strategies")
+    nav.add_argument("--phones", required=True, help="comma-separated phones with existing chats")
+    nav.add_argument("--rounds", type=int, default=5)
+    nav.add_argument("--strategies", default="url,search,link")
+    nav.add_argument("--login-timeout", type=int, default=120)
+    nav.set_defaults(func=_cmd_navigation)
+
+    intents = sub.add_parser("intents", help="query parsing: keyword chain vs compiled IntentMatcher")
+    intents.add_argument("--iterations", type=int, default=20000)
+    intents.add_argument("--extra-keywords", default="0",
+                         help="comma-separated counts of synthetic keywords added per intent, e.g. 0,100,400")
+    intents.set_defaults(func=_cmd_intents)
+
+    startup = sub.add_parser("startup", help="cold start: process time, import time, peak RSS")
+    startup.add_argument("modules", nargs="+", help="module names, e.g. send_reminders")
+    startup.add_argument("--runs", type=int, default=5)
+    startup.add_argument("--call", default="", help="statement run after import, module bound to `mod`")
+    startup.set_defaults(func=_cmd_startup)
+
+    replay = sub.add_parser("replay", help="search_case / normalize_phone / reminder planner on synthetic DBs")
+    replay.add_argument("--rows", default="10000,100000,1000000", help="comma-separated DB sizes (hearings)")
+    replay.add_argument("--queries", type=int, default=20000, help="generated queries per DB size")
+    replay.add_argument("--mix", help="recorded query mix (JSON lines with text, phone) instead of generated")
+    replay.add_argument("--seed", type=int, default=1)
+    replay.add_argument("--data-dir", default=REPLAY_DATA_DIR, help="where generated DBs are cached")
+    replay.set_defaults(func=_cmd_replay)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
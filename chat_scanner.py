@@ -0,0 +1,204 @@
+# chat_scanner.py
+# Unread-badge scanner over the WhatsApp Web chat list.
+#
+# The MutationObserver (message_observer.py) only sees rows of the chat that
+# is open, so once a reminder switched chats, messages from every other
+# client went unanswered. ChatScanner reads the unread badges of the chat
+# list in one script, then visits those chats in priority order (longest
+# waiting first: WhatsApp sorts by last activity, so bottom-most unread chat
+# first), and claims each chat's unread messages so the caller can answer
+# them in one batch before moving on:
+#
+#   scanner = ChatScanner(driver, observer)
+#   for chat in scanner.scan():
+#       for msg in scanner.open_and_claim(chat):
+#           handle(msg)
+#
+# Metrics (metrics.py):
+#   scan.cycles           scans run
+#   scan.chats            gauge: chats with unread messages in the last scan (+ .max)
+#   scan.chats_visited    chats opened by the scanner
+#   scan.groups_skipped   group chats opened and left unanswered
+#   scan.list / scan.open time to read the chat list / open a chat and claim its messages
+#
+# Chats are opened by clicking their list row (in-app, no page reload), so the
+# injected observer keeps running.
+#
+# Only 1:1 chats are served. The chat list does not say which rows are groups,
+# so a group is recognised once opened (its message ids are
+# false_<group>@g.us_<msg>_<participant>@c.us): its messages are claimed
+# without being returned, and its title is skipped by later scans.
+
+import time
+from typing import List, NamedTuple
+
+from message_observer import IncomingMessage, IncomingMessageObserver
+from metrics import incr, set_gauge, timed
+
+# Max chats visited per scan (the open chat and reminders are served between scans)
+MAX_CHATS_PER_SCAN = 10
+
+# How long a clicked chat gets to open and render its messages
+OPEN_TIMEOUT_SECONDS = 5
+OPEN_POLL_SECONDS = 0.05
+
+CHAT_ROW_SELECTOR = "#pane-side [role='listitem'], #pane-side [role='row']"
+
+
+class UnreadChat(NamedTuple):
+    title: str          # chat name / number as shown in the list
+    unread: int         # badge count (1 for a chat marked unread without a count)
+    position: int       # row index in the chat list (0 = most recent activity)
+
+
+# [position, title, unread] for every chat-list row with an unread badge
+_UNREAD_CHATS_JS = """
+var rows = document.querySelectorAll(arguments[0]), out = [];
+for (var i = 0; i < rows.length; i++) {
+    var badge = rows[i].querySelector("span[aria-label*='unread' i], [data-testid='icon-unread-count']");
+    if (!badge) { continue; }
+    var n = parseInt((badge.innerText || '').replace(/\\D/g, ''), 10) || 1;
+    var title = rows[i].querySelector('span[title]');
+    out.push([i, title ? title.getAttribute('title') : '', n]);
+}
+return out;
+"""
+
+# The row to click for a chat: the one at its scanned position if the title
+# still matches (the list re-sorts as messages arrive), else the first with that title.
+_FIND_CHAT_ROW_JS = """
+var rows = document.querySelectorAll(arguments[0]), title = arguments[1], pos = arguments[2];
+function titleOf(row) { var t = row.querySelector('span[title]'); return t ? t.getAttribute('title') : ''; }
+if (pos < rows.length && titleOf(rows[pos]) === title) { return rows[pos]; }
+for (var i = 0; i < rows.length; i++) { if (titleOf(rows[i]) === title) { return rows[i]; } }
+return null;
+"""
+
+# Chat header shows `title` and its last incoming row has rendered text
+_CHAT_READY_JS = """
+var title = arguments[0], main = document.querySelector('#main');
+if (!main) { return false; }
+var header = main.querySelector('header');
+var t = header ? header.querySelector('span[title]') : null;
+var shown = t ? t.getAttribute('title') : (header ? header.innerText : '');
+if (shown.indexOf(title) === -1) { return false; }
+var rows = main.querySelectorAll('div[data-id]');
+for (var i = rows.length - 1; i >= 0; i--) {
+    var id = rows[i].getAttribute('data-id');
+    if (!id || id.indexOf('true_') === 0 || !rows[i].querySelector('.message-in')) { continue; }
+    return !!rows[i].querySelector("span[data-testid='selectable-text'] span");
+}
+return false;
+"""
+
+
+class ChatScanner:
+    def __init__(self, driver, observer: IncomingMessageObserver, max_chats: int = MAX_CHATS_PER_SCAN):
+        self.driver = driver
+        self.observer = observer
+        self.max_chats = max_chats
+        self._groups = set()      # titles of chats found to be groups
+
+    def scan(self) -> List[UnreadChat]:
+        """
+        Chats with unread messages, in the order they should be served.
+        """
+        with timed("scan.list"):
+            raw = self.driver.execute_script(_UNREAD_CHATS_JS, CHAT_ROW_SELECTOR) or []
+        chats = [UnreadChat(str(title), int(unread), int(pos)) for pos, title, unread in raw]
+        chats = [c for c in chats if c.title not in self._groups]
+        chats.sort(key=lambda c: -c.position)
+        incr("scan.cycles")
+        set_gauge("scan.chats", len(chats))
+        return chats[: self.max_chats]
+
+    def open_and_claim(self, chat: UnreadChat) -> List[IncomingMessage]:
+        """
+        Open the chat and return its unread incoming messages, oldest first
+        ([] if it could not be opened or is a group). They are marked as
+        handled in the observer, so they are not delivered a second time.
+        """
+        with timed("scan.open"):
+            if not self._open(chat):
+                print(f"[SCAN] Could not open chat {chat.title!r}")
+                return []
+            incr("scan.chats_visited")
+            messages = self.observer.claim_rendered(chat.unread)
+        if any("@g.us" in m.data_id for m in messages):
+            self._groups.add(chat.title)
+            incr("scan.groups_skipped")
+            print(f"[SCAN] Skipping group chat {chat.title!r}")
+            return []
+        return messages
+
+    def _open(self, chat: UnreadChat) -> bool:
+        row = self.driver.execute_script(_FIND_CHAT_ROW_JS, CHAT_ROW_SELECTOR, chat.title, chat.position)
+        if row is None:
+            return False
+        try:
+            row.click()
+        except Exception as e:
+            print(f"[SCAN] Click failed for {chat.title!r}: {e}")
+            return False
+        return self._wait_ready(chat.title)
+
+    def _wait_ready(self, title: str, timeout: float = OPEN_TIMEOUT_SECONDS) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.driver.execute_script(_CHAT_READY_JS, title):
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(OPEN_POLL_SECONDS)
+
+
+
+# ==========================================================
+#        SELF-CHECK AGAINST THE STATIC WHATSAPP STAND-IN
+# ==========================================================
+def run_stub_check(driver, chats: int = 5, per_chat: int = 3) -> dict:
+    """
+    Loads whatsapp_stub.html, leaves `per_chat` unread messages in each of
+    `chats` other chats and verifies the scanner claims each exactly once
+    (and that the observer does not deliver them again).
+    """
+    from message_observer import STUB_HTML
+
+    driver.get("file://" + STUB_HTML)
+    observer = IncomingMessageObserver(driver)
+    observer.install()
+    scanner = ChatScanner(driver, observer, max_chats=chats)
+
+    expected = []
+    for c in range(chats):
+        phone = f"9190000{c:05d}"
+        for i in range(per_chat):
+            expected.append(driver.execute_script(
+                "return stubReceiveInChat(arguments[0], arguments[1]);", f"case {100 + i}", phone))
+
+    started = time.time()
+    found = scanner.scan()
+    received = []
+    for chat in found:
+        received.extend(m.data_id for m in scanner.open_and_claim(chat))
+    redelivered = observer.drain()
+
+    return {
+        "chats_found": len(found),
+        "expected": len(expected),
+        "received": len(received),
+        "missing": len(set(expected) - set(received)),
+        "duplicates": len(received) - len(set(received)) + len(redelivered),
+        "oldest_first": [c.title for c in found] == [f"+9190000{c:05d}" for c in range(chats)],
+        "seconds": round(time.time() - started, 3),
+    }
+
+
+if __name__ == "__main__":
+    from selenium import webdriver
+
+    drv = webdriver.Chrome()
+    try:
+        print(run_stub_check(drv))
+    finally:
+        drv.quit()
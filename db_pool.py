@@ -0,0 +1,158 @@
+# db_pool.py
+# Shared SQLite connection manager for the bot, the reminder scheduler and settings.
+#
+# - one long-lived connection per (thread, DB file); no per-message connect/close
+# - WAL journal so the admin UI writing `settings` never blocks the bot's reads
+# - tuned pragmas + Python's per-connection prepared statement cache
+#
+# Usage:
+#   conn = get_connection(DB_FILE)
+#   conn.execute("SELECT ...").fetchall()
+#   with conn:                      # commits (or rolls back) writes
+#       conn.execute("UPDATE ...")
+#
+# Do NOT close connections returned by get_connection(); they are reused.
+#
+# In-memory caches over the DB (PhoneIndex, ReplyCache, ReminderScheduler,
+# SettingsStore) notice other processes' writes with a DataVersionWatcher.
+
+import sqlite3
+import threading
+from typing import Dict, Optional
+
+# Pragmas applied to every connection we open
+BUSY_TIMEOUT_MS = 5000
+SYNCHRONOUS = "NORMAL"            # safe with WAL, much cheaper than FULL
+MMAP_SIZE = 256 * 1024 * 1024     # bytes
+CACHE_SIZE_KIB = 32 * 1024        # page cache per connection
+CACHED_STATEMENTS = 256           # prepared statements kept per connection
+
+
+def open_connection(db_file: str, check_same_thread: bool = True) -> sqlite3.Connection:
+    """
+    Open a new connection with the standard pragmas.
+    Prefer get_connection(); use this only for connections that must stay
+    private (e.g. a DataVersionWatcher's handle).
+    """
+    conn = sqlite3.connect(
+        db_file,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=CACHED_STATEMENTS,
+        check_same_thread=check_same_thread,
+    )
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+    except sqlite3.OperationalError:
+        # Read-only media / locked by a legacy writer: keep the default journal.
+        pass
+    conn.execute(f"PRAGMA synchronous={SYNCHRONOUS}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+    # The cases triggers call phone_last10() (db_setup)
+    from phone_index import register_sql_functions
+
+    register_sql_functions(conn)
+    return conn
+
+
+class DataVersionWatcher:
+    """
+    Notices commits made to a DB file by OTHER connections.
+
+    Owns a private connection, because PRAGMA data_version ignores the
+    connection's own commits: never write through it. changed() costs one
+    pragma call. Not thread-safe; callers hold their own lock.
+    """
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self._conn: Optional[sqlite3.Connection] = None
+        self._version: Optional[int] = None
+
+    @property
+    def started(self) -> bool:
+        """
+        False until the first changed() (and again after close()).
+        """
+        return self._version is not None
+
+    def connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = open_connection(self.db_file, check_same_thread=False)
+        return self._conn
+
+    def changed(self) -> bool:
+        """
+        True if the DB changed since the previous call (always True on the
+        first one). The new version counts as seen from here on.
+        """
+        version = self.connection().execute("PRAGMA data_version").fetchone()[0]
+        if version == self._version:
+            return False
+        self._version = version
+        return True
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        self._version = None
+
+
+class ConnectionPool:
+    """
+    Thread-local connection per DB file. Connections stay open for the
+    lifetime of the thread (or until close_all()).
+    """
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = []
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = open_connection(self.db_file)
+            self._local.conn = conn
+            with self._lock:
+                self._all.append(conn)
+        return conn
+
+    def close_all(self):
+        """
+        Close every connection handed out by this pool (shutdown / tests).
+        Only call when no other thread is still using the pool.
+        """
+        with self._lock:
+            for conn in self._all:
+                try:
+                    conn.close()
+                except sqlite3.ProgrammingError:
+                    pass
+            self._all = []
+        self._local = threading.local()
+
+
+_POOLS: Dict[str, ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(db_file: str) -> ConnectionPool:
+    with _POOLS_LOCK:
+        pool = _POOLS.get(db_file)
+        if pool is None:
+            pool = ConnectionPool(db_file)
+            _POOLS[db_file] = pool
+        return pool
+
+
+def get_connection(db_file: str) -> sqlite3.Connection:
+    """
+    Long-lived connection for the calling thread.
+    """
+    return get_pool(db_file).connection()
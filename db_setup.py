@@ -1,9 +1,20 @@
 import sqlite3
 
-def create_db():
-    conn = sqlite3.connect("cases.db")
-    cur = conn.cursor()
+from phone_index import register_sql_functions
+
+DB_FILE = "cases.db"
+
 
+# ==========================================================
+#                    MIGRATIONS
+# ==========================================================
+# Schema version lives in PRAGMA user_version. Each migration upgrades the DB
+# from version N-1 to N; existing cases.db files are upgraded in place.
+
+def _migrate_v1(cur):
+    """
+    Base cases table.
+    """
     cur.execute("""
     CREATE TABLE IF NOT EXISTS cases (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -15,9 +26,292 @@ def create_db():
     )
     """)
 
-    conn.commit()
-    conn.close()
-    print("Database and table created successfully.")
+
+def _migrate_v2(cur):
+    """
+    Lookup indexes + stored phone_last10 column for sender matching in SQL.
+    The column is phone_index.phone_last10(phone), kept up to date by triggers
+    calling that Python function (registered by register_sql_functions), so
+    SQL and Python always agree. The insert trigger skips rows whose writer
+    already set the column (bulk importer), saving an UPDATE per row.
+    """
+    columns = [row[1] for row in cur.execute("PRAGMA table_info(cases)")]
+    if "phone_last10" not in columns:
+        cur.execute("ALTER TABLE cases ADD COLUMN phone_last10 TEXT")
+
+    cur.execute("UPDATE cases SET phone_last10 = phone_last10(phone)")
+
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_cases_phone_last10_insert
+    AFTER INSERT ON cases
+    WHEN NEW.phone_last10 IS NOT phone_last10(NEW.phone)
+    BEGIN
+        UPDATE cases SET phone_last10 = phone_last10(NEW.phone)
+        WHERE id = NEW.id;
+    END
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_cases_phone_last10_update
+    AFTER UPDATE OF phone ON cases
+    BEGIN
+        UPDATE cases SET phone_last10 = phone_last10(NEW.phone)
+        WHERE id = NEW.id;
+    END
+    """)
+
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_cases_phone_hearing ON cases(phone, hearing_date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_cases_case_id ON cases(case_id, hearing_date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_cases_hearing_date ON cases(hearing_date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_cases_phone_last10 ON cases(phone_last10)")
+
+
+def _migrate_v3(cur):
+    """
+    Persistent reminder send ledger (replaces the in-memory last_sent_cache).
+    status: ['queued' ->] 'sending' -> 'sent' | 'failed' (retried with backoff until next_attempt_at)
+    """
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS reminder_log (
+        phone TEXT NOT NULL,
+        case_id TEXT NOT NULL,
+        hearing_date TEXT NOT NULL,
+        days_before INTEGER NOT NULL,
+        status TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT,
+        next_attempt_at TEXT,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        sent_at TEXT,
+        PRIMARY KEY (phone, case_id, hearing_date, days_before)
+    ) WITHOUT ROWID
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_reminder_log_hearing_date ON reminder_log(hearing_date)")
+
+
+def _migrate_v4(cur):
+    """
+    Change log of cases rows (which phone / case_id was touched), written by
+    triggers so every writer is covered. Readers such as the reply cache
+    invalidate only what changed; a row with both columns NULL means "all
+    rows changed". Old rows are pruned daily.
+    """
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS case_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        phone_last10 TEXT,
+        case_id TEXT,
+        changed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_cases_changes_insert
+    AFTER INSERT ON cases
+    BEGIN
+        INSERT INTO case_changes (phone_last10, case_id) VALUES (phone_last10(NEW.phone), NEW.case_id);
+    END
+    """)
+    # Not on phone_last10 itself: that column is maintained by the v2 triggers
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_cases_changes_update
+    AFTER UPDATE OF client_name, phone, case_id, hearing_date, hearing_time ON cases
+    BEGIN
+        INSERT INTO case_changes (phone_last10, case_id)
+        VALUES (phone_last10(OLD.phone), OLD.case_id), (phone_last10(NEW.phone), NEW.case_id);
+    END
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_cases_changes_delete
+    AFTER DELETE ON cases
+    BEGIN
+        INSERT INTO case_changes (phone_last10, case_id) VALUES (phone_last10(OLD.phone), OLD.case_id);
+    END
+    """)
+
+
+# One row per hearing: the upsert key of the importer. A case can have two
+# hearings on the same day, so the time is part of it.
+HEARING_KEY = "phone, case_id, hearing_date, hearing_time"
+
+
+def _create_cases_invalid(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS cases_invalid (
+        id INTEGER PRIMARY KEY,
+        client_name TEXT,
+        phone TEXT,
+        case_id TEXT,
+        hearing_date TEXT,
+        hearing_time TEXT,
+        reason TEXT NOT NULL,
+        moved_at TEXT NOT NULL DEFAULT (datetime('now'))
+    )
+    """)
+
+
+def _dedupe_hearings(cur):
+    """
+    Make HEARING_KEY unique before indexing it. Rows equal on every column
+    keep their newest copy; other rows sharing a key with a newer row (e.g.
+    a different client_name) move to cases_invalid instead of being lost.
+    """
+    cur.execute("""
+    DELETE FROM cases
+    WHERE id NOT IN (SELECT max(id) FROM cases
+                     GROUP BY client_name, phone, case_id, hearing_date, hearing_time)
+    """)
+    cur.execute(f"""
+    INSERT INTO cases_invalid (id, client_name, phone, case_id, hearing_date, hearing_time, reason)
+    SELECT c.id, c.client_name, c.phone, c.case_id, c.hearing_date, c.hearing_time,
+           'duplicate hearing (kept id ' || k.keep_id || ')'
+    FROM cases c
+    JOIN (SELECT {HEARING_KEY}, max(id) AS keep_id FROM cases GROUP BY {HEARING_KEY}) k
+      USING ({HEARING_KEY})
+    WHERE c.id != k.keep_id
+    """)
+    moved = cur.rowcount
+    if moved:
+        cur.execute("DELETE FROM cases WHERE id IN (SELECT id FROM cases_invalid)")
+        print(f"[DB] {moved} conflicting duplicate case row(s) moved to cases_invalid")
+
+
+def _migrate_v5(cur):
+    """
+    One row per hearing: unique HEARING_KEY so imports can upsert. Exact
+    duplicates already in the table keep their newest row; conflicting ones
+    move to cases_invalid.
+    """
+    _create_cases_invalid(cur)
+    _dedupe_hearings(cur)
+    cur.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS ux_cases_hearing ON cases({HEARING_KEY})")
+
+
+# Write-time check for the typed hearing columns (canonical forms only)
+HEARING_INVALID_SQL = (
+    "date({p}hearing_date, '+0 days') IS NOT {p}hearing_date"
+    " OR {p}hearing_time NOT GLOB '[0-2][0-9]:[0-5][0-9]' OR {p}hearing_time >= '24:00'"
+)
+
+
+def _migrate_v6(cur):
+    """
+    Typed hearings: hearing_date is 'YYYY-MM-DD', hearing_time is 'HH:MM'
+    (validated by triggers on every write), and hearing_at = 'YYYY-MM-DD HH:MM'
+    is a sortable virtual column indexed with phone, so "next hearing" is one
+    indexed range query. Existing rows are normalized with the importer's
+    parsers; rows that cannot be parsed, or that now collide with another
+    hearing, move to cases_invalid.
+    Needs SQLite >= 3.31 (generated columns).
+    """
+    from import_cases import RowError, normalize_date, normalize_time
+
+    _create_cases_invalid(cur)
+
+    # Normalizing can make two rows equal on the upsert key: rebuild it after
+    cur.execute("DROP INDEX IF EXISTS ux_cases_hearing")
+
+    updates, invalid = [], []
+    for row_id, d, t in cur.execute("SELECT id, hearing_date, hearing_time FROM cases").fetchall():
+        try:
+            nd, nt = normalize_date(d), normalize_time(t)
+        except RowError as e:
+            invalid.append((str(e), row_id))
+            continue
+        if (nd, nt) != (d, t):
+            updates.append((nd, nt, row_id))
+    cur.executemany("UPDATE cases SET hearing_date = ?, hearing_time = ? WHERE id = ?", updates)
+    cur.executemany("""
+    INSERT INTO cases_invalid (id, client_name, phone, case_id, hearing_date, hearing_time, reason)
+    SELECT id, client_name, phone, case_id, hearing_date, hearing_time, ? FROM cases WHERE id = ?
+    """, invalid)
+    cur.executemany("DELETE FROM cases WHERE id = ?", [(row_id,) for _, row_id in invalid])
+    if invalid:
+        print(f"[DB] {len(invalid)} case row(s) with unparsable hearing date/time moved to cases_invalid")
+
+    _dedupe_hearings(cur)
+    cur.execute(f"CREATE UNIQUE INDEX ux_cases_hearing ON cases({HEARING_KEY})")
+
+    cur.execute("""
+    ALTER TABLE cases ADD COLUMN hearing_at TEXT
+    GENERATED ALWAYS AS (hearing_date || ' ' || hearing_time) VIRTUAL
+    """)
+    cur.execute("DROP INDEX IF EXISTS idx_cases_phone_hearing")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_cases_phone_hearing_at ON cases(phone, hearing_at)")
+
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_cases_validate_insert
+    BEFORE INSERT ON cases
+    WHEN {HEARING_INVALID_SQL.format(p='NEW.')}
+    BEGIN
+        SELECT RAISE(ABORT, 'hearing_date must be YYYY-MM-DD and hearing_time HH:MM');
+    END
+    """)
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_cases_validate_update
+    BEFORE UPDATE OF hearing_date, hearing_time ON cases
+    WHEN {HEARING_INVALID_SQL.format(p='NEW.')}
+    BEGIN
+        SELECT RAISE(ABORT, 'hearing_date must be YYYY-MM-DD and hearing_time HH:MM');
+    END
+    """)
+
+
+MIGRATIONS = [
+    _migrate_v1,
+    _migrate_v2,
+    _migrate_v3,
+    _migrate_v4,
+    _migrate_v5,
+    _migrate_v6,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Apply pending migrations, each in its own BEGIN IMMEDIATE transaction.
+    user_version is read after taking the write lock, so processes starting
+    together (bot + send_reminders.py) never apply the same step twice.
+    Returns the schema version the DB ended up at.
+    """
+    cur = conn.cursor()
+    while True:
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            version = cur.execute("PRAGMA user_version").fetchone()[0]
+            if version >= SCHEMA_VERSION:
+                cur.execute("COMMIT")
+                return version
+            MIGRATIONS[version](cur)
+            cur.execute(f"PRAGMA user_version = {version + 1}")
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+
+
+# How long a process waits for another one's migration to finish
+MIGRATION_LOCK_TIMEOUT = 300
+
+
+def ensure_schema(db_file: str = DB_FILE) -> int:
+    """
+    Create / upgrade cases.db in place. Safe to call on every startup.
+    """
+    conn = sqlite3.connect(db_file, isolation_level=None, timeout=MIGRATION_LOCK_TIMEOUT)
+    register_sql_functions(conn)
+    try:
+        return migrate(conn)
+    finally:
+        conn.close()
+
+
+def create_db(db_file: str = DB_FILE):
+    version = ensure_schema(db_file)
+    print(f"Database and table created successfully (schema v{version}).")
+
 
 if __name__ == "__main__":
     create_db()
@@ -0,0 +1,430 @@
+# import_cases.py
+# Bulk loader: advocate_cases.csv / .xlsx -> cases.db
+#
+#   python import_cases.py advocate_cases.csv
+#   python import_cases.py hearings.xlsx --sheet Sheet1 --db cases.db
+#
+# Rows are streamed (csv module / openpyxl read-only mode), normalized,
+# staged in a temp table and upserted with one INSERT ... SELECT inside ONE
+# transaction: either the whole file lands or nothing does.
+#
+# Re-importing the same (or an updated) file is incremental: rows are
+# matched on (phone, case_id, hearing_date, hearing_time), changed names are
+# updated, unchanged rows are not touched (so they don't invalidate the
+# bot's caches). The file is the truth for every case it lists: that case's
+# hearings missing from it (rescheduled, cancelled) are deleted in the same
+# transaction. Cases the file does not mention are left alone, so partial
+# files are fine.
+#
+# Speed, 1M synthetic rows on one slow sandbox core: ~16 s first import,
+# ~15 s re-import. About 7 s of each is csv parsing and normalization in
+# Python, the rest is SQLite (upsert, index builds). That is not "a few
+# seconds"; getting there would need a native CSV parser.
+#
+# Normalization:
+#   phone         -> "+<country code><number>"; 10-digit numbers get +91,
+#                    a leading 0 / 00 is dropped. Numbers that are not
+#                    91 + 10 digits (e.g. the 11-digit "+91958021418") are
+#                    imported as "+<digits>" and reported as warnings
+#                    (rejected with --strict).
+#   hearing_date  -> YYYY-MM-DD (also accepts DD-MM-YYYY, DD/MM/YYYY, Excel dates)
+#   hearing_time  -> HH:MM 24h ("9:00" -> "09:00", "10:00 " -> "10:00", "2:30 PM" -> "14:30")
+
+import argparse
+import csv
+import datetime
+import functools
+import operator
+import os
+import re
+import sqlite3
+import sys
+import time
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from db_pool import open_connection
+from db_setup import DB_FILE, ensure_schema
+
+DEFAULT_COUNTRY_CODE = "91"
+CHUNK_SIZE = 50_000
+
+# Printed in the report; the rest are only counted
+MAX_REPORTED_ISSUES = 20
+
+COLUMNS = ["client_name", "phone", "case_id", "hearing_date", "hearing_time"]
+
+# Rows are first staged in a temp table (one plain executemany), then
+# upserted and compared with cases in set-based statements.
+_STAGE_SQL = [
+    "DROP TABLE IF EXISTS temp.import_rows",
+    "DROP TABLE IF EXISTS temp.import_incomplete",
+    """CREATE TEMP TABLE import_rows (
+        client_name TEXT, phone TEXT, case_id TEXT, hearing_date TEXT, hearing_time TEXT, phone_last10 TEXT
+    )""",
+    # Cases with a rejected row: the file is incomplete for them, keep their hearings
+    "CREATE TEMP TABLE import_incomplete (case_id TEXT PRIMARY KEY) WITHOUT ROWID",
+]
+
+_STAGE_INSERT_SQL = "INSERT INTO temp.import_rows VALUES (?, ?, ?, ?, ?, ?)"
+
+# Key order keeps the unique-index pages hot; rowid last, so for duplicate
+# rows in one file the last one wins
+_UPSERT_SQL = """
+INSERT INTO cases (client_name, phone, case_id, hearing_date, hearing_time, phone_last10)
+SELECT client_name, phone, case_id, hearing_date, hearing_time, phone_last10
+FROM temp.import_rows
+WHERE true
+ORDER BY phone, case_id, hearing_date, hearing_time, rowid
+ON CONFLICT(phone, case_id, hearing_date, hearing_time) DO UPDATE SET
+    client_name = excluded.client_name
+WHERE client_name IS NOT excluded.client_name
+"""
+
+# Hearings of the file's cases that the file no longer lists (rescheduled, cancelled)
+_DELETE_STALE_SQL = """
+DELETE FROM cases
+WHERE case_id IN (SELECT case_id FROM temp.import_rows)
+  AND case_id NOT IN (SELECT case_id FROM temp.import_incomplete)
+  AND NOT EXISTS (
+      SELECT 1 FROM temp.import_rows k
+      WHERE k.case_id = cases.case_id AND k.phone = cases.phone
+        AND k.hearing_date = cases.hearing_date AND k.hearing_time = cases.hearing_time)
+"""
+
+
+class RowError(ValueError):
+    """
+    A source row that cannot be imported.
+    """
+
+
+class ImportReport(NamedTuple):
+    rows: int
+    inserted: int
+    updated: int
+    unchanged: int
+    removed: int           # hearings of imported cases no longer in the file
+    rejected: int
+    warnings: int
+    seconds: float
+    issues: List[str]      # first MAX_REPORTED_ISSUES problems, "line N: ..."
+
+
+# ==========================================================
+#                 FIELD NORMALIZATION
+# ==========================================================
+def normalize_phone(raw) -> Tuple[str, Optional[str]]:
+    """
+    Returns (phone, warning). Raises RowError if there are no digits to use.
+    """
+    return _normalize_phone(str(raw or ""))
+
+
+# Big files repeat the same phones, dates and times over and over: parse each
+# distinct string once.
+@functools.lru_cache(maxsize=1 << 18)
+def _normalize_phone(raw: str) -> Tuple[str, Optional[str]]:
+    digits = re.sub(r"\D", "", raw)
+    if digits.startswith("00"):
+        digits = digits[2:]
+    elif len(digits) == 11 and digits.startswith("0"):
+        digits = digits[1:]
+
+    if len(digits) == 10:
+        digits = DEFAULT_COUNTRY_CODE + digits
+    if len(digits) < 10:
+        raise RowError(f"phone {raw!r} has too few digits")
+
+    warning = None
+    if not (digits.startswith(DEFAULT_COUNTRY_CODE) and len(digits) == len(DEFAULT_COUNTRY_CODE) + 10):
+        warning = f"phone {raw!r} is not +{DEFAULT_COUNTRY_CODE} followed by 10 digits"
+    return "+" + digits, warning
+
+
+_DATE_FORMATS = ["%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%Y/%m/%d", "%d.%m.%Y"]
+
+
+def normalize_date(raw) -> str:
+    if isinstance(raw, datetime.datetime):
+        return raw.date().isoformat()
+    if isinstance(raw, datetime.date):
+        return raw.isoformat()
+    return _normalize_date(str(raw or ""))
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _normalize_date(raw: str) -> str:
+    text = raw.strip()
+    if " " in text or "T" in text:      # "2026-01-15 00:00:00" from spreadsheets
+        text = re.split(r"[ T]", text, 1)[0]
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    raise RowError(f"hearing_date {raw!r} is not a date")
+
+
+_TIME_RE = re.compile(r"^(\d{1,2})(?:[:.](\d{2}))?(?::(\d{2}))?\s*([ap]\.?m\.?)?$", re.IGNORECASE)
+
+
+def normalize_time(raw) -> str:
+    if isinstance(raw, (datetime.time, datetime.datetime)):
+        return f"{raw.hour:02d}:{raw.minute:02d}"
+    return _normalize_time(str(raw or ""))
+
+
+@functools.lru_cache(maxsize=1 << 12)
+def _normalize_time(raw: str) -> str:
+    m = _TIME_RE.match(raw.strip())
+    if not m:
+        raise RowError(f"hearing_time {raw!r} is not a time")
+    hour, minute = int(m.group(1)), int(m.group(2) or 0)
+    meridiem = (m.group(4) or "").lower().replace(".", "")
+    if meridiem:
+        if not 1 <= hour <= 12:
+            raise RowError(f"hearing_time {raw!r} is not a time")
+        hour = hour % 12 + (12 if meridiem == "pm" else 0)
+    if hour > 23 or minute > 59:
+        raise RowError(f"hearing_time {raw!r} is not a time")
+    return f"{hour:02d}:{minute:02d}"
+
+
+def normalize_case_id(raw) -> str:
+    if isinstance(raw, float) and raw.is_integer():   # 12345.0 from spreadsheets
+        raw = int(raw)
+    text = str(raw if raw is not None else "").strip()
+    if not text:
+        raise RowError("case_id is empty")
+    return text
+
+
+def normalize_row(row) -> Tuple[tuple, Optional[str]]:
+    """
+    (client_name, phone, case_id, hearing_date, hearing_time) source values ->
+    (upsert parameters, warning).
+    """
+    client_name, phone, case_id, hearing_date, hearing_time = row
+    name = str(client_name or "").strip()
+    if not name:
+        raise RowError("client_name is empty")
+    phone, warning = normalize_phone(phone)
+    params = (
+        name,
+        phone,
+        normalize_case_id(case_id),
+        normalize_date(hearing_date),
+        normalize_time(hearing_time),
+        phone[1:][-10:],
+    )
+    return params, warning
+
+
+# ==========================================================
+#                 SOURCE READERS (streaming)
+# ==========================================================
+def _column_positions(header: Iterable) -> List[int]:
+    names = [str(h or "").strip().lower() for h in header]
+    missing = [c for c in COLUMNS if c not in names]
+    if missing:
+        raise ValueError(f"missing column(s): {', '.join(missing)}")
+    return [names.index(c) for c in COLUMNS]
+
+
+def read_csv_rows(path: str) -> Iterator[Tuple[int, tuple]]:
+    """
+    Yields (line number, row values in COLUMNS order).
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        positions = _column_positions(next(reader, []))
+        width = max(positions) + 1
+        pick = operator.itemgetter(*positions)
+        for row in reader:
+            if not any(row):
+                continue
+            if len(row) < width:
+                row = row + [""] * (width - len(row))
+            yield reader.line_num, pick(row)
+
+
+def read_xlsx_rows(path: str, sheet: Optional[str] = None) -> Iterator[Tuple[int, tuple]]:
+    # Imported here so CSV imports don't need openpyxl installed
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if sheet else wb.active
+        rows = ws.iter_rows(values_only=True)
+        positions = _column_positions(next(rows, ()))
+        width = max(positions) + 1
+        for line, row in enumerate(rows, start=2):
+            if not row or all(v is None or str(v).strip() == "" for v in row):
+                continue
+            row = tuple(row) + (None,) * (width - len(row))
+            yield line, tuple(row[i] for i in positions)
+    finally:
+        wb.close()
+
+
+def read_rows(path: str, sheet: Optional[str] = None) -> Iterator[Tuple[int, tuple]]:
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        return read_xlsx_rows(path, sheet)
+    return read_csv_rows(path)
+
+
+# ==========================================================
+#                 IMPORT
+# ==========================================================
+def _suspend_secondary_objects(conn: sqlite3.Connection, initial: bool) -> List[str]:
+    """
+    Drop cases objects the load does not need, returning their CREATE
+    statements. Initial load: the triggers and every index except the upsert
+    key (rebuilding an index once from sorted data is much cheaper than
+    maintaining it row by row). Re-import: only the hearing validation
+    triggers (staged rows are already canonical); the change-log triggers
+    stay, so the bot's caches see what changed. Runs inside the import
+    transaction, so other connections never see the table without them.
+    """
+    objects = conn.execute("""
+        SELECT type, name, sql FROM sqlite_master
+        WHERE tbl_name = 'cases' AND type IN ('index', 'trigger')
+          AND sql IS NOT NULL AND name != 'ux_cases_hearing'
+    """).fetchall()
+    if not initial:
+        objects = [o for o in objects if o[1].startswith("trg_cases_validate_")]
+    for kind, name, _ in objects:
+        conn.execute(f'DROP {kind.upper()} "{name}"')
+    return [sql for _, _, sql in objects]
+
+
+def _mark_incomplete(conn: sqlite3.Connection, raw_case_id):
+    try:
+        case_id = normalize_case_id(raw_case_id)
+    except RowError:
+        return
+    conn.execute("INSERT OR IGNORE INTO temp.import_incomplete VALUES (?)", (case_id,))
+
+
+def import_rows(
+    conn: sqlite3.Connection,
+    rows: Iterable[Tuple[int, tuple]],
+    chunk_size: int = CHUNK_SIZE,
+    strict: bool = False,
+) -> ImportReport:
+    """
+    Normalize and upsert `rows` in one transaction (rolled back on error).
+    Into an empty table (first import) indexes and triggers are rebuilt
+    once at the end instead of being maintained per row. Otherwise the
+    file replaces the hearings of every case it lists: that case's rows
+    missing from the file are deleted (unless one of its rows was rejected).
+    """
+    t0 = time.perf_counter()
+    total = rejected = warnings = removed = 0
+    issues: List[str] = []
+
+    def note(line: int, message: str):
+        if len(issues) < MAX_REPORTED_ISSUES:
+            issues.append(f"line {line}: {message}")
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for sql in _STAGE_SQL:
+            conn.execute(sql)
+
+        chunk: List[tuple] = []
+        for line, row in rows:
+            total += 1
+            try:
+                params, warning = normalize_row(row)
+                if warning:
+                    if strict:
+                        raise RowError(warning)
+                    warnings += 1
+                    note(line, f"warning: {warning}")
+            except RowError as e:
+                rejected += 1
+                note(line, f"rejected: {e}")
+                _mark_incomplete(conn, row[2])
+                continue
+
+            chunk.append(params)
+            if len(chunk) >= chunk_size:
+                conn.executemany(_STAGE_INSERT_SQL, chunk)
+                chunk = []
+        if chunk:
+            conn.executemany(_STAGE_INSERT_SQL, chunk)
+
+        before = conn.execute("SELECT count(*) FROM cases").fetchone()[0]
+        suspended = _suspend_secondary_objects(conn, initial=before == 0)
+        changed = conn.execute(_UPSERT_SQL).rowcount
+        for sql in suspended:
+            conn.execute(sql)
+        inserted = conn.execute("SELECT count(*) FROM cases").fetchone()[0] - before
+
+        if before == 0:
+            # The change-log triggers were off: one "everything changed" row
+            conn.execute("INSERT INTO case_changes (phone_last10, case_id) VALUES (NULL, NULL)")
+        else:
+            conn.execute("CREATE INDEX temp.ix_import_rows ON import_rows(case_id, phone, hearing_date, hearing_time)")
+            removed = conn.execute(_DELETE_STALE_SQL).rowcount
+
+        conn.execute("DROP TABLE temp.import_rows")
+        conn.execute("DROP TABLE temp.import_incomplete")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+    valid = total - rejected
+    return ImportReport(
+        rows=total,
+        inserted=inserted,
+        updated=changed - inserted,
+        unchanged=valid - changed,
+        removed=removed,
+        rejected=rejected,
+        warnings=warnings,
+        seconds=time.perf_counter() - t0,
+        issues=issues,
+    )
+
+
+def import_file(path: str, db_file: str = DB_FILE, sheet: Optional[str] = None,
+                chunk_size: int = CHUNK_SIZE, strict: bool = False) -> ImportReport:
+    ensure_schema(db_file)
+    conn = open_connection(db_file)
+    conn.isolation_level = None      # explicit BEGIN/COMMIT in import_rows
+    try:
+        return import_rows(conn, read_rows(path, sheet), chunk_size=chunk_size, strict=strict)
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import hearings from CSV/XLSX into cases.db")
+    parser.add_argument("path", help="advocate_cases.csv or an .xlsx workbook")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--sheet", help="worksheet name (xlsx; default: active sheet)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--strict", action="store_true", help="reject rows with phone warnings")
+    args = parser.parse_args(argv)
+
+    report = import_file(args.path, args.db, sheet=args.sheet, chunk_size=args.chunk_size, strict=args.strict)
+    for issue in report.issues:
+        print(issue)
+    hidden = report.rejected + report.warnings - len(report.issues)
+    if hidden > 0:
+        print(f"... and {hidden} more")
+    rate = report.rows / report.seconds if report.seconds else 0
+    print(
+        f"Imported {report.rows} row(s) in {report.seconds:.2f}s ({rate:,.0f} rows/s): "
+        f"{report.inserted} inserted, {report.updated} updated, {report.unchanged} unchanged, "
+        f"{report.removed} removed, {report.rejected} rejected, {report.warnings} warning(s)"
+    )
+    return 1 if report.rejected else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+# intents.py
+# Precompiled intent matcher for incoming bot queries.
+#
+# search_case used to run a chain of `in` checks plus a re.search per message,
+# and the voice-reply check scanned VOICE_KEYWORDS again. IntentMatcher folds
+# every keyword (all intents + voice keywords) and the case-id pattern into
+# one compiled regex and classifies a message in a single scan:
+#
+#   matcher = IntentMatcher(voice_keywords=["case", "history", "hearing"])
+#   matcher.classify("Case history please")
+#   -> Intent(name="history", case_id=None, voice=True)
+#
+# Semantics match the old chain (substring keywords, first 3-10 digit number
+# is the case id, history > next hearing > case lookup), with the precedence
+# written down in INTENT_PRIORITY instead of implied by the order of the
+# checks. Keywords for other languages are just more entries in the keyword
+# lists. With today's handful of keywords this is not a speedup (both take
+# ~5 us/query, within run-to-run noise); the matcher's cost stays flat as the
+# lists grow while the chain's grows with every keyword
+# (`benchmark.py intents --extra-keywords 0,100,400`).
+
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+INTENT_HISTORY = "history"
+INTENT_NEXT_HEARING = "next_hearing"
+INTENT_CASE = "case"
+
+# Checked in this order when a message matches several intents
+INTENT_PRIORITY = [INTENT_HISTORY, INTENT_NEXT_HEARING]
+
+# Substring keywords per intent (lowercase)
+INTENT_KEYWORDS: Dict[str, List[str]] = {
+    INTENT_HISTORY: [
+        "history", "all hearings", "hearing history", "case history", "full history",
+        "చరిత్ర",             # Telugu: history
+        "इतिहास",             # Hindi: history
+    ],
+    INTENT_NEXT_HEARING: [
+        "next hearing",
+        "తదుపరి విచారణ",      # Telugu: next hearing
+        "अगली सुनवाई",         # Hindi: next hearing
+    ],
+}
+
+# Messages ending with one of these also ask for the next hearing ("hearing", "my hearing")
+NEXT_HEARING_SUFFIXES = ["hearing"]
+
+CASE_ID_PATTERN = r"\b\d{3,10}\b"
+
+VOICE_BIT = 1
+
+
+class Intent(NamedTuple):
+    name: Optional[str]        # INTENT_* or None (not understood)
+    case_id: Optional[str]     # first 3-10 digit number in the message
+    voice: bool                # message contains a voice keyword
+
+
+class IntentMatcher:
+    """
+    keywords:       {intent: [substring, ...]} (defaults to INTENT_KEYWORDS)
+    voice_keywords: substrings that make a message eligible for a voice reply
+    suffixes:       substrings that select the next-hearing intent at the end of a message
+    """
+
+    def __init__(
+        self,
+        keywords: Optional[Dict[str, Iterable[str]]] = None,
+        voice_keywords: Iterable[str] = (),
+        suffixes: Iterable[str] = NEXT_HEARING_SUFFIXES,
+    ):
+        self.keywords = {k: [w.lower() for w in v] for k, v in (keywords or INTENT_KEYWORDS).items()}
+        self.voice_keywords = [w.lower() for w in voice_keywords if w]
+        self.suffixes = [w.lower() for w in suffixes if w]
+        self._compile()
+
+    def _compile(self):
+        # Flags are bits: VOICE_BIT, then one bit per intent in priority order
+        intents = INTENT_PRIORITY + [i for i in self.keywords if i not in INTENT_PRIORITY]
+        self._intent_bits = [(1 << (n + 1), intent) for n, intent in enumerate(intents)]
+        bit_of = dict((intent, bit) for bit, intent in self._intent_bits)
+
+        own: Dict[str, int] = {}
+        for intent, words in self.keywords.items():
+            for w in words:
+                own[w] = own.get(w, 0) | bit_of[intent]
+        for w in self.voice_keywords:
+            own[w] = own.get(w, 0) | VOICE_BIT
+
+        # A keyword also carries the flags of every keyword inside it: at a
+        # given position only the longest keyword is reported.
+        def implied(word: str, bits: int) -> int:
+            for other, other_bits in own.items():
+                if other in word:
+                    bits |= other_bits
+            return bits
+
+        self._flags = {w: implied(w, 0) for w in own}
+        self._suffix_flags = {w: implied(w, bit_of[INTENT_NEXT_HEARING]) for w in self.suffixes}
+
+        # Zero-width lookahead tried at every position, so overlapping
+        # keywords are all seen. Groups: suffix, keyword, case id.
+        parts = [
+            "(" + (_trie_pattern(self.suffixes) or "(?!)") + r")\Z",
+            "(" + (_trie_pattern(own) or "(?!)") + ")",
+            f"({CASE_ID_PATTERN})",
+        ]
+        self._findall = re.compile("(?=(?:" + "|".join(parts) + "))").findall
+
+    def add_keywords(self, intent: str, words: Iterable[str]):
+        """
+        Extend an intent (e.g. with Telugu/Hindi phrases) and recompile.
+        """
+        self.keywords.setdefault(intent, []).extend(w.lower() for w in words)
+        self._compile()
+
+    def classify(self, text: str) -> Intent:
+        text = (text or "").lower().strip()
+        bits = 0
+        case_id = None
+        flags = self._flags
+        for suffix, keyword, number in self._findall(text):
+            if keyword:
+                bits |= flags[keyword]
+            elif suffix:
+                bits |= self._suffix_flags[suffix]
+            elif case_id is None:
+                case_id = number
+
+        name = None
+        for bit, intent in self._intent_bits:
+            if bits & bit:
+                name = intent
+                break
+        if name is None and case_id:
+            name = INTENT_CASE
+        return Intent(name, case_id, bool(bits & VOICE_BIT))
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    Regex alternation of `words` shaped as a prefix trie: each position is
+    rejected on its first character, and longer words win over their prefixes.
+    """
+    trie: dict = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node: dict) -> str:
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
@@ -2,8 +2,9 @@
 
 import time
 import re
-import sqlite3
 import datetime
+import logging
+import os
 from selenium import webdriver
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
@@ -11,9 +12,26 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 
+from db_pool import get_connection
+from db_setup import ensure_schema
+from metrics import METRICS, incr, serve_prometheus, timed
+from phone_index import PhoneIndex
+
 
 DB_FILE = "cases.db"
 
+log = logging.getLogger(__name__)
+
+# last10 -> DB phone, rebuilt only when cases.db changes
+PHONE_INDEX = PhoneIndex(DB_FILE)
+
+# Instrumentation (metrics.py): stage timers + counters, exported on a
+# Prometheus endpoint (0 = off) and/or dumped as JSON every
+# METRICS_DUMP_SECONDS ("" = off). Log level: BOT_LOG_LEVEL=DEBUG for lookups.
+METRICS_PORT = 0
+METRICS_JSON_PATH = ""
+METRICS_DUMP_SECONDS = 60
+
 
 # ==========================================================
 #        PHONE NORMALIZER (CRITICAL FOR CORRECT HISTORY)
@@ -35,24 +53,12 @@ def normalize_phone(sender_phone):
         return None
     sender_last10 = sender_digits[-10:]
 
-    print("DEBUG: sender last10 digits:", sender_last10)
-
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    cur.execute("SELECT phone FROM cases")
-    db_phones = [row[0] for row in cur.fetchall()]
-    conn.close()
-
-    for db_phone in db_phones:
-        db_digits = re.sub(r"\D", "", db_phone)
-        if len(db_digits) >= 10:
-            db_last10 = db_digits[-10:]
-            if db_last10 == sender_last10:
-                print("DEBUG: PHONE MATCHED IN DB:", db_phone)
-                return db_phone
-
-    print("DEBUG: PHONE NOT FOUND IN DB for:", sender_phone)
-    return None
+    with timed("bot.phone_lookup"):
+        db_phone = PHONE_INDEX.lookup(sender_last10)
+    log.debug("phone.lookup sender=%s last10=%s matched=%s", sender_phone, sender_last10, db_phone)
+    if db_phone is None:
+        incr("bot.phone_unregistered")
+    return db_phone
 
 
 
@@ -61,39 +67,39 @@ def normalize_phone(sender_phone):
 #             SEARCH LOGIC (UNIT-TEST VERIFIED)
 # ==========================================================
 def search_case(query_text, sender_phone):
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
+    # Pooled long-lived connection: do not close it
+    cur = get_connection(DB_FILE).cursor()
 
     query_text = query_text.lower().strip()
-    print("DEBUG: Query:", query_text)
-    print("DEBUG: Sender raw:", sender_phone)
+    log.debug("search.query query=%r sender=%s", query_text, sender_phone)
 
     sender_phone = normalize_phone(sender_phone)
     if not sender_phone:
         return "Your number is not registered in the system."
 
-    print("DEBUG: Normalized sender phone:", sender_phone)
-
-    # Extract case number
-    match = re.search(r"\b(\d{3,10})\b", query_text)
-    case_id = match.group(1) if match else None
+    # Extract case number + intent
+    with timed("bot.intent_parse"):
+        match = re.search(r"\b(\d{3,10})\b", query_text)
+        case_id = match.group(1) if match else None
+        is_history = ("history" in query_text or
+                      "all hearings" in query_text or
+                      "hearing history" in query_text or
+                      "full history" in query_text)
+        is_next = "next hearing" in query_text or query_text == "hearing"
 
     # =========================
     # CASE HISTORY (FIRST!)
     # =========================
-    if ("history" in query_text or
-        "all hearings" in query_text or
-        "hearing history" in query_text or
-        "full history" in query_text):
-
-        cur.execute("""
-            SELECT case_id, hearing_date, hearing_time
-            FROM cases
-            WHERE phone = ?
-            ORDER BY hearing_date ASC
-        """, (sender_phone,))
-        rows = cur.fetchall()
-        conn.close()
+    if is_history:
+        incr("bot.intent.history")
+        with timed("bot.db"):
+            cur.execute("""
+                SELECT case_id, hearing_date, hearing_time
+                FROM cases
+                WHERE phone = ?
+                ORDER BY hearing_at ASC
+            """, (sender_phone,))
+            rows = cur.fetchall()
 
         if not rows:
             return "No hearing history found."
@@ -106,46 +112,37 @@ def search_case(query_text, sender_phone):
     # =========================
     # NEXT HEARING
     # =========================
-    if "next hearing" in query_text or query_text == "hearing":
-
-        cur.execute("""
-            SELECT case_id, hearing_date, hearing_time
-            FROM cases
-            WHERE phone = ?
-        """, (sender_phone,))
-        rows = cur.fetchall()
-        conn.close()
-
-        today = datetime.date.today()
-        upcoming = []
-
-        for cid, date_str, time_ in rows:
-            try:
-                d = datetime.date.fromisoformat(str(date_str).strip())
-                if d >= today:
-                    upcoming.append((d, cid, time_))
-            except:
-                pass
-
-        if not upcoming:
+    if is_next:
+        incr("bot.intent.next_hearing")
+        with timed("bot.db"):
+            cur.execute("""
+                SELECT case_id, hearing_date, hearing_time
+                FROM cases
+                WHERE phone = ? AND hearing_at >= ?
+                ORDER BY hearing_at ASC
+                LIMIT 1
+            """, (sender_phone, datetime.date.today().isoformat()))
+            row = cur.fetchone()
+
+        if row is None:
             return "You have no upcoming hearings."
 
-        upcoming.sort()
-        d, cid, t = upcoming[0]
+        cid, d, t = row
         return f"Your next hearing:\nCase {cid}\nDate: {d} at {t}"
 
     # =========================
     # CASE LOOKUP
     # =========================
     if case_id:
-        cur.execute("""
-            SELECT hearing_date, hearing_time
-            FROM cases
-            WHERE case_id = ?
-            ORDER BY hearing_date ASC
-        """, (case_id,))
-        rows = cur.fetchall()
-        conn.close()
+        incr("bot.intent.case")
+        with timed("bot.db"):
+            cur.execute("""
+                SELECT hearing_date, hearing_time
+                FROM cases
+                WHERE case_id = ?
+                ORDER BY hearing_at ASC
+            """, (case_id,))
+            rows = cur.fetchall()
 
         if not rows:
             return "Case not found."
@@ -155,11 +152,31 @@ def search_case(query_text, sender_phone):
             text += f"- {d} at {t}\n"
         return text.strip()
 
-    conn.close()
+    incr("bot.intent.unknown")
     return "I didn't understand. Try: 'next hearing', 'case history', or 'case 12345'."
 
 
 
+# ==========================================================
+#                   METRICS EXPORT
+# ==========================================================
+_LAST_METRICS_DUMP = 0.0
+
+
+def maybe_dump_metrics():
+    """
+    Write the metrics snapshot to METRICS_JSON_PATH every METRICS_DUMP_SECONDS.
+    """
+    global _LAST_METRICS_DUMP
+    if not METRICS_JSON_PATH or time.time() - _LAST_METRICS_DUMP < METRICS_DUMP_SECONDS:
+        return
+    _LAST_METRICS_DUMP = time.time()
+    try:
+        METRICS.dump_json(METRICS_JSON_PATH)
+    except OSError as e:
+        print("[METRICS] JSON dump failed:", e)
+
+
 # ==========================================================
 #                WHATSAPP BOT WITH SELENIUM
 # ==========================================================
@@ -167,6 +184,15 @@ def start_whatsapp_bot():
 
     print("\nStarting WhatsApp bot...\n")
 
+    # Queries use hearing_at (schema v6): upgrade an older cases.db first
+    ensure_schema(DB_FILE)
+
+    # Build the phone index once up front instead of on the first message
+    PHONE_INDEX.refresh(force=True)
+
+    if METRICS_PORT:
+        serve_prometheus(METRICS_PORT)
+
     options = Options()
     options.add_argument("--disable-infobars")
     options.add_argument("--start-maximized")
@@ -187,6 +213,7 @@ def start_whatsapp_bot():
 
     while True:
         time.sleep(1.5)
+        maybe_dump_metrics()
 
         try:
             # ---------------- Find message rows ----------------
@@ -213,37 +240,41 @@ def start_whatsapp_bot():
 
             print("\nNew message received:", msg_text)
             last_text = msg_text
+            incr("bot.messages")
 
             # ---------------- Extract sender phone ----------------
             data_id = latest_msg.get_attribute("data-id")
-            print("DEBUG: data-id:", data_id)
 
             sender_phone = None
             match = re.search(r"false_(\d+)@c\.us", data_id)
             if match:
                 sender_phone = "+" + match.group(1)
 
-            print("DEBUG: Extracted sender phone =", sender_phone)
+            log.debug("message.sender data_id=%s sender=%s", data_id, sender_phone)
 
             # ---------------- Compute reply ----------------
-            reply = search_case(msg_text.lower(), sender_phone)
-            print("DEBUG: Reply =", reply)
+            with timed("bot.search_case"):
+                reply = search_case(msg_text.lower(), sender_phone)
+            log.debug("message.reply reply=%r", reply)
 
             # ---------------- Send reply ----------------
-            input_box = driver.find_element(
-                By.XPATH,
-                "//div[@contenteditable='true' and contains(@aria-label,'Type')]"
-            )
-
-            input_box.click()
-            time.sleep(0.2)
-            input_box.send_keys(reply)
-            time.sleep(0.2)
-            input_box.send_keys(Keys.ENTER)
-
+            with timed("bot.selenium_send"):
+                input_box = driver.find_element(
+                    By.XPATH,
+                    "//div[@contenteditable='true' and contains(@aria-label,'Type')]"
+                )
+
+                input_box.click()
+                time.sleep(0.2)
+                input_box.send_keys(reply)
+                time.sleep(0.2)
+                input_box.send_keys(Keys.ENTER)
+
+            incr("bot.replies_sent")
             print("Sent reply.\n")
 
         except Exception as e:
+            incr("bot.errors")
             print("Error:", e)
             continue
 
@@ -252,4 +283,8 @@ def start_whatsapp_bot():
 #                        START BOT
 # ==========================================================
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=os.environ.get("BOT_LOG_LEVEL", "INFO").upper(),
+        format="[%(levelname)s] %(name)s: %(message)s",
+    )
     start_whatsapp_bot()
@@ -15,49 +15,144 @@
 #
 # DB REQUIREMENTS
 # Table: cases(client_name, phone, case_id, hearing_date, hearing_time)
-#   hearing_date must be ISO format: YYYY-MM-DD
+#   hearing_date must be ISO format: YYYY-MM-DD, hearing_time HH:MM
+#   (enforced by triggers since schema v6; import with import_cases.py)
 # Table: settings(key TEXT PRIMARY KEY, value TEXT)
 #   row: ('audio_enabled', 'true')  -- toggle from your admin UI (myapp.py)
+#   optional rows (override the defaults below, applied within ~1s):
+#     audio_only_for_keywords 'true'/'false', voice_keywords 'case, hearing, ...',
+#     reminder_days '2,1,0', poll_seconds '1.2'
 # ---------------------------------------------------------
 
-import os
 import re
+import threading
 import time
-import uuid
 import sqlite3
 import datetime
-from typing import Optional, List, Tuple
+from typing import TYPE_CHECKING, Optional, List
+
+# Selenium / webdriver_manager / gTTS are imported only when the browser or TTS
+# is actually used, so the reply engine (search_case, reminder planner) imports
+# in milliseconds and without those packages installed.
+if TYPE_CHECKING:
+    from selenium import webdriver
+
+from chat_scanner import ChatScanner
+from db_pool import get_connection
+from db_setup import ensure_schema
+from intents import INTENT_CASE, INTENT_HISTORY, INTENT_NEXT_HEARING, Intent, IntentMatcher
+from metrics import METRICS, observe, serve_prometheus, timed
+from message_observer import IncomingMessageObserver
+from phone_index import PhoneIndex, phone_last10
+from reminders import (
+    RecipientBatch,
+    mark_reminder_queued,
+    mark_reminder_sending,
+    mark_reminder_sent,
+    mark_reminder_failed,
+    prune_reminder_log,
+)
+from reminder_scheduler import FirePolicy, ReminderScheduler
+from reply_cache import ReplyCache, ReplyKey, prune_case_changes
+from reply_dispatcher import Reply, ReplyDispatcher
+from settings_store import Setting, SettingsStore, parse_bool, parse_float, parse_int_list, parse_str_list
+from sender_pool import SenderPool, selenium_session_factory
+from transport import SeleniumTransport, Transport
+from tts_cache import AudioPrewarmer, GTTSEngine, TTSCache
+
+# Selenium helpers used to live in this file; still importable from here
+# (loaded from whatsapp_web on first access).
+_WHATSAPP_WEB_EXPORTS = {
+    "CHROME_BINARY",
+    "build_driver",
+    "wait_for_whatsapp_ready",
+    "get_input_box",
+    "safe_send_text",
+    "send_audio_attachment",
+    "open_chat_by_phone",
+    "phone_to_whatsapp_send_number",
+}
 
-from gtts import gTTS
 
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+def __getattr__(name: str):
+    if name in _WHATSAPP_WEB_EXPORTS:
+        import whatsapp_web
 
-from webdriver_manager.chrome import ChromeDriverManager
+        return getattr(whatsapp_web, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 DB_FILE = "cases.db"
 
-# Chrome path (adjust if needed)
-CHROME_BINARY = r"C:\Program Files\Google\Chrome\Application\chrome.exe"
+# last10 -> DB phone, rebuilt only when cases.db changes (see phone_index.py)
+PHONE_INDEX = PhoneIndex(DB_FILE)
 
-# WhatsApp login wait
-QR_WAIT_SECONDS = 20
+# (client, intent, case_id, day) -> reply text; invalidated via the case_changes log
+REPLY_CACHE_MAX_ENTRIES = 4096
+REPLY_CACHE = ReplyCache(DB_FILE, max_entries=REPLY_CACHE_MAX_ENTRIES)
 
-# Poll interval for incoming messages
-POLL_SECONDS = 1.2
+# Telugu TTS audio cache (content-addressed, LRU-evicted beyond the size bound)
+AUDIO_CACHE_DIR = "audio_cache"
+AUDIO_CACHE_MAX_BYTES = 200 * 1024 * 1024
+TTS_CACHE = TTSCache(AUDIO_CACHE_DIR, engine=GTTSEngine(), max_bytes=AUDIO_CACHE_MAX_BYTES)
+
+# Background TTS workers that pre-generate the day's reminder audio
+REMINDER_AUDIO_WORKERS = 4
+AUDIO_PREWARMER = AudioPrewarmer(TTS_CACHE, workers=REMINDER_AUDIO_WORKERS, lang="te", slow=False)
+
+# Max wait for the QR scan / WhatsApp login (continues as soon as the UI is ready)
+QR_WAIT_SECONDS = 140
+
+# How reminders open a client's chat (see whatsapp_web.open_chat):
+#   "auto" -> in-app search box, then injected link, then full-reload URL fallback
+#   "url"  -> always reload web.whatsapp.com/send?phone=... (old behaviour)
+CHAT_NAV_MODE = "auto"
+
+# Bulk reminder fan-out over extra browser sessions (one Chrome profile each;
+# log every profile into WhatsApp once). Empty -> reminders go through the bot's
+# own browser. Recipients are sharded across sessions, each rate limited.
+SENDER_PROFILES: List[str] = []          # e.g. ["profiles/sender1", "profiles/sender2"]
+SENDER_RATE_PER_MINUTE = 12
 
-# Scheduled reminders check interval
-REMINDER_POLL_SECONDS = 30
+# Poll interval for incoming messages (default; settings row 'poll_seconds' overrides)
+# (in "observer" mode this is the long-poll timeout; new messages wake the bot immediately)
+POLL_SECONDS = 1.2
 
-# Which reminders to send (days before hearing)
+# Incoming message intake:
+#   "observer" -> MutationObserver queue drained in batches (every message, exactly once)
+#   "poll"     -> legacy XPath scan of the latest message every POLL_SECONDS
+INTAKE_MODE = "observer"
+
+# Unread-badge scan of the chat list (serves clients whose chat is not open); 0 = off
+UNREAD_SCAN_SECONDS = 2
+# Max time spent sending one scanned chat's text replies before moving on
+SCAN_REPLY_TIMEOUT_SECONDS = 10
+
+# When reminders go out (see reminder_scheduler.py): D-2 / D-1 at REMINDER_SEND_AT,
+# D-0 REMINDER_HOURS_BEFORE hours before the hearing (not before REMINDER_EARLIEST)
+REMINDER_SEND_AT = datetime.time(9, 0)
+REMINDER_HOURS_BEFORE = 3
+REMINDER_EARLIEST = datetime.time(7, 0)
+# Max reminder sends started per minute, summed over sessions (bursts are spread out)
+REMINDER_RATE_PER_MINUTE = SENDER_RATE_PER_MINUTE * max(1, len(SENDER_PROFILES))
+# How often the reminder timeline checks cases.db for new / changed hearings
+REMINDER_RESCAN_SECONDS = 30
+# A reminder whose audio is still being synthesized is retried this much later
+REMINDER_AUDIO_WAIT_SECONDS = 5
+
+# Print the per-step send/navigation timing table this often (0 = never)
+METRICS_REPORT_SECONDS = 600
+# Also write the metrics snapshot as JSON there ("" = off), and/or serve
+# Prometheus text on this port (0 = off). BOT_METRICS=0 disables recording.
+METRICS_JSON_PATH = ""
+METRICS_PORT = 0
+
+# Which reminders to send (days before hearing; settings row 'reminder_days', e.g. '2,1,0')
 REMINDER_DAYS = [2, 1, 0]
 
+# Day the scheduler last ran its start-of-day stage (ledger prune + audio pre-warm)
+_SCHEDULER_DAY: Optional[datetime.date] = None
+
 # If you only want audio for certain commands, set True and keep keywords below.
 # If False, audio will be sent for every bot reply (not recommended).
 AUDIO_ONLY_FOR_KEYWORDS = True
@@ -71,47 +166,84 @@ VOICE_KEYWORDS = [
     "full history",
     "case history",
     "hearing history",
+    "కేసు", "విచారణ", "చరిత్ర",      # Telugu: case, hearing, history
+    "केस", "सुनवाई", "इतिहास",       # Hindi: case, hearing, history
 ]
 
+# Query parser: intents (history / next hearing / case lookup) + voice keywords, one regex
+INTENT_MATCHER = IntentMatcher(voice_keywords=VOICE_KEYWORDS)
+
+# Admin-tunable settings (settings table rows override the defaults above).
+# Loaded once and re-read only when cases.db changes; see settings_store.py.
+SETTINGS = SettingsStore(DB_FILE, [
+    Setting("audio_enabled", True, parse_bool),
+    Setting("audio_only_for_keywords", AUDIO_ONLY_FOR_KEYWORDS, parse_bool),
+    Setting("voice_keywords", VOICE_KEYWORDS, parse_str_list),
+    Setting("reminder_days", REMINDER_DAYS, parse_int_list),
+    Setting("poll_seconds", POLL_SECONDS, parse_float),
+])
+
+
+def _rebuild_intent_matcher(voice_keywords: List[str]):
+    global INTENT_MATCHER
+    INTENT_MATCHER = IntentMatcher(voice_keywords=voice_keywords)
+
+
+SETTINGS.on_change("voice_keywords", _rebuild_intent_matcher)
+
+# Today's reminders on a timeline: each fires at its own time, idle in between
+REMINDER_SCHEDULER = ReminderScheduler(
+    DB_FILE,
+    REMINDER_DAYS,
+    FirePolicy(REMINDER_SEND_AT, REMINDER_HOURS_BEFORE, REMINDER_EARLIEST),
+    per_minute=REMINDER_RATE_PER_MINUTE,
+    rescan_seconds=REMINDER_RESCAN_SECONDS,
+)
+SETTINGS.on_change("reminder_days", REMINDER_SCHEDULER.set_reminder_days)
+
+
+def classify_message(msg_text: str) -> Intent:
+    """
+    INTENT_MATCHER.classify, with the matcher rebuilt first if voice_keywords changed.
+    """
+    SETTINGS.refresh()
+    with timed("bot.intent_parse"):
+        return INTENT_MATCHER.classify(msg_text)
+
 
 # ==========================================================
 #                    DB / SETTINGS
 # ==========================================================
-def db_conn():
-    return sqlite3.connect(DB_FILE)
+def db_conn() -> sqlite3.Connection:
+    """
+    Long-lived, thread-local pooled connection (WAL, tuned pragmas).
+    Never close it; wrap writes in `with conn:` to commit.
+    """
+    return get_connection(DB_FILE)
 
 
 def ensure_settings_table():
     conn = db_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS settings (
-            key TEXT PRIMARY KEY,
-            value TEXT
-        )
-    """)
-    cur.execute("""
-        INSERT OR IGNORE INTO settings(key, value)
-        VALUES ('audio_enabled', 'true')
-    """)
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        """)
+        conn.execute("""
+            INSERT OR IGNORE INTO settings(key, value)
+            VALUES ('audio_enabled', 'true')
+        """)
 
 
 def is_audio_enabled() -> bool:
     """
     Admin toggle comes from DB:
     settings(key='audio_enabled', value='true' or 'false')
+    Served from SETTINGS (no query; admin changes apply within a second).
     """
-    try:
-        conn = db_conn()
-        cur = conn.cursor()
-        cur.execute("SELECT value FROM settings WHERE key='audio_enabled'")
-        row = cur.fetchone()
-        conn.close()
-        return (row is not None) and (row[0].strip().lower() == "true")
-    except Exception:
-        return True  # safe default
+    return SETTINGS.get("audio_enabled")
 
 
 # ==========================================================
@@ -122,36 +254,12 @@ def normalize_phone(sender_phone: Optional[str]) -> Optional[str]:
     Match sender to DB phone using LAST 10 digits (India-friendly).
     WhatsApp data-id contains something like: false_919640733498@c.us_...
     DB might store +919640733498 or +91xxxxxxxxxx.
+    Lookup goes through the in-memory PHONE_INDEX (no DB round trip).
     """
-    if not sender_phone:
-        return None
-
-    sender_digits = re.sub(r"\D", "", sender_phone)
-    if len(sender_digits) < 10:
+    db_phone = PHONE_INDEX.lookup(sender_phone)
+    if db_phone is None:
         return None
-    sender_last10 = sender_digits[-10:]
-
-    conn = db_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT DISTINCT phone FROM cases")
-    db_phones = [r[0] for r in cur.fetchall()]
-    conn.close()
-
-    for db_phone in db_phones:
-        db_digits = re.sub(r"\D", "", str(db_phone))
-        if len(db_digits) >= 10 and db_digits[-10:] == sender_last10:
-            return str(db_phone).strip()
-
-    return None
-
-
-def phone_to_whatsapp_send_number(db_phone: str) -> str:
-    """
-    WhatsApp send URL expects countrycode+number digits without '+'
-    Example: +919640733498 -> 919640733498
-    """
-    digits = re.sub(r"\D", "", db_phone)
-    return digits
+    return str(db_phone).strip()
 
 
 # ==========================================================
@@ -212,99 +320,103 @@ def to_telugu(reply_text: str) -> str:
 # ==========================================================
 def text_to_audio_mp3(telugu_text: str) -> str:
     """
-    Generates MP3 using gTTS Telugu and returns absolute file path.
+    Returns absolute path of the Telugu MP3 for this text (gTTS on a cache miss).
+    The file belongs to TTS_CACHE: do not delete it after sending.
     """
-    uid = uuid.uuid4().hex
-    mp3_file = f"audio_{uid}.mp3"
-    tts = gTTS(text=telugu_text, lang="te", slow=False)
-    tts.save(mp3_file)
-    return os.path.abspath(mp3_file)
+    return TTS_CACHE.get(telugu_text, lang="te", slow=False)
 
 
 # ==========================================================
 #                 BOT SEARCH LOGIC (SQLite)
 # ==========================================================
-def search_case(query_text: str, sender_phone: Optional[str]) -> str:
+def search_case(query_text: str, sender_phone: Optional[str], intent: Optional[Intent] = None) -> str:
     """
     Commands supported:
       - "case 12345" / "12345"  -> all hearings for case_id
       - "next hearing" / "hearing" -> next upcoming hearing for THIS sender phone
       - "history" / "case history" / "all hearings" -> all hearing history for THIS sender phone
+    intent: classify_message(query_text), if the caller already has it.
     """
-    query_text = (query_text or "").lower().strip()
 
     # Normalize sender phone -> DB phone
     db_phone = normalize_phone(sender_phone)
     if not db_phone:
         return "Your number is not registered in the system."
 
-    conn = db_conn()
-    cur = conn.cursor()
+    if intent is None:
+        intent = classify_message(query_text)
+    if intent.name is None:
+        return "I didn't understand. Try: 'next hearing', 'case history', or 'case 12345'."
+
+    # Same (client, question, day) -> cached reply, until this client's / case's rows change
+    today = datetime.date.today()
+    key = ReplyKey(
+        phone_last10(db_phone),
+        intent.name,
+        intent.case_id if intent.name == INTENT_CASE else None,
+        today.isoformat(),
+    )
+    return REPLY_CACHE.get_or_compute(key, lambda: _timed_answer(intent, db_phone, today))
+
 
-    # Extract case ID if present
-    m = re.search(r"\b(\d{3,10})\b", query_text)
-    case_id = m.group(1) if m else None
+def _timed_answer(intent: Intent, db_phone: str, today: datetime.date) -> str:
+    with timed("bot.db"):
+        return answer_query(intent, db_phone, today)
+
+
+def answer_query(intent: Intent, db_phone: str, today: datetime.date) -> str:
+    """
+    Build the reply for a classified query from the cases table (uncached).
+    """
+    case_id = intent.case_id
+    cur = db_conn().cursor()
+
+    # Dates/times are stored typed and validated (db_setup v6): no parsing here.
 
     # 1) HISTORY (for this phone)
-    if any(k in query_text for k in ["history", "all hearings", "hearing history", "case history", "full history"]):
+    if intent.name == INTENT_HISTORY:
         cur.execute("""
             SELECT case_id, hearing_date, hearing_time
             FROM cases
             WHERE phone = ?
-            ORDER BY hearing_date ASC
+            ORDER BY hearing_at ASC
         """, (db_phone,))
         rows = cur.fetchall()
-        conn.close()
 
         if not rows:
             return "No hearing history found."
 
         out = ["Your Case Hearing History:"]
         for cid, d, t in rows:
-            out.append(f"Case {cid}: {str(d).strip()} at {str(t).strip()}")
+            out.append(f"Case {cid}: {d} at {t}")
         return "\n".join(out)
 
-    # 2) NEXT HEARING (for this phone)
-    if ("next hearing" in query_text) or (query_text == "hearing") or (query_text.endswith("hearing")):
-        cur.execute("""
+    # 2) NEXT HEARING (for this phone): first hearing from today on, via idx_cases_phone_hearing_at
+    if intent.name == INTENT_NEXT_HEARING:
+        row = cur.execute("""
             SELECT case_id, hearing_date, hearing_time
             FROM cases
-            WHERE phone = ?
-        """, (db_phone,))
-        rows = cur.fetchall()
-        conn.close()
-
-        if not rows:
-            return "No hearings scheduled for you."
-
-        today = datetime.date.today()
-        upcoming: List[Tuple[datetime.date, str, str]] = []
-
-        for cid, d, t in rows:
-            try:
-                dd = datetime.date.fromisoformat(str(d).strip())
-                if dd >= today:
-                    upcoming.append((dd, str(cid).strip(), str(t).strip()))
-            except Exception:
-                pass
+            WHERE phone = ? AND hearing_at >= ?
+            ORDER BY hearing_at ASC
+            LIMIT 1
+        """, (db_phone, today.isoformat())).fetchone()
 
-        if not upcoming:
-            return "You have no upcoming hearings."
+        if row is None:
+            has_any = cur.execute("SELECT 1 FROM cases WHERE phone = ? LIMIT 1", (db_phone,)).fetchone()
+            return "You have no upcoming hearings." if has_any else "No hearings scheduled for you."
 
-        upcoming.sort(key=lambda x: x[0])
-        dd, cid, tt = upcoming[0]
-        return f"Your next hearing:\nCase {cid}\nDate: {dd.isoformat()} at {tt}"
+        cid, d, t = row
+        return f"Your next hearing:\nCase {cid}\nDate: {d} at {t}"
 
     # 3) CASE LOOKUP (all hearings for case_id, not restricted by phone)
-    if case_id:
+    if intent.name == INTENT_CASE:
         cur.execute("""
             SELECT client_name, hearing_date, hearing_time
             FROM cases
             WHERE case_id = ?
-            ORDER BY hearing_date ASC
+            ORDER BY hearing_at ASC
         """, (case_id,))
         rows = cur.fetchall()
-        conn.close()
 
         if not rows:
             return "Case not found."
@@ -312,82 +424,21 @@ def search_case(query_text: str, sender_phone: Optional[str]) -> str:
         name = str(rows[0][0]).strip()
         out = [f"Case {case_id} Hearings:", f"Client: {name}"]
         for _, d, t in rows:
-            out.append(f"- {str(d).strip()} at {str(t).strip()}")
+            out.append(f"- {d} at {t}")
         return "\n".join(out)
 
-    conn.close()
     return "I didn't understand. Try: 'next hearing', 'case history', or 'case 12345'."
 
 
 # ==========================================================
-#                 SELENIUM HELPERS
+#                 MESSAGE HELPERS
 # ==========================================================
-def build_driver() -> webdriver.Chrome:
-    options = Options()
-    options.add_argument("--disable-infobars")
-    options.add_argument("--start-maximized")
-    options.binary_location = CHROME_BINARY
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    return driver
-
-
-def wait_for_whatsapp_ready(driver: webdriver.Chrome, timeout: int = 120):
-    """
-    Wait until WhatsApp Web is loaded and the message box is available.
-    """
-    WebDriverWait(driver, timeout).until(
-        EC.presence_of_element_located((By.XPATH, "//div[@contenteditable='true' and @role='textbox']"))
-    )
-
-
-def get_input_box(driver: webdriver.Chrome, timeout: int = 30):
-    return WebDriverWait(driver, timeout).until(
-        EC.presence_of_element_located((By.XPATH, "//div[@contenteditable='true' and @role='textbox']"))
-    )
-
-
-def safe_send_text(driver: webdriver.Chrome, text: str):
-    """
-    Avoid click-intercept issues by focusing via JS and using send_keys.
-    """
-    box = get_input_box(driver)
-    driver.execute_script("arguments[0].focus();", box)
-    time.sleep(0.05)
-    box.send_keys(text)
-    box.send_keys(Keys.ENTER)
-
-
-def send_audio_attachment(driver: webdriver.Chrome, audio_path: str, timeout: int = 30):
-    """
-    Reliable approach: send AUDIO as file attachment (MP3).
-    """
-    # Attach button
-    attach = WebDriverWait(driver, timeout).until(
-        EC.element_to_be_clickable((By.XPATH, "//button[contains(@aria-label,'Attach')]"))
-    )
-    attach.click()
-    time.sleep(0.4)
-
-    # File input
-    file_input = WebDriverWait(driver, timeout).until(
-        EC.presence_of_element_located((By.XPATH, "//input[@type='file']"))
-    )
-    file_input.send_keys(audio_path)
-    time.sleep(1.5)
-
-    # Send button for attachment preview (works reliably for files)
-    send_btn = WebDriverWait(driver, timeout).until(
-        EC.element_to_be_clickable((By.XPATH, "//button[contains(@aria-label,'Send')]"))
-    )
-    driver.execute_script("arguments[0].click();", send_btn)
-    time.sleep(0.6)
-
-
-def should_send_audio_for_message(msg_text: str) -> bool:
-    if not AUDIO_ONLY_FOR_KEYWORDS:
+def should_send_audio_for_message(msg_text: str, intent: Optional[Intent] = None) -> bool:
+    if not SETTINGS.get("audio_only_for_keywords"):
         return True
-    lt = (msg_text or "").lower()
-    return any(k in lt for k in VOICE_KEYWORDS)
+    if intent is None:
+        intent = classify_message(msg_text)
+    return intent.voice
 
 
 def extract_sender_phone_from_data_id(data_id: str) -> Optional[str]:
@@ -420,99 +471,405 @@ def build_telugu_reminder(case_id: str, hearing_date_iso: str, hearing_time: str
     return f"{prefix} కేసు నంబర్ {case_id}. తేదీ {date_te}. సమయం {hearing_time}."
 
 
-def fetch_reminders_for_date(target_date: datetime.date) -> List[Tuple[str, str, str, str]]:
+def build_batch_reminder_text(batch: RecipientBatch) -> str:
+    """
+    One text for all of a client's due reminders (single reminder keeps the classic wording).
+    """
+    if len(batch.reminders) == 1:
+        r = batch.reminders[0]
+        return (
+            f"Dear {batch.client_name},\n"
+            f"Reminder: Your hearing for Case {r.case_id} is on {r.hearing_date} at {r.hearing_time}.\n"
+            f"- Advocate Office"
+        )
+
+    lines = [f"Dear {batch.client_name},", "Reminder: Your upcoming hearings:"]
+    for r in batch.reminders:
+        lines.append(f"- Case {r.case_id} on {r.hearing_date} at {r.hearing_time}")
+    lines.append("- Advocate Office")
+    return "\n".join(lines)
+
+
+def build_batch_telugu_reminder(batch: RecipientBatch) -> str:
+    """
+    One Telugu TTS text (-> one audio file) for all of a client's due reminders.
+    """
+    return " ".join(
+        build_telugu_reminder(r.case_id, r.hearing_date, r.hearing_time, r.days_before)
+        for r in batch.reminders
+    )
+
+
+def prewarm_reminder_audio(now: datetime.datetime) -> int:
+    """
+    Start-of-day stage: queue TTS for every batch on REMINDER_SCHEDULER's
+    timeline on the background pool, so the send loop only attaches ready
+    files. Uses the scheduler's own batches (one per recipient and fire time)
+    and the send path's text builder, so the texts are the ones sent.
+    Returns how many reminder texts were queued.
+    """
+    AUDIO_PREWARMER.forget_done()
+    if not is_audio_enabled():
+        return 0
+
+    REMINDER_SCHEDULER.refresh(now)
+    texts = [build_batch_telugu_reminder(p.batch) for p in REMINDER_SCHEDULER.pending()]
+
+    AUDIO_PREWARMER.submit_many(texts)
+    print(f"[REMINDER] Pre-warming audio for {len(texts)} reminder message(s) of {now.date().isoformat()}")
+    return len(texts)
+
+
+def start_reminder_day(now: datetime.datetime):
+    """
+    Once per day: drop ledger rows for past hearings and old case_changes rows,
+    and pre-warm today's audio.
+    """
+    global _SCHEDULER_DAY
+
+    _SCHEDULER_DAY = now.date()
+    pruned = prune_reminder_log(db_conn(), now.date())
+    if pruned:
+        print(f"[REMINDER] Pruned {pruned} old reminder_log row(s)")
+    prune_case_changes(db_conn())
+    prewarm_reminder_audio(now)
+
+
+def deliver_reminder_batch(transport: Transport, batch: RecipientBatch, text_msg: str,
+                           audio_path: Optional[str]):
     """
-    Returns list of reminders:
-    (phone, client_name, case_id, hearing_time)
+    Send one recipient's coalesced reminder and record the outcome in reminder_log.
+    Runs on the scheduler thread, or on a sender-pool session thread; the
+    rows turn 'sending' only here, when the send actually starts.
     """
     conn = db_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT phone, client_name, case_id, hearing_time
-        FROM cases
-        WHERE hearing_date = ?
-    """, (target_date.isoformat(),))
-    rows = cur.fetchall()
-    conn.close()
-    return [(str(p).strip(), str(n).strip(), str(cid).strip(), str(t).strip()) for p, n, cid, t in rows]
+    case_ids = ", ".join(f"{r.case_id} (D-{r.days_before})" for r in batch.reminders)
+    for r in batch.reminders:
+        mark_reminder_sending(conn, r.key, datetime.datetime.now())
+    try:
+        transport.open_chat(batch.phone)
+        transport.send_text(text_msg)
+
+        if audio_path:
+            transport.send_audio(audio_path)
+
+        for r in batch.reminders:
+            mark_reminder_sent(conn, r.key, datetime.datetime.now())
+        print(f"[REMINDER] Sent to {batch.phone} for case {case_ids}")
+
+    except Exception as e:
+        for r in batch.reminders:
+            mark_reminder_failed(conn, r.key, datetime.datetime.now(), str(e))
+        print(f"[REMINDER] Failed for {batch.phone} case {case_ids}: {e}")
+        raise
+
+
+_LAST_METRICS_REPORT = time.time()
 
 
-def open_chat_by_phone(driver: webdriver.Chrome, db_phone: str):
+def maybe_report_metrics():
     """
-    Opens chat using WhatsApp 'send' URL (best for automation).
+    Print where the send path spends its time, every METRICS_REPORT_SECONDS
+    (and dump it to METRICS_JSON_PATH, if set).
     """
-    num = phone_to_whatsapp_send_number(db_phone)
-    url = f"https://web.whatsapp.com/send?phone={num}&text&app_absent=0"
-    driver.get(url)
-    wait_for_whatsapp_ready(driver, timeout=60)
+    global _LAST_METRICS_REPORT
+    if not METRICS_REPORT_SECONDS or time.time() - _LAST_METRICS_REPORT < METRICS_REPORT_SECONDS:
+        return
+    _LAST_METRICS_REPORT = time.time()
+    print("[METRICS]\n" + METRICS.report())
+    if METRICS_JSON_PATH:
+        try:
+            METRICS.dump_json(METRICS_JSON_PATH)
+        except OSError as e:
+            print("[METRICS] JSON dump failed:", e)
 
 
-def run_scheduler_tick(driver: webdriver.Chrome, now: datetime.datetime, last_sent_cache: set):
+def run_scheduler_tick(transport: Transport, now: datetime.datetime, sender_pool: Optional[SenderPool] = None):
     """
-    Checks reminders and sends if not already sent.
-    last_sent_cache stores keys (phone|case_id|date|days_before)
+    Sends the reminder batches REMINDER_SCHEDULER has due at `now` through
+    `transport`. Dedupe + retry state lives in the reminder_log table
+    (survives restarts); failed sends are retried with exponential backoff.
+    Call it when REMINDER_SCHEDULER.seconds_until_due() reaches 0.
+
+    Audio comes from AUDIO_PREWARMER; a reminder whose audio is still being
+    synthesized is deferred a few seconds instead of blocking the browser.
+
+    With a sender_pool, batches are sharded across its browser sessions and
+    this returns immediately (rows stay 'queued' until a session starts them).
     """
-    audio_enabled = is_audio_enabled()
+    if _SCHEDULER_DAY != now.date():
+        start_reminder_day(now)
 
-    for days_before in REMINDER_DAYS:
-        target_date = (now.date() + datetime.timedelta(days=days_before))
-        reminders = fetch_reminders_for_date(target_date)
+    conn = db_conn()
 
-        for phone, client_name, case_id, hearing_time in reminders:
-            cache_key = f"{phone}|{case_id}|{target_date.isoformat()}|{days_before}"
-            if cache_key in last_sent_cache:
-                continue
+    audio_enabled = is_audio_enabled() and transport.supports_audio
 
-            # Compose reminder
-            text_msg = (
-                f"Dear {client_name},\n"
-                f"Reminder: Your hearing for Case {case_id} is on {target_date.isoformat()} at {hearing_time}.\n"
-                f"- Advocate Office"
-            )
+    # 1) Batches whose fire time has come (one message per recipient, rate
+    #    limited by the scheduler); queue any audio not pre-warmed yet
+    batches = REMINDER_SCHEDULER.pop_due(now)
+    if audio_enabled:
+        AUDIO_PREWARMER.submit_many(build_batch_telugu_reminder(b) for b in batches)
 
-            telugu_msg = build_telugu_reminder(case_id, target_date.isoformat(), hearing_time, days_before)
+    # 2) Send (browser interaction only): one chat open, one text, one audio per client
+    for batch in batches:
+        text_msg = build_batch_reminder_text(batch)
+        telugu_msg = build_batch_telugu_reminder(batch)
 
-            # Send
-            try:
-                open_chat_by_phone(driver, phone)
-                safe_send_text(driver, text_msg)
+        try:
+            audio_path = None
+            if audio_enabled:
+                audio_path = AUDIO_PREWARMER.ready_path(telugu_msg)
+                if audio_path is None:
+                    # still synthesizing; back on the timeline shortly
+                    REMINDER_SCHEDULER.defer(batch, REMINDER_AUDIO_WAIT_SECONDS, now)
+                    continue
+        except Exception as e:
+            for r in batch.reminders:
+                mark_reminder_failed(conn, r.key, now, str(e))
+            print(f"[REMINDER] Audio failed for {batch.phone}: {e}")
+            continue
 
-                if audio_enabled:
-                    audio_path = text_to_audio_mp3(telugu_msg)
-                    send_audio_attachment(driver, audio_path)
-                    try:
-                        os.remove(audio_path)
-                    except Exception:
-                        pass
+        if sender_pool is not None:
+            for r in batch.reminders:
+                mark_reminder_queued(conn, r.key, now)
+            started = threading.Event()
 
-                last_sent_cache.add(cache_key)
-                print(f"[REMINDER] Sent to {phone} for case {case_id} (D-{days_before})")
+            def job(tr, b=batch, t=text_msg, a=audio_path, started=started):
+                started.set()
+                deliver_reminder_batch(tr, b, t, a)
 
-            except Exception as e:
-                print(f"[REMINDER] Failed for {phone} case {case_id}: {e}")
+            fut = sender_pool.submit(batch.phone, job)
+            fut.add_done_callback(lambda f, b=batch, started=started: _release_unstarted(f, b, started))
+            continue
+
+        try:
+            deliver_reminder_batch(transport, batch, text_msg, audio_path)
+        except Exception:
+            pass    # already logged + recorded as failed
+
+
+def _release_unstarted(fut, batch: RecipientBatch, started: threading.Event):
+    """
+    A queued batch whose session never ran it (session down) is recorded as
+    failed, so it is retried instead of waiting in 'queued' until a restart.
+    """
+    if started.is_set():
+        return
+    error = "cancelled" if fut.cancelled() else fut.exception()
+    if error is None:
+        return
+    for r in batch.reminders:
+        mark_reminder_failed(db_conn(), r.key, datetime.datetime.now(), str(error))
+    print(f"[REMINDER] Not sent to {batch.phone}: {error}")
 
 
 # ==========================================================
 #                 MAIN BOT LOOP
 # ==========================================================
+def plan_reply(msg_text: str, sender_phone: Optional[str]) -> Optional[Reply]:
+    """
+    Compute the reply for one incoming message: the text, plus the Telugu
+    speech text if a voice reply is due. None if there is nothing to send.
+    No browser access (runs on the dispatcher's reply worker).
+    """
+    intent = classify_message(msg_text)
+    reply = search_case(msg_text, sender_phone, intent)
+    if reply == msg_text:
+        return None
+
+    # Audio attachment (if enabled + keyword condition)
+    audio_text = None
+    if is_audio_enabled() and should_send_audio_for_message(msg_text, intent):
+        audio_text = to_telugu(reply)
+    return Reply(reply, audio_text)
+
+
+def reply_to_message(transport: Transport, msg_text: str, sender_phone: Optional[str]) -> Optional[str]:
+    """
+    Compute the reply for one incoming message and send it (text + optional
+    Telugu audio attachment) in the currently open chat of `transport`.
+    Synchronous; the observer loop uses the staged ReplyDispatcher instead.
+    Returns the reply text, or None if nothing was sent.
+    """
+    reply = plan_reply(msg_text, sender_phone)
+    if reply is None:
+        return None
+    print("Reply:", reply.text)
+
+    # Always send text reply
+    transport.send_text(reply.text)
+
+    if reply.audio_text and transport.supports_audio:
+        try:
+            audio_path = text_to_audio_mp3(reply.audio_text)
+            transport.send_audio(audio_path)
+            print("Audio attachment sent.")
+        except Exception as e:
+            print("Audio send failed:", e)
+
+    return reply.text
+
+
 def start_whatsapp_bot():
+    ensure_schema(DB_FILE)
     ensure_settings_table()
+    SETTINGS.refresh(force=True)
+    PHONE_INDEX.refresh(force=True)
+    if METRICS_PORT:
+        serve_prometheus(METRICS_PORT)
+
+    # Reminder audio is synthesized in the background while we wait for the QR scan
+    start_reminder_day(datetime.datetime.now())
+
+    from whatsapp_web import build_driver, wait_for_whatsapp_ready
 
     print("\nStarting WhatsApp bot...\n")
     driver = build_driver()
 
     driver.get("https://web.whatsapp.com")
-    print(f"Please scan the QR code (wait ~{QR_WAIT_SECONDS}s)...")
-    time.sleep(QR_WAIT_SECONDS)
+    print(f"Please scan the QR code if asked (waiting up to {QR_WAIT_SECONDS}s)...")
 
-    # After QR scan, wait for the UI to be ready
+    # Continue as soon as the chat UI is ready (immediately with a saved login)
     try:
-        wait_for_whatsapp_ready(driver, timeout=120)
+        wait_for_whatsapp_ready(driver, timeout=QR_WAIT_SECONDS)
     except Exception:
         print("WhatsApp Web not ready. Please ensure QR is scanned and chat UI is visible.")
         return
 
-    print("\nBot is listening for messages...\n")
+    sender_pool = None
+    if SENDER_PROFILES:
+        print(f"Starting {len(SENDER_PROFILES)} reminder sender session(s)...")
+        sender_pool = SenderPool(
+            [selenium_session_factory(p, nav_mode=CHAT_NAV_MODE) for p in SENDER_PROFILES],
+            per_minute=SENDER_RATE_PER_MINUTE,
+        )
+        sender_pool.start()
+
+    print(f"\nBot is listening for messages ({INTAKE_MODE} mode)...\n")
+
+    if INTAKE_MODE == "observer":
+        run_observer_loop(driver, sender_pool)
+    else:
+        run_polling_loop(driver, sender_pool)
+
+
+def serve_unread_chats(scanner: ChatScanner, dispatcher: ReplyDispatcher, transport: Transport) -> int:
+    """
+    Visit every chat with an unread badge (longest waiting first), answer all
+    its new messages in one batch and move on; audio replies follow later
+    through the dispatcher. Records scan.time_to_first_reply (scan -> first
+    reply of the cycle). Returns the number of messages handled.
+    """
+    chats = scanner.scan()
+    if not chats:
+        return 0
+    detected_at = time.monotonic()
+    handled = 0
+    first_reply_seen = False
+
+    # Answer the open chat first: its queued messages lose their rows once we switch away
+    for msg in scanner.observer.drain():
+        if msg.text:
+            print("\nNew message:", msg.text)
+            dispatcher.submit(msg.text, extract_sender_phone_from_data_id(msg.data_id))
+    dispatcher.flush_texts(transport, SCAN_REPLY_TIMEOUT_SECONDS)
+
+    for chat in chats:
+        if not dispatcher.accepting():
+            break      # reply queue full: the rest keep their badge for the next scan
+        messages = [m for m in scanner.open_and_claim(chat) if m.text]
+        for msg in messages:
+            print(f"\nNew message ({chat.title}):", msg.text)
+            dispatcher.submit(msg.text, extract_sender_phone_from_data_id(msg.data_id), received_at=detected_at)
+        handled += len(messages)
+
+        first_sent_at = dispatcher.flush_texts(transport, SCAN_REPLY_TIMEOUT_SECONDS)
+        if first_sent_at is not None and not first_reply_seen:
+            first_reply_seen = True
+            observe("scan.time_to_first_reply", first_sent_at - detected_at)
+
+    return handled
+
+
+def run_observer_loop(driver: "webdriver.Chrome", sender_pool: Optional[SenderPool] = None):
+    """
+    Event-driven intake: a MutationObserver queues every new incoming row and
+    we drain the queue in batches (long-poll, so replies start within ~ms of
+    the message rendering). Messages are handled exactly once, in order.
+
+    This thread owns the browser: it only reads messages and sends. Reply
+    computation and TTS run on the ReplyDispatcher's workers, so a slow voice
+    reply no longer stops intake or delays the reminder ticks.
+
+    Other chats are served by an unread-badge scan every UNREAD_SCAN_SECONDS.
+    """
+    observer = IncomingMessageObserver(driver)
+    observer.install()
+    transport = SeleniumTransport(driver, nav_mode=CHAT_NAV_MODE, observer=observer)
+
+    dispatcher = ReplyDispatcher(plan_reply, text_to_audio_mp3)
+    dispatcher.start()
+    scanner = ChatScanner(driver, observer)
+
+    last_unread_scan = 0.0
+
+    while True:
+        poll_seconds = SETTINGS.get("poll_seconds")
+
+        # ------------- Scheduled reminders (only when one is due) -------------
+        now_ts = time.time()
+        now = datetime.datetime.now()
+        if REMINDER_SCHEDULER.seconds_until_due(now) <= 0:
+            try:
+                run_scheduler_tick(transport, now, sender_pool)
+            except Exception as e:
+                print("[REMINDER] Scheduler tick error:", e)
+            # In-app navigation keeps the observer (the transport claims each opened
+            # chat's history); only the URL fallback reloads the page -> re-inject
+            try:
+                observer.install()
+            except Exception as e:
+                print("Observer install error:", e)
+        maybe_report_metrics()
+
+        # ------------- Send replies that are ready -------------
+        dispatcher.run_sends(transport)
+
+        # ------------- Other chats with unread messages -------------
+        if UNREAD_SCAN_SECONDS and now_ts - last_unread_scan >= UNREAD_SCAN_SECONDS:
+            last_unread_scan = now_ts
+            try:
+                serve_unread_chats(scanner, dispatcher, transport)
+            except Exception as e:
+                print("[SCAN] Unread scan error:", e)
+
+        # ------------- Incoming message intake -------------
+        if not dispatcher.accepting():
+            # Reply queue full: leave new messages queued in the page for now
+            dispatcher.run_sends(transport, wait=poll_seconds)
+            continue
+
+        try:
+            batch = observer.wait(dispatcher.poll_timeout(poll_seconds))
+        except Exception as e:
+            print("Observer drain error:", e)
+            time.sleep(poll_seconds)
+            continue
+
+        for msg in batch:
+            if not msg.text:
+                continue
+            print("\nNew message:", msg.text)
+            dispatcher.submit(msg.text, extract_sender_phone_from_data_id(msg.data_id))
+
+
+def run_polling_loop(driver: "webdriver.Chrome", sender_pool: Optional[SenderPool] = None):
+    """
+    Legacy intake: XPath over the DOM every POLL_SECONDS, latest message only.
+    """
+    from selenium.webdriver.common.by import By
+
+    transport = SeleniumTransport(driver, nav_mode=CHAT_NAV_MODE)
 
     # Initialize last seen message id to avoid replying to old messages
     last_seen_message_id = None
@@ -523,22 +880,19 @@ def start_whatsapp_bot():
     except Exception:
         pass
 
-    # Scheduler state
-    last_scheduler_check = 0.0
-    last_sent_cache = set()
     last_bot_reply = None
 
     while True:
-        time.sleep(POLL_SECONDS)
+        time.sleep(SETTINGS.get("poll_seconds"))
 
-        # ------------- Scheduled reminders tick -------------
-        now_ts = time.time()
-        if now_ts - last_scheduler_check >= REMINDER_POLL_SECONDS:
-            last_scheduler_check = now_ts
+        # ------------- Scheduled reminders (only when one is due) -------------
+        now = datetime.datetime.now()
+        if REMINDER_SCHEDULER.seconds_until_due(now) <= 0:
             try:
-                run_scheduler_tick(driver, datetime.datetime.now(), last_sent_cache)
+                run_scheduler_tick(transport, now, sender_pool)
             except Exception as e:
                 print("[REMINDER] Scheduler tick error:", e)
+        maybe_report_metrics()
 
         # ------------- Incoming message processing -------------
         try:
@@ -570,30 +924,9 @@ def start_whatsapp_bot():
             # sender phone from data-id
             sender_phone = extract_sender_phone_from_data_id(msg_id)
 
-            # Compute reply
-            reply = search_case(msg_text, sender_phone)
-            print("Reply:", reply)
-            if reply == msg_text:
-                continue
-            last_bot_reply = reply
-
-            # Always send text reply
-            safe_send_text(driver, reply)
-
-            # Audio attachment (if enabled + keyword condition)
-            audio_enabled = is_audio_enabled()
-            if audio_enabled and should_send_audio_for_message(msg_text):
-                try:
-                    telugu = to_telugu(reply)
-                    audio_path = text_to_audio_mp3(telugu)
-                    send_audio_attachment(driver, audio_path)
-                    try:
-                        os.remove(audio_path)
-                    except Exception:
-                        pass
-                    print("Audio attachment sent.")
-                except Exception as e:
-                    print("Audio send failed:", e)
+            reply = reply_to_message(transport, msg_text, sender_phone)
+            if reply is not None:
+                last_bot_reply = reply
 
         except Exception as e:
             print("Loop error:", e)
@@ -0,0 +1,274 @@
+# message_observer.py
+# Event-driven incoming message intake for WhatsApp Web.
+#
+# Instead of running an XPath over the whole DOM every POLL_SECONDS and only
+# looking at messages[-1], a MutationObserver is injected into the page. It
+# pushes the data-id of every new incoming row into a JS-side queue, and Python
+# drains that queue in batches (optionally long-polling with
+# execute_async_script, so a new message wakes the bot immediately).
+#
+# Every incoming message is handed out exactly once: the page keeps a `seen`
+# set and Python keeps a bounded one as well, so re-rendered rows and observer
+# re-installs (after driver.get / chat reloads) do not cause double replies.
+#
+# Try it without WhatsApp:
+#   python message_observer.py            # opens whatsapp_stub.html and checks delivery
+
+import os
+import time
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional
+
+from metrics import incr
+
+
+class IncomingMessage(NamedTuple):
+    data_id: str
+    text: Optional[str]   # None for rows without text (media, stickers, ...)
+
+
+# Rows whose text has not rendered after this many drains are released with text=None.
+# The text is captured as soon as it renders, so a row that leaves the DOM
+# afterwards (chat switch) is still answered.
+TEXT_RETRY_DRAINS = 3
+
+_INSTALL_JS = r"""
+var retryDrains = arguments[0];
+if (window.__advbot && window.__advbot.observer) { return false; }
+
+var state = window.__advbot = {queue: [], seen: {}, observer: null, waiter: null, retryDrains: retryDrains};
+
+state.textOf = function (row) {
+    var span = row ? row.querySelector("span[data-testid='selectable-text'] span") : null;
+    return span ? span.innerText : null;
+};
+
+function isIncomingRow(el) {
+    if (!el || el.nodeType !== 1 || !el.hasAttribute('data-id')) { return false; }
+    var id = el.getAttribute('data-id');
+    if (!id || id.indexOf('true_') === 0) { return false; }
+    return !!el.querySelector('.message-in');
+}
+
+function rowsUnder(node) {
+    var found = [];
+    if (node.nodeType !== 1) { return found; }
+    if (isIncomingRow(node)) { found.push(node); }
+    var inner = node.querySelectorAll('div[data-id]');
+    for (var i = 0; i < inner.length; i++) {
+        if (isIncomingRow(inner[i])) { found.push(inner[i]); }
+    }
+    return found;
+}
+
+// Messages already on screen are history, not new work.
+var existing = rowsUnder(document.body);
+for (var i = 0; i < existing.length; i++) { state.seen[existing[i].getAttribute('data-id')] = 1; }
+
+state.observer = new MutationObserver(function (mutations) {
+    var pushed = false;
+    for (var m = 0; m < mutations.length; m++) {
+        var added = mutations[m].addedNodes;
+        for (var n = 0; n < added.length; n++) {
+            var rows = rowsUnder(added[n]);
+            for (var r = 0; r < rows.length; r++) {
+                var id = rows[r].getAttribute('data-id');
+                if (state.seen[id]) { continue; }
+                state.seen[id] = 1;
+                state.queue.push({id: id, tries: 0, text: null});
+                pushed = true;
+            }
+        }
+    }
+    // Capture text while the rows are on screen (it may render after the row)
+    for (var q = 0; q < state.queue.length; q++) {
+        var item = state.queue[q];
+        if (item.text === null) {
+            item.text = state.textOf(document.querySelector('div[data-id="' + item.id + '"]'));
+        }
+    }
+    if (pushed && state.waiter) {
+        var w = state.waiter;
+        state.waiter = null;
+        w();
+    }
+});
+state.observer.observe(document.body, {childList: true, subtree: true});
+return true;
+"""
+
+# Shared by the sync and async drain scripts. Returns null if the observer is
+# gone (page reloaded) so Python knows to re-install.
+_DRAIN_FN_JS = r"""
+function __advbotDrain(maxBatch) {
+    var state = window.__advbot;
+    if (!state || !state.observer) { return null; }
+    var out = [], keep = [];
+    for (var i = 0; i < state.queue.length; i++) {
+        var item = state.queue[i];
+        if (out.length >= maxBatch) { keep.push(item); continue; }
+        var row = document.querySelector('div[data-id="' + item.id + '"]');
+        var text = row ? state.textOf(row) : null;
+        if (text === null) { text = item.text; }
+        if (text === null && row && item.tries < state.retryDrains) {
+            item.tries += 1;      // text not rendered yet, try next drain
+            keep.push(item);
+            continue;
+        }
+        out.push([item.id, text, !row]);
+    }
+    state.queue = keep;
+    return out;
+}
+"""
+
+_DRAIN_JS = _DRAIN_FN_JS + "return __advbotDrain(arguments[0]);"
+
+# Switching chats renders that chat's history, which the observer would take
+# for new messages. Marks every rendered incoming row as seen (dropping it from
+# the queue) and returns the last arguments[0] of them, in one script so a
+# message arriving meanwhile is either claimed here or queued, never lost.
+_CLAIM_RENDERED_JS = r"""
+var lastN = arguments[0], state = window.__advbot;
+var rows = [], nodes = document.querySelectorAll('#main div[data-id]');
+for (var i = 0; i < nodes.length; i++) {
+    var id = nodes[i].getAttribute('data-id');
+    if (id && id.indexOf('true_') !== 0 && nodes[i].querySelector('.message-in')) { rows.push(nodes[i]); }
+}
+var claimed = {};
+for (var r = 0; r < rows.length; r++) { claimed[rows[r].getAttribute('data-id')] = 1; }
+if (state && state.observer) {
+    for (var id2 in claimed) { state.seen[id2] = 1; }
+    state.queue = state.queue.filter(function (item) { return !claimed[item.id]; });
+}
+var out = [];
+for (var k = Math.max(0, rows.length - lastN); k < rows.length; k++) {
+    var span = rows[k].querySelector("span[data-testid='selectable-text'] span");
+    out.push([rows[k].getAttribute('data-id'), span ? span.innerText : null]);
+}
+return out;
+"""
+
+_WAIT_DRAIN_JS = _DRAIN_FN_JS + r"""
+var maxBatch = arguments[0], waitMs = arguments[1], done = arguments[arguments.length - 1];
+var state = window.__advbot;
+if (!state || !state.observer) { done(null); return; }
+if (state.queue.length) { done(__advbotDrain(maxBatch)); return; }
+var timer = setTimeout(function () { state.waiter = null; done(__advbotDrain(maxBatch)); }, waitMs);
+state.waiter = function () { clearTimeout(timer); done(__advbotDrain(maxBatch)); };
+"""
+
+
+class IncomingMessageObserver:
+    """
+    Python side of the MutationObserver queue.
+
+        observer = IncomingMessageObserver(driver)
+        observer.install()
+        while True:
+            for msg in observer.wait(POLL_SECONDS):
+                handle(msg)
+    """
+
+    def __init__(self, driver, max_batch: int = 50, seen_limit: int = 5000):
+        self.driver = driver
+        self.max_batch = max_batch
+        self.seen_limit = seen_limit
+        self._seen = OrderedDict()
+
+    def install(self) -> bool:
+        """
+        Inject the observer (no-op if already installed). Returns True if a new
+        observer was installed, i.e. after the first call or a page reload.
+        """
+        return bool(self.driver.execute_script(_INSTALL_JS, TEXT_RETRY_DRAINS))
+
+    def drain(self) -> List[IncomingMessage]:
+        """
+        Non-blocking: returns whatever is queued right now.
+        """
+        raw = self.driver.execute_script(_DRAIN_JS, self.max_batch)
+        if raw is None:
+            self.install()
+            return []
+        return self._accept(raw)
+
+    def wait(self, timeout: float) -> List[IncomingMessage]:
+        """
+        Long-poll: returns as soon as at least one message is queued, or an
+        empty list after `timeout` seconds.
+        """
+        wait_ms = int(timeout * 1000)
+        self.driver.set_script_timeout(timeout + 5)
+        raw = self.driver.execute_async_script(_WAIT_DRAIN_JS, self.max_batch, wait_ms)
+        if raw is None:
+            self.install()
+            return []
+        return self._accept(raw)
+
+    def claim_rendered(self, last_n: int) -> List[IncomingMessage]:
+        """
+        After opening another chat: mark its rendered messages as handled and
+        return the last `last_n` of them (the unread ones), oldest first.
+        """
+        if last_n <= 0:
+            self.driver.execute_script(_CLAIM_RENDERED_JS, 0)
+            return []
+        return self._accept(self.driver.execute_script(_CLAIM_RENDERED_JS, last_n))
+
+    def _accept(self, raw) -> List[IncomingMessage]:
+        batch = []
+        for data_id, text, *rest in raw:
+            if data_id in self._seen:
+                continue
+            if text is None and rest and rest[0]:
+                # Row left the DOM before its text was ever rendered
+                incr("observer.text_lost")
+                print(f"[OBSERVER] Message {data_id} left the page before its text rendered; not answered")
+            self._seen[data_id] = True
+            if len(self._seen) > self.seen_limit:
+                self._seen.popitem(last=False)
+            batch.append(IncomingMessage(data_id, text.strip() if text is not None else None))
+        return batch
+
+
+# ==========================================================
+#        SELF-CHECK AGAINST THE STATIC WHATSAPP STAND-IN
+# ==========================================================
+STUB_HTML = os.path.join(os.path.dirname(os.path.abspath(__file__)), "whatsapp_stub.html")
+
+
+def run_stub_check(driver, burst: int = 200, timeout: float = 10.0) -> dict:
+    """
+    Loads whatsapp_stub.html, injects `burst` incoming messages in quick
+    succession and verifies each is delivered exactly once.
+    """
+    driver.get("file://" + STUB_HTML)
+    observer = IncomingMessageObserver(driver)
+    observer.install()
+
+    started = time.time()
+    driver.execute_script("window.stubBurst(arguments[0]);", burst)
+
+    received = []
+    deadline = started + timeout
+    while len(received) < burst and time.time() < deadline:
+        received.extend(observer.wait(0.5))
+
+    ids = [m.data_id for m in received]
+    return {
+        "expected": burst,
+        "received": len(ids),
+        "duplicates": len(ids) - len(set(ids)),
+        "seconds": round(time.time() - started, 3),
+    }
+
+
+if __name__ == "__main__":
+    from selenium import webdriver
+
+    drv = webdriver.Chrome()
+    try:
+        print(run_stub_check(drv))
+    finally:
+        drv.quit()
@@ -0,0 +1,256 @@
+# metrics.py
+# In-process timing histograms and counters.
+#
+#   with timed("send_text.bubble"):
+#       ...
+#   observe("tts.synthesize", seconds)
+#   set_gauge("dispatch.send.depth", queue.qsize())
+#   print(METRICS.report())
+#
+# Histograms use fixed millisecond buckets, so recording is one bisect + two
+# additions under a lock; percentiles are estimated from the buckets.
+#
+# Export:
+#   serve_prometheus(9464)        # GET /metrics, Prometheus text format
+#   METRICS.dump_json(path)       # snapshot for log shippers / cron jobs
+#
+# BOT_METRICS=0 (or METRICS.enabled = False) turns recording off: every call
+# returns after one attribute check and timed() hands out a shared no-op.
+
+import bisect
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is open-ended.
+BUCKETS_MS: List[float] = [1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+
+
+class Histogram:
+    def __init__(self, buckets_ms: List[float] = BUCKETS_MS):
+        self.bounds = list(buckets_ms)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe_ms(self, ms: float):
+        self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile_ms(self, pct: float) -> float:
+        """
+        Upper bound of the bucket holding the pct-th observation (max for the open bucket).
+        """
+        if not self.count:
+            return 0.0
+        target = pct / 100 * self.count
+        running = 0
+        for i, c in enumerate(self.counts):
+            running += c
+            if running >= target and c:
+                return min(self.bounds[i], self.max_ms) if i < len(self.bounds) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile_ms(50),
+            "p90_ms": self.percentile_ms(90),
+            "p99_ms": self.percentile_ms(99),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": dict(zip([str(b) for b in self.bounds] + ["+Inf"], self.counts)),
+        }
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "t0")
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.t0)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+
+    def observe(self, name: str, seconds: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram()
+            hist.observe_ms(seconds * 1000)
+
+    def incr(self, name: str, value: float = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        """
+        Current value of something (queue depth, ...); also tracks `<name>.max`.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.gauges[name] = value
+            peak = name + ".max"
+            if value > self.gauges.get(peak, float("-inf")):
+                self.gauges[peak] = value
+
+    def timed(self, name: str):
+        """
+        Context manager recording the block's duration under `name`.
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "histograms": {k: h.snapshot() for k, h in sorted(self.histograms.items())},
+                "counters": dict(sorted(self.counters.items())),
+                "gauges": dict(sorted(self.gauges.items())),
+            }
+
+    def report(self) -> str:
+        """
+        Human-readable per-step table (where the time goes).
+        """
+        snap = self.snapshot()
+        lines = [f"{'step':<32} {'count':>7} {'mean':>9} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>9}"]
+        for name, h in snap["histograms"].items():
+            lines.append(
+                f"{name:<32} {h['count']:>7} {h['mean_ms']:>8.1f}ms {h['p50_ms']:>6.0f}ms "
+                f"{h['p90_ms']:>6.0f}ms {h['p99_ms']:>6.0f}ms {h['max_ms']:>7.0f}ms"
+            )
+        for name, value in list(snap["counters"].items()) + list(snap["gauges"].items()):
+            lines.append(f"{name:<32} {value:>7g}")
+        return "\n".join(lines)
+
+    def prometheus_text(self, prefix: str = "advbot") -> str:
+        """
+        Prometheus text exposition: histograms in seconds (_bucket/_sum/_count),
+        counters as <name>_total, gauges as-is.
+        """
+        with self._lock:
+            hists = [(k, list(h.bounds), list(h.counts), h.total_ms, h.count) for k, h in sorted(self.histograms.items())]
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+
+        lines = []
+        for name, bounds, counts, total_ms, count in hists:
+            metric = _prom_name(prefix, name) + "_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            running = 0
+            for bound, c in zip(bounds, counts):
+                running += c
+                lines.append(f'{metric}_bucket{{le="{bound / 1000:g}"}} {running}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {count}')
+            lines.append(f"{metric}_sum {total_ms / 1000:.6f}")
+            lines.append(f"{metric}_count {count}")
+        for name, value in counters:
+            metric = _prom_name(prefix, name) + "_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value:g}")
+        for name, value in gauges:
+            metric = _prom_name(prefix, name)
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def dump_json(self, path: str):
+        """
+        Write snapshot() (+ a timestamp) to `path` atomically.
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(dict(self.snapshot(), ts=time.time()), f)
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self.counters = {}
+            self.gauges = {}
+
+
+def _prom_name(prefix: str, name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", f"{prefix}_{name}")
+
+
+METRICS = Metrics(enabled=os.environ.get("BOT_METRICS", "1") != "0")
+
+# Module-level shortcuts
+observe = METRICS.observe
+incr = METRICS.incr
+set_gauge = METRICS.set_gauge
+timed = METRICS.timed
+
+
+# ==========================================================
+#                 PROMETHEUS ENDPOINT
+# ==========================================================
+def serve_prometheus(port: int, host: str = "127.0.0.1", metrics: Optional[Metrics] = None) -> ThreadingHTTPServer:
+    """
+    Serve GET /metrics on a daemon thread. Returns the server (call shutdown() to stop).
+    """
+    source = metrics or METRICS
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = source.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass    # no access log on stdout
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"[METRICS] Prometheus endpoint on http://{host}:{server.server_address[1]}/metrics")
+    return server
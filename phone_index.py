@@ -0,0 +1,128 @@
+# phone_index.py
+# In-memory LAST-10-DIGITS -> DB phone index used by normalize_phone().
+#
+# The bots used to run "SELECT phone FROM cases" and regex-strip every row on
+# every incoming message. This index is built once and then patched from the
+# case_changes log (db_setup v4) for just the phones that changed, so a sender
+# lookup is a single dict access. Writes to other tables (reminder_log,
+# settings) cost one pragma call and an empty log read, not a rebuild.
+
+import re
+import sqlite3
+import threading
+from typing import Dict, Iterable, Optional
+
+from db_pool import DataVersionWatcher
+
+# More changed phones than this in one refresh: rebuild instead of patching
+MAX_PATCHED_PHONES = 1000
+
+
+def phone_last10(phone) -> Optional[str]:
+    """
+    LAST 10 digits of a phone (India-friendly), or None if too short.
+    +919640733498 -> 9640733498
+    """
+    if phone is None:
+        return None
+    digits = re.sub(r"\D", "", str(phone))
+    if len(digits) < 10:
+        return None
+    return digits[-10:]
+
+
+def register_sql_functions(conn: sqlite3.Connection):
+    """
+    Make phone_last10(x) callable from SQL on `conn`. The cases triggers
+    (db_setup) maintain cases.phone_last10 with it, so the stored key is
+    always the Python one; every connection that writes `cases` needs it
+    (db_pool.open_connection and db_setup.ensure_schema register it).
+    """
+    conn.create_function("phone_last10", 1, phone_last10, deterministic=True)
+
+
+class PhoneIndex:
+    """
+    last10 -> phone exactly as stored in cases.phone.
+
+    Invalidation uses a DataVersionWatcher (db_pool): it notices whenever
+    another connection commits to the DB file (admin UI, importer, db_setup),
+    so a lookup only costs one pragma call plus a dict lookup and never opens
+    a connection. On a change, only
+    the phones listed in case_changes since the last refresh are re-read.
+    """
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._watcher = DataVersionWatcher(db_file)
+        self._last_seq = 0
+        self._index: Dict[str, str] = {}
+
+    def refresh(self, force: bool = False):
+        """
+        Bring the index up to date if the DB changed since the last refresh
+        (full rebuild if forced).
+        """
+        with self._lock:
+            started = self._watcher.started
+            if not self._watcher.changed() and not force:
+                return
+
+            conn = self._watcher.connection()
+            if force or not started:
+                self._rebuild_locked(conn)
+            else:
+                rows = conn.execute(
+                    "SELECT seq, phone_last10, case_id FROM case_changes WHERE seq > ? ORDER BY seq",
+                    (self._last_seq,),
+                ).fetchall()
+                if rows:
+                    # NULL phone_last10 alone: a phone too short to look up
+                    keys = {key for _, key, _ in rows if key is not None}
+                    if (rows[0][0] > self._last_seq + 1 or len(keys) > MAX_PATCHED_PHONES
+                            or any(key is None and case_id is None for _, key, case_id in rows)):
+                        # Log pruned past us, "everything changed" marker, or a bulk change
+                        self._rebuild_locked(conn)
+                    else:
+                        self._patch_locked(conn, keys)
+                        self._last_seq = rows[-1][0]
+
+    def _rebuild_locked(self, conn: sqlite3.Connection):
+        self._last_seq = conn.execute("SELECT coalesce(max(seq), 0) FROM case_changes").fetchone()[0]
+        index: Dict[str, str] = {}
+        for (db_phone,) in conn.execute("SELECT phone FROM cases"):
+            key = phone_last10(db_phone)
+            # First row wins, same as the old linear scan.
+            if key is not None and key not in index:
+                index[key] = db_phone
+        self._index = index
+
+    def _patch_locked(self, conn: sqlite3.Connection, keys: Iterable[str]):
+        index = self._index
+        for key in keys:
+            row = conn.execute(
+                "SELECT phone FROM cases WHERE phone_last10 = ? ORDER BY id LIMIT 1", (key,)
+            ).fetchone()
+            if row is None:
+                index.pop(key, None)
+            else:
+                index[key] = row[0]
+
+    def lookup(self, sender_phone: Optional[str]) -> Optional[str]:
+        """
+        Returns the DB phone for this sender, or None if not registered.
+        """
+        key = phone_last10(sender_phone)
+        if key is None:
+            return None
+        self.refresh()
+        return self._index.get(key)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def close(self):
+        with self._lock:
+            self._watcher.close()
+            self._last_seq = 0
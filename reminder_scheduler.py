@@ -0,0 +1,227 @@
+# reminder_scheduler.py
+# Time-of-day aware reminder scheduling.
+#
+# The bots used to poll every 30s / every minute and send a reminder as soon
+# as its date matched (all of the day's reminders right after midnight or
+# startup, in one burst). ReminderScheduler gives every reminder an exact fire
+# time from a FirePolicy and keeps the day's batches in a heap:
+#
+#   D-2 / D-1   at policy.send_at (e.g. 09:00)
+#   D-0         policy.hours_before hearing_time, not before policy.earliest
+#   retries     not before reminder_log.next_attempt_at (backoff)
+#
+# Batches that fall due together are spread out: at most `per_minute` sends
+# per minute, each on its own slot, so a 09:00 wave of 300 reminders goes
+# out evenly instead of hammering WhatsApp. Between events nothing runs:
+#
+#   scheduler = ReminderScheduler(DB_FILE, [2, 1, 0])
+#   scheduler.run_forever(send_batch)          # blocking (send_reminders.py)
+#
+#   # or, inside an existing loop (interactive bot):
+#   if scheduler.seconds_until_due(now) <= 0:
+#       for batch in scheduler.pop_due(now): ...
+#
+# The heap is rebuilt from the planner (reminders.plan_pending_reminders) at
+# the start of each day, when reminder_days changes, and when cases.db /
+# reminder_log changed (DataVersionWatcher, checked every rescan_seconds).
+# reminder_log stays the source of truth: a rebuild never re-sends anything.
+
+import datetime
+import heapq
+import threading
+from typing import Callable, Iterable, List, NamedTuple, Optional, Tuple
+
+from db_pool import DataVersionWatcher
+from metrics import incr, observe, set_gauge
+from phone_index import phone_last10
+from reminders import DueReminder, RecipientBatch, plan_pending_reminders
+
+# Defaults (callers pass their own config)
+SEND_AT = datetime.time(9, 0)
+HOURS_BEFORE_HEARING = 3
+EARLIEST = datetime.time(7, 0)
+PER_MINUTE = 12
+RESCAN_SECONDS = 60
+
+
+class FirePolicy(NamedTuple):
+    send_at: datetime.time = SEND_AT           # D-1, D-2, ...: this time of day
+    hours_before: float = HOURS_BEFORE_HEARING  # D-0: this long before the hearing
+    earliest: datetime.time = EARLIEST         # D-0: never before this time of day
+
+    def fire_at(self, r: DueReminder, today: datetime.date) -> datetime.datetime:
+        if r.days_before > 0:
+            return datetime.datetime.combine(today, self.send_at)
+        floor = datetime.datetime.combine(today, self.earliest)
+        try:
+            hearing = datetime.datetime.combine(today, datetime.time.fromisoformat(r.hearing_time))
+        except ValueError:
+            return floor
+        return max(hearing - datetime.timedelta(hours=self.hours_before), floor)
+
+
+class ScheduledBatch(NamedTuple):
+    fire_at: datetime.datetime
+    batch: RecipientBatch
+
+
+class ReminderScheduler:
+    def __init__(
+        self,
+        db_file: str,
+        reminder_days: Iterable[int],
+        policy: FirePolicy = FirePolicy(),
+        per_minute: float = PER_MINUTE,
+        rescan_seconds: float = RESCAN_SECONDS,
+    ):
+        self.db_file = db_file
+        self.reminder_days = list(reminder_days)
+        self.policy = policy
+        self.spacing = datetime.timedelta(seconds=60 / per_minute) if per_minute else datetime.timedelta(0)
+        self.rescan_every = datetime.timedelta(seconds=rescan_seconds)
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._watcher = DataVersionWatcher(db_file)
+        self._heap: List[Tuple[datetime.datetime, int, RecipientBatch]] = []
+        self._seq = 0
+        self._day: Optional[datetime.date] = None
+        self._next_check: Optional[datetime.datetime] = None
+        self._next_slot: Optional[datetime.datetime] = None
+        self._dirty = True
+
+    # ---------------- timeline ----------------
+    def set_reminder_days(self, reminder_days: Iterable[int]):
+        with self._lock:
+            self.reminder_days = list(reminder_days)
+            self._dirty = True
+        self.wake()
+
+    def wake(self):
+        """
+        Interrupt run_forever()'s sleep (e.g. after setting its stop event).
+        """
+        self._wake.set()
+
+    def _maybe_rescan_locked(self, now: datetime.datetime):
+        if not self._dirty and now.date() == self._day:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.rescan_every
+            if not self._watcher.changed():
+                return
+        self._rescan_locked(now)
+
+    def _rescan_locked(self, now: datetime.datetime):
+        self._watcher.changed()          # what we read below is the seen version
+        conn = self._watcher.connection()
+        self._day = now.date()
+        self._next_check = now + self.rescan_every
+        self._dirty = False
+
+        # One batch per (recipient, fire time): a client's reminders that fire
+        # together still go out as one message
+        groups = {}
+        for r, retry_at in plan_pending_reminders(conn, now, self.reminder_days):
+            fire_at = self.policy.fire_at(r, self._day)
+            if retry_at:
+                fire_at = max(fire_at, datetime.datetime.fromisoformat(retry_at))
+            groups.setdefault((phone_last10(r.phone) or r.phone, fire_at), []).append(r)
+
+        self._heap = []
+        for (_, fire_at), items in groups.items():
+            self._push_locked(fire_at, RecipientBatch(items[0].phone, items[0].client_name, items))
+        set_gauge("reminder.scheduled", len(self._heap))
+        incr("reminder.rescans")
+
+    def _push_locked(self, fire_at: datetime.datetime, batch: RecipientBatch):
+        self._seq += 1
+        heapq.heappush(self._heap, (fire_at, self._seq, batch))
+
+    def refresh(self, now: datetime.datetime, force: bool = False):
+        """
+        Rebuild the timeline now if forced, else only if due (new day, settings or data changed).
+        """
+        with self._lock:
+            if force:
+                self._dirty = True
+            self._maybe_rescan_locked(now)
+
+    # ---------------- due batches ----------------
+    def next_wakeup(self, now: datetime.datetime) -> datetime.datetime:
+        """
+        When pop_due() next has something to do: the next batch's fire time /
+        send slot, the next data check, or midnight, whichever is first.
+        """
+        with self._lock:
+            if self._dirty or self._next_check is None:
+                return now
+            midnight = datetime.datetime.combine(self._day + datetime.timedelta(days=1), datetime.time.min)
+            wake = min(self._next_check, midnight)
+            if self._heap:
+                due = self._heap[0][0]
+                if self._next_slot is not None:
+                    due = max(due, self._next_slot)
+                wake = min(wake, due)
+            return wake
+
+    def seconds_until_due(self, now: datetime.datetime) -> float:
+        return (self.next_wakeup(now) - now).total_seconds()
+
+    def pop_due(self, now: datetime.datetime) -> List[RecipientBatch]:
+        """
+        Batches whose fire time has come and that have a free send slot
+        (at most one per 60/per_minute seconds). The rest stay queued.
+        """
+        out = []
+        with self._lock:
+            self._maybe_rescan_locked(now)
+            while self._heap and self._heap[0][0] <= now:
+                if self._next_slot is not None and self._next_slot > now:
+                    break
+                fire_at, _, batch = heapq.heappop(self._heap)
+                self._next_slot = max(self._next_slot or now, now) + self.spacing
+                observe("reminder.fire_lag", (now - fire_at).total_seconds())
+                out.append(batch)
+            set_gauge("reminder.scheduled", len(self._heap))
+        return out
+
+    def defer(self, batch: RecipientBatch, seconds: float, now: datetime.datetime):
+        """
+        Put a popped batch back (e.g. its audio is still being synthesized).
+        """
+        with self._lock:
+            self._push_locked(now + datetime.timedelta(seconds=seconds), batch)
+
+    def pending(self) -> List[ScheduledBatch]:
+        with self._lock:
+            return [ScheduledBatch(fire_at, batch) for fire_at, _, batch in sorted(self._heap)]
+
+    # ---------------- blocking loop ----------------
+    def run_forever(
+        self,
+        send_batch: Callable[[RecipientBatch, datetime.datetime], None],
+        stop: Optional[threading.Event] = None,
+        now_fn: Callable[[], datetime.datetime] = datetime.datetime.now,
+    ):
+        """
+        Sleep until the next event, send what is due, repeat. send_batch
+        records the outcome in reminder_log (failures come back as retries).
+        """
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            now = now_fn()
+            for batch in self.pop_due(now):
+                try:
+                    send_batch(batch, now)
+                except Exception as e:
+                    print(f"[SCHEDULER] Send failed for {batch.phone}: {e}")
+            delay = self.seconds_until_due(now_fn())
+            if delay > 0:
+                self._wake.wait(delay)
+                self._wake.clear()
+
+    def close(self):
+        with self._lock:
+            self._watcher.close()
+            self._dirty = True
@@ -0,0 +1,235 @@
+# reminders.py
+# Reminder bookkeeping shared by the interactive bot and send_reminders.py.
+#
+# reminder_log (see db_setup.py) is the persistent, crash-safe send ledger:
+# one row per (phone, case_id, hearing_date, days_before). It replaces the
+# in-memory last_sent_cache, so a restart does not re-send the day's reminders
+# and failed sends are retried with exponential backoff.
+
+import datetime
+import sqlite3
+from collections import OrderedDict
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from phone_index import phone_last10
+
+# Retry policy for failed sends
+MAX_SEND_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 60 * 60
+
+# A row stuck in 'sending' this long (crash mid-send) becomes retryable.
+# 'sending' is set when the send starts, so time spent waiting in a sender
+# pool's queue (status 'queued') does not count towards it.
+SENDING_STALE_SECONDS = 10 * 60
+
+# 'queued' rows older than this process were left by a previous run (its
+# queue died with it); newer ones are still waiting for a sender session.
+PROCESS_STARTED_AT = datetime.datetime.now()
+
+
+class ReminderKey(NamedTuple):
+    phone: str
+    case_id: str
+    hearing_date: str   # ISO YYYY-MM-DD
+    days_before: int
+
+
+class DueReminder(NamedTuple):
+    phone: str
+    client_name: str
+    case_id: str
+    hearing_date: str   # ISO YYYY-MM-DD
+    hearing_time: str
+    days_before: int
+
+    @property
+    def key(self) -> ReminderKey:
+        return ReminderKey(self.phone, self.case_id, self.hearing_date, self.days_before)
+
+
+def _ts(now: datetime.datetime) -> str:
+    return now.isoformat(timespec="seconds")
+
+
+def retry_delay_seconds(attempts: int) -> int:
+    """
+    Backoff after `attempts` failed sends: 60s, 120s, 240s, ... capped at 1h.
+    """
+    return min(RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)), RETRY_MAX_SECONDS)
+
+
+# ==========================================================
+#                 SEND LEDGER
+# ==========================================================
+def mark_reminder_sending(conn: sqlite3.Connection, key: ReminderKey, now: datetime.datetime):
+    """
+    Record the attempt before touching the browser, so a crash mid-send is visible.
+    """
+    with conn:
+        conn.execute("""
+            INSERT INTO reminder_log(phone, case_id, hearing_date, days_before,
+                                     status, attempts, created_at, updated_at)
+            VALUES (?, ?, ?, ?, 'sending', 0, ?, ?)
+            ON CONFLICT(phone, case_id, hearing_date, days_before)
+            DO UPDATE SET status = 'sending', updated_at = excluded.updated_at
+        """, (*key, _ts(now), _ts(now)))
+
+
+def mark_reminder_queued(conn: sqlite3.Connection, key: ReminderKey, now: datetime.datetime):
+    """
+    Record that the reminder was handed to a sender queue; the session marks
+    it 'sending' when it actually starts.
+    """
+    with conn:
+        conn.execute("""
+            INSERT INTO reminder_log(phone, case_id, hearing_date, days_before,
+                                     status, attempts, created_at, updated_at)
+            VALUES (?, ?, ?, ?, 'queued', 0, ?, ?)
+            ON CONFLICT(phone, case_id, hearing_date, days_before)
+            DO UPDATE SET status = 'queued', updated_at = excluded.updated_at
+        """, (*key, _ts(now), _ts(now)))
+
+
+def mark_reminder_sent(conn: sqlite3.Connection, key: ReminderKey, now: datetime.datetime):
+    with conn:
+        conn.execute("""
+            UPDATE reminder_log
+            SET status = 'sent', attempts = attempts + 1, last_error = NULL,
+                next_attempt_at = NULL, updated_at = ?, sent_at = ?
+            WHERE phone = ? AND case_id = ? AND hearing_date = ? AND days_before = ?
+        """, (_ts(now), _ts(now), *key))
+
+
+def mark_reminder_failed(conn: sqlite3.Connection, key: ReminderKey, now: datetime.datetime, error: str):
+    with conn:
+        row = conn.execute("""
+            SELECT attempts FROM reminder_log
+            WHERE phone = ? AND case_id = ? AND hearing_date = ? AND days_before = ?
+        """, key).fetchone()
+        attempts = (row[0] if row else 0) + 1
+        next_attempt = now + datetime.timedelta(seconds=retry_delay_seconds(attempts))
+        conn.execute("""
+            INSERT INTO reminder_log(phone, case_id, hearing_date, days_before, status, attempts,
+                                     last_error, next_attempt_at, created_at, updated_at)
+            VALUES (?, ?, ?, ?, 'failed', ?, ?, ?, ?, ?)
+            ON CONFLICT(phone, case_id, hearing_date, days_before)
+            DO UPDATE SET status = 'failed', attempts = excluded.attempts,
+                          last_error = excluded.last_error,
+                          next_attempt_at = excluded.next_attempt_at,
+                          updated_at = excluded.updated_at
+        """, (*key, attempts, str(error)[:500], _ts(next_attempt), _ts(now), _ts(now)))
+
+
+def prune_reminder_log(conn: sqlite3.Connection, today: datetime.date) -> int:
+    """
+    Delete ledger rows whose hearing is already in the past. Returns rows removed.
+    """
+    with conn:
+        cur = conn.execute("DELETE FROM reminder_log WHERE hearing_date < ?", (today.isoformat(),))
+    return cur.rowcount
+
+
+# ==========================================================
+#                 REMINDER PLANNER
+# ==========================================================
+def plan_due_reminders(
+    conn: sqlite3.Connection,
+    now: datetime.datetime,
+    reminder_days: Iterable[int],
+) -> List[DueReminder]:
+    """
+    All reminders due now for every offset in `reminder_days`, in ONE query:
+    a range scan on idx_cases_hearing_date (today .. today+max offset),
+    days_before computed in SQL, and an anti-join against reminder_log so
+    only unsent (or retry-due) reminders come back. Cost scales with the
+    number of hearings in the window, not with the size of `cases`.
+    """
+    return [r for r, _ in _plan_reminders(conn, now, reminder_days, include_backoff=False)]
+
+
+def plan_pending_reminders(
+    conn: sqlite3.Connection,
+    now: datetime.datetime,
+    reminder_days: Iterable[int],
+) -> List[Tuple[DueReminder, Optional[str]]]:
+    """
+    Like plan_due_reminders, but failed reminders still in their backoff are
+    included too, paired with the time they may be retried (ISO, else None).
+    Used by the scheduler to put every remaining reminder of the day on its timeline.
+    """
+    return _plan_reminders(conn, now, reminder_days, include_backoff=True)
+
+
+def _plan_reminders(
+    conn: sqlite3.Connection,
+    now: datetime.datetime,
+    reminder_days: Iterable[int],
+    include_backoff: bool,
+) -> List[Tuple[DueReminder, Optional[str]]]:
+    days = sorted({int(d) for d in reminder_days})
+    if not days:
+        return []
+
+    today = now.date()
+    placeholders = ",".join("?" for _ in days)
+    stale = now - datetime.timedelta(seconds=SENDING_STALE_SECONDS)
+
+    rows = conn.execute(f"""
+        WITH hearings AS (
+            SELECT trim(phone) AS phone, trim(client_name) AS client_name,
+                   trim(case_id) AS case_id, hearing_date, trim(hearing_time) AS hearing_time,
+                   CAST(julianday(hearing_date) - julianday(?) AS INTEGER) AS days_before
+            FROM cases
+            WHERE hearing_date BETWEEN ? AND ?
+        )
+        SELECT w.phone, w.client_name, w.case_id, w.hearing_date, w.hearing_time, w.days_before,
+               r.next_attempt_at
+        FROM hearings w
+        LEFT JOIN reminder_log r
+               ON r.phone = w.phone AND r.case_id = w.case_id
+              AND r.hearing_date = w.hearing_date AND r.days_before = w.days_before
+        WHERE w.days_before IN ({placeholders})
+          AND (
+                r.status IS NULL
+             OR (r.status = 'failed' AND r.attempts < ?
+                 AND (? OR r.next_attempt_at IS NULL OR r.next_attempt_at <= ?))
+             OR (r.status = 'sending' AND r.updated_at <= ?)
+             OR (r.status = 'queued' AND r.updated_at < ?)
+          )
+        ORDER BY w.days_before ASC, w.hearing_time ASC, w.phone ASC
+    """, (
+        today.isoformat(),
+        (today + datetime.timedelta(days=days[0])).isoformat(),
+        (today + datetime.timedelta(days=days[-1])).isoformat(),
+        *days,
+        MAX_SEND_ATTEMPTS,
+        int(include_backoff),
+        _ts(now),
+        _ts(stale),
+        _ts(PROCESS_STARTED_AT),
+    )).fetchall()
+
+    return [(DueReminder(*row[:6]), row[6]) for row in rows]
+
+
+# ==========================================================
+#                 PER-RECIPIENT COALESCING
+# ==========================================================
+class RecipientBatch(NamedTuple):
+    phone: str
+    client_name: str
+    reminders: List[DueReminder]
+
+
+def coalesce_by_recipient(due: Iterable[DueReminder]) -> List[RecipientBatch]:
+    """
+    Group due reminders by recipient (LAST 10 digits of the phone, so
+    '+91 96407 33498' and '+919640733498' are one chat). One batch means one
+    chat navigation, one text and one audio per client per tick.
+    Batches keep the planner's order of their first reminder.
+    """
+    groups: "OrderedDict[str, List[DueReminder]]" = OrderedDict()
+    for r in due:
+        groups.setdefault(phone_last10(r.phone) or r.phone, []).append(r)
+    return [RecipientBatch(items[0].phone, items[0].client_name, items) for items in groups.values()]
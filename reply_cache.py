@@ -0,0 +1,176 @@
+# reply_cache.py
+# Per-client LRU cache of bot replies ("next hearing", "history", "case 123").
+#
+# A reply is a pure function of (client, intent, case id, today) and the cases
+# rows involved, so busy clients asking the same thing again get the cached
+# string without any query or formatting. Entries are keyed by
+#   ReplyKey(phone_last10, intent, case_id, day)
+# and invalidated through the case_changes log (db_setup v4): every write to
+# `cases` records the phone / case_id it touched, and the cache drops just the
+# entries for those. A new day clears the cache (the key has the date anyway,
+# this only frees yesterday's entries).
+#
+# Like PhoneIndex, the cache follows other connections' commits with a
+# DataVersionWatcher (db_pool), so a hit costs one pragma call (no query, no
+# disk read) while the DB is unchanged.
+
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, NamedTuple, Optional, Set
+
+from db_pool import DataVersionWatcher
+from metrics import incr
+
+# Keep case_changes rows this long (readers further behind start from scratch)
+CASE_CHANGES_KEEP_DAYS = 1
+
+
+class ReplyKey(NamedTuple):
+    phone_last10: str
+    intent: str
+    case_id: Optional[str]
+    day: str                 # today's date, ISO
+
+
+class ReplyCache:
+    def __init__(self, db_file: str, max_entries: int = 4096):
+        self.db_file = db_file
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._watcher = DataVersionWatcher(db_file)
+        self._last_seq = 0
+        self._day: Optional[str] = None
+        self._entries: "OrderedDict[ReplyKey, str]" = OrderedDict()
+        self._by_phone: Dict[str, Set[ReplyKey]] = {}
+        self._by_case: Dict[str, Set[ReplyKey]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    # ---------------- invalidation ----------------
+    def _sync_locked(self, day: str):
+        if day != self._day:
+            self._clear_locked()
+            self._day = day
+
+        started = self._watcher.started
+        if not self._watcher.changed():
+            return
+
+        conn = self._watcher.connection()
+        if not started:
+            # First use: nothing cached yet, just start following the log here
+            self._last_seq = conn.execute("SELECT coalesce(max(seq), 0) FROM case_changes").fetchone()[0]
+            return
+
+        rows = conn.execute(
+            "SELECT seq, phone_last10, case_id FROM case_changes WHERE seq > ? ORDER BY seq",
+            (self._last_seq,),
+        ).fetchall()
+        if not rows:
+            return
+
+        if (rows[0][0] > self._last_seq + 1 or len(rows) > self.max_entries
+                or any(phone is None and case_id is None for _, phone, case_id in rows)):
+            # Log was pruned past us, a bulk change, or an "everything changed"
+            # marker (initial import): start over
+            self._clear_locked()
+        else:
+            for _, phone, case_id in rows:
+                for key in list(self._by_phone.get(phone, ())) + list(self._by_case.get(case_id, ())):
+                    self._drop_locked(key)
+        self._last_seq = rows[-1][0]
+
+    def _clear_locked(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._by_phone.clear()
+        self._by_case.clear()
+
+    def _drop_locked(self, key: ReplyKey):
+        if self._entries.pop(key, None) is None:
+            return
+        self.invalidations += 1
+        self._unindex_locked(key)
+
+    def _unindex_locked(self, key: ReplyKey):
+        keys = self._by_phone.get(key.phone_last10)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_phone[key.phone_last10]
+        if key.case_id is not None:
+            keys = self._by_case.get(key.case_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_case[key.case_id]
+
+    # ---------------- lookups ----------------
+    def get_or_compute(self, key: ReplyKey, compute: Callable[[], str]) -> str:
+        """
+        Cached reply for `key`, else compute() (outside the lock) and cache it.
+        The result is not cached if cases changed while it was being computed.
+        """
+        with self._lock:
+            self._sync_locked(key.day)
+            reply = self._entries.get(key)
+            if reply is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                incr("reply_cache.hit")
+                return reply
+            self.misses += 1
+            incr("reply_cache.miss")
+            seq = self._last_seq
+
+        reply = compute()
+
+        with self._lock:
+            self._sync_locked(key.day)
+            if self._last_seq == seq:
+                self._put_locked(key, reply)
+        return reply
+
+    def _put_locked(self, key: ReplyKey, reply: str):
+        if key not in self._entries:
+            self._by_phone.setdefault(key.phone_last10, set()).add(key)
+            if key.case_id is not None:
+                self._by_case.setdefault(key.case_id, set()).add(key)
+        self._entries[key] = reply
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            old, _ = self._entries.popitem(last=False)
+            self._unindex_locked(old)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def close(self):
+        with self._lock:
+            self._watcher.close()
+            self._clear_locked()
+
+
+def prune_case_changes(conn: sqlite3.Connection, keep_days: int = CASE_CHANGES_KEEP_DAYS) -> int:
+    """
+    Delete change-log rows older than keep_days. Returns rows removed.
+    """
+    with conn:
+        cur = conn.execute(
+            "DELETE FROM case_changes WHERE changed_at < datetime('now', ?)",
+            (f"-{int(keep_days)} days",),
+        )
+    return cur.rowcount
@@ -0,0 +1,313 @@
+# reply_dispatcher.py
+# Staged reply pipeline: intake -> reply -> tts -> send.
+#
+# Intake used to compute the reply, synthesize the audio and upload the
+# attachment inline, so one voice reply (seconds) blocked reading new messages
+# and the reminder ticks. Here each stage has its own bounded queue:
+#
+#   intake (browser thread)  submit(text, phone)           -> reply queue (phone required)
+#   reply  (worker thread)   compute_reply(text, phone)    -> send queue (+ tts queue)
+#   tts    (worker thread)   synthesize(audio_text)        -> send queue
+#   send   (browser thread)  run_sends(transport)          -> WhatsApp
+#
+# Every reply is bound to its sender's phone and sent after open_chat(phone):
+# the browser may have moved to another chat (scan, reminder, flush timeout)
+# by the time it is ready. Messages without a 1:1 sender (group chats) are
+# dropped at intake rather than answered into whatever chat is open.
+#
+# Selenium drivers are not thread-safe, so everything that touches the browser
+# (intake + send) stays on the one thread that owns the driver; only the pure
+# computation moves to workers. When the reply queue is full, intake stops
+# draining the page, so back-pressure ends up in the in-page observer queue.
+#
+# Per-stage metrics (metrics.py):
+#   dispatch.<stage>.wait     time an item waited in the stage's queue
+#   dispatch.<stage>.service  time the stage spent on it
+#   dispatch.<stage>.depth    queue depth gauge (+ .max high-water mark)
+#   dispatch.reply_latency    message received -> text reply sent
+#   dispatch.audio_latency    message received -> audio reply sent
+#
+# flush_texts() sends until every submitted message has its text reply out
+# (used by the unread-chat scan to answer a chat before leaving it).
+#
+#   dispatcher = ReplyDispatcher(compute_reply, text_to_audio_mp3)
+#   dispatcher.start()
+#   while True:
+#       if dispatcher.accepting():
+#           for msg in observer.wait(dispatcher.poll_timeout(POLL_SECONDS)):
+#               dispatcher.submit(msg.text, phone_of(msg))
+#       dispatcher.run_sends(transport)
+
+import collections
+import queue
+import threading
+import time
+from typing import Callable, List, NamedTuple, Optional
+
+from metrics import incr, observe, set_gauge
+
+_STOP = object()
+
+# Queue bounds (items) per stage
+REPLY_QUEUE_SIZE = 100
+TTS_QUEUE_SIZE = 20
+SEND_QUEUE_SIZE = 100
+
+
+class Reply(NamedTuple):
+    text: str
+    audio_text: Optional[str] = None     # None -> no voice reply
+
+
+class _Item(NamedTuple):
+    phone: str
+    payload: str
+    received_at: float     # time.monotonic() at intake
+    enqueued_at: float     # time.monotonic() when put on the current stage's queue
+
+
+class _SendJob(NamedTuple):
+    phone: str
+    kind: str              # "text" | "audio"
+    payload: str           # text, or audio file path
+    received_at: float
+    enqueued_at: float
+
+
+class Stage:
+    """
+    A named bounded queue that reports its depth and wait/service times.
+    """
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.queue: "queue.Queue" = queue.Queue(maxsize=maxsize)
+
+    def put(self, item, block: bool = True):
+        self.queue.put(item, block=block)
+        set_gauge(f"dispatch.{self.name}.depth", self.queue.qsize())
+
+    def get(self, block: bool = True, timeout: Optional[float] = None):
+        item = self.queue.get(block=block, timeout=timeout)
+        set_gauge(f"dispatch.{self.name}.depth", self.queue.qsize())
+        if item is not _STOP:
+            observe(f"dispatch.{self.name}.wait", time.monotonic() - item.enqueued_at)
+        return item
+
+    def free(self) -> int:
+        return self.queue.maxsize - self.queue.qsize()
+
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+
+class ReplyDispatcher:
+    """
+    compute_reply: (msg_text, sender_phone) -> Reply or None (nothing to send)
+    synthesize:    audio_text -> path of the audio file to attach
+    """
+
+    def __init__(
+        self,
+        compute_reply: Callable[[str, str], Optional[Reply]],
+        synthesize: Callable[[str], str],
+        reply_queue_size: int = REPLY_QUEUE_SIZE,
+        tts_queue_size: int = TTS_QUEUE_SIZE,
+        send_queue_size: int = SEND_QUEUE_SIZE,
+    ):
+        self.compute_reply = compute_reply
+        self.synthesize = synthesize
+        self.reply_stage = Stage("reply", reply_queue_size)
+        self.tts_stage = Stage("tts", tts_queue_size)
+        self.send_stage = Stage("send", send_queue_size)
+
+        # Intake overflow; only touched by the browser thread
+        self._overflow: "collections.deque" = collections.deque()
+
+        # Messages/jobs anywhere in the pipeline (for poll_timeout), and
+        # messages whose text reply has not been sent yet (for flush_texts)
+        self._in_flight = 0
+        self._texts_pending = 0
+        self._lock = threading.Lock()
+
+        self._threads: List[threading.Thread] = []
+
+    # ---------------- lifecycle ----------------
+    def start(self):
+        for name, target in (("reply", self._reply_worker), ("tts", self._tts_worker)):
+            t = threading.Thread(target=target, name=f"dispatch-{name}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def shutdown(self, wait: bool = True):
+        self.reply_stage.put(_STOP)
+        self.tts_stage.put(_STOP)
+        if wait:
+            for t in self._threads:
+                t.join()
+        self._threads = []
+
+    def _track(self, delta: int, texts: int = 0):
+        with self._lock:
+            self._in_flight += delta
+            self._texts_pending += texts
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return self._in_flight
+
+    # ---------------- intake (browser thread) ----------------
+    def accepting(self) -> bool:
+        """
+        False while earlier messages are still waiting for room in the reply
+        queue; the caller should stop reading new ones until it drains.
+        """
+        self._flush_overflow()
+        return not self._overflow
+
+    def submit(self, msg_text: str, sender_phone: Optional[str], received_at: Optional[float] = None) -> bool:
+        """
+        Queue an incoming message. Never blocks the browser thread.
+        received_at: time.monotonic() when the message was first seen (default: now).
+        Returns False (message dropped) if there is no sender phone to reply to.
+        """
+        if not sender_phone:
+            incr("dispatch.intake.no_phone")
+            print("[DISPATCH] Ignoring message without a 1:1 sender (group chat?)")
+            return False
+        now = time.monotonic()
+        self._track(+1, texts=+1)
+        incr("dispatch.intake")
+        self._overflow.append(_Item(sender_phone, msg_text, now if received_at is None else received_at, now))
+        self._flush_overflow()
+        return True
+
+    def _flush_overflow(self):
+        while self._overflow:
+            item = self._overflow[0]._replace(enqueued_at=time.monotonic())
+            try:
+                self.reply_stage.put(item, block=False)
+            except queue.Full:
+                return
+            self._overflow.popleft()
+
+    def poll_timeout(self, idle_timeout: float, busy_timeout: float = 0.05) -> float:
+        """
+        How long intake may block waiting for new messages: short while
+        replies are in the pipeline (so their sends aren't delayed).
+        """
+        return busy_timeout if self.in_flight() else idle_timeout
+
+    # ---------------- workers ----------------
+    def _reply_worker(self):
+        while True:
+            item = self.reply_stage.get()
+            if item is _STOP:
+                break
+            t0 = time.monotonic()
+            try:
+                reply = self.compute_reply(item.payload, item.phone)
+            except Exception as e:
+                print("[DISPATCH] Reply error:", e)
+                reply = None
+            observe("dispatch.reply.service", time.monotonic() - t0)
+
+            if reply is None:
+                self._track(-1, texts=-1)
+                continue
+            print("Reply:", reply.text)
+            if reply.audio_text:
+                self._track(+1)
+            self.send_stage.put(_SendJob(item.phone, "text", reply.text, item.received_at, time.monotonic()))
+            if reply.audio_text:
+                self.tts_stage.put(_Item(item.phone, reply.audio_text, item.received_at, time.monotonic()))
+
+    def _tts_worker(self):
+        while True:
+            item = self.tts_stage.get()
+            if item is _STOP:
+                break
+            t0 = time.monotonic()
+            try:
+                audio_path = self.synthesize(item.payload)
+            except Exception as e:
+                print("[DISPATCH] TTS failed:", e)
+                incr("dispatch.tts.failed")
+                self._track(-1)
+                continue
+            finally:
+                observe("dispatch.tts.service", time.monotonic() - t0)
+            self.send_stage.put(_SendJob(item.phone, "audio", audio_path, item.received_at, time.monotonic()))
+
+    # ---------------- send (browser thread) ----------------
+    def run_sends(self, transport, wait: float = 0.0, max_jobs: Optional[int] = None) -> int:
+        """
+        Send every ready reply through `transport`. Blocks up to `wait`
+        seconds for the first one. Returns the number of jobs processed.
+        """
+        done = 0
+        while max_jobs is None or done < max_jobs:
+            try:
+                if done == 0 and wait > 0:
+                    job = self.send_stage.get(timeout=wait)
+                else:
+                    job = self.send_stage.get(block=False)
+            except queue.Empty:
+                break
+            self._send_one(transport, job)
+            done += 1
+        return done
+
+    def flush_texts(self, transport, timeout: float) -> Optional[float]:
+        """
+        Send until every submitted message has had its text reply sent (audio
+        may still be pending), or `timeout` seconds pass. Returns the
+        time.monotonic() at which the first text reply went out, None if none did.
+        """
+        deadline = time.monotonic() + timeout
+        first_text_at = None
+        while True:
+            with self._lock:
+                if not self._texts_pending:
+                    break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._flush_overflow()
+            try:
+                job = self.send_stage.get(timeout=min(remaining, 0.05))
+            except queue.Empty:
+                continue
+            self._send_one(transport, job)
+            if job.kind == "text" and first_text_at is None:
+                first_text_at = time.monotonic()
+        return first_text_at
+
+    def _send_one(self, transport, job: _SendJob):
+        t0 = time.monotonic()
+        try:
+            # Replies go back to the sender's chat, wherever the browser is now
+            transport.open_chat(job.phone)
+            if job.kind == "text":
+                transport.send_text(job.payload)
+                observe("dispatch.reply_latency", time.monotonic() - job.received_at)
+            elif transport.supports_audio:
+                transport.send_audio(job.payload)
+                observe("dispatch.audio_latency", time.monotonic() - job.received_at)
+                print("Audio attachment sent.")
+        except Exception as e:
+            print(f"[DISPATCH] {job.kind} send failed:", e)
+            incr(f"dispatch.send.{job.kind}_failed")
+        finally:
+            observe("dispatch.send.service", time.monotonic() - t0)
+            self._track(-1, texts=-1 if job.kind == "text" else 0)
+
+    def stats(self) -> dict:
+        return {
+            "intake_overflow": len(self._overflow),
+            "reply_depth": self.reply_stage.depth(),
+            "tts_depth": self.tts_stage.depth(),
+            "send_depth": self.send_stage.depth(),
+            "in_flight": self.in_flight(),
+            "texts_pending": self._texts_pending,
+        }
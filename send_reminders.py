@@ -1,46 +1,101 @@
-import pandas as pd
-import pywhatkit
+# pandas / pywhatkit are imported only where they are used: the
+# cron-style reminder run needs none of them at startup.
+import csv
 import datetime as dt
-import time
-import schedule
+import sqlite3
+from typing import Iterator
+
+from db_pool import get_connection
+from db_setup import ensure_schema
+from reminders import (
+    RecipientBatch,
+    coalesce_by_recipient,
+    plan_due_reminders,
+    mark_reminder_sending,
+    mark_reminder_sent,
+    mark_reminder_failed,
+)
+from import_cases import RowError, normalize_date
+from transport import PyWhatKitTransport, Transport
 
 CASES_FILE = "advocate_cases.csv"
 INDIAN_TZ_OFFSET = 5.5  # if needed later
 
+# How reminders are delivered. Swap for transport.MockTransport() to load-test offline.
+TRANSPORT: Transport = PyWhatKitTransport(wait_time=20, close_time=3, pause_seconds=5)
+
+# Where send_tomorrow_reminders reads cases:
+#   "csv" -> stream CASES_FILE row by row (no pandas)
+#   "db"  -> indexed hearing_date query on cases.db
+#   "pandas" -> old DataFrame path (load_cases)
+CASES_SOURCE = "csv"
+
 def load_cases():
+    import pandas as pd
+
     df = pd.read_csv(CASES_FILE)
     # ensure date/time columns are strings
     df["hearing_date"] = df["hearing_date"].astype(str)
     df["hearing_time"] = df["hearing_time"].astype(str)
     return df
 
-def send_whatsapp_message(phone: str, message: str):
+def iter_csv_cases_for_date(date_str: str, path: str = CASES_FILE) -> Iterator[dict]:
+    """
+    Stream the CSV and yield only the rows whose hearing is on date_str
+    (YYYY-MM-DD). Rows with unparseable dates are skipped.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            raw = (row.get("hearing_date") or "").strip()
+            if raw != date_str:
+                try:
+                    raw = normalize_date(raw)
+                except RowError:
+                    continue
+                if raw != date_str:
+                    continue
+            yield row
+
+def iter_db_cases_for_date(conn: sqlite3.Connection, date_str: str) -> Iterator[dict]:
+    """
+    Same rows from cases.db (uses idx_cases_hearing_date).
+    """
+    cur = conn.execute("""
+        SELECT client_name, phone, case_id, hearing_date, hearing_time
+        FROM cases
+        WHERE hearing_date = ?
+    """, (date_str,))
+    for client_name, phone, case_id, hearing_date, hearing_time in cur:
+        yield {
+            "client_name": client_name,
+            "phone": phone,
+            "case_id": case_id,
+            "hearing_date": hearing_date,
+            "hearing_time": hearing_time,
+        }
+
+def iter_cases_for_date(date_str: str, source: str = None) -> Iterator[dict]:
+    source = source or CASES_SOURCE
+    if source == "db":
+        return iter_db_cases_for_date(get_connection("cases.db"), date_str)
+    if source == "pandas":
+        df = load_cases()
+        return (row.to_dict() for _, row in df[df["hearing_date"] == date_str].iterrows())
+    return iter_csv_cases_for_date(date_str)
+
+def send_whatsapp_message(phone: str, message: str, transport: Transport = None):
     print(f"Sending to {phone}: {message}")
-    # instantly sends via web.whatsapp.com (must be logged in)
-    pywhatkit.sendwhatmsg_instantly(
-        phone_no=phone,
-        message=message,
-        wait_time=20,   # seconds to wait while opening WhatsApp Web
-        tab_close=True,
-        close_time=3
-    )
-    # small sleep to avoid spamming too fast
-    time.sleep(5)
-
-def send_tomorrow_reminders():
+    (transport or TRANSPORT).send(phone, message)
+
+def send_tomorrow_reminders(transport: Transport = None, source: str = None):
     today = dt.date.today()
     tomorrow = today + dt.timedelta(days=1)
     tomorrow_str = tomorrow.strftime("%Y-%m-%d")
 
-    df = load_cases()
-    # filter cases with hearing_date == tomorrow
-    upcoming = df[df["hearing_date"] == tomorrow_str]
-
-    if upcoming.empty:
-        print("No hearings tomorrow.")
-        return
-
-    for _, row in upcoming.iterrows():
+    # only the rows with hearing_date == tomorrow
+    sent_any = False
+    for row in iter_cases_for_date(tomorrow_str, source):
+        sent_any = True
         client = row["client_name"]
         phone = row["phone"]
         case_id = row["case_id"]
@@ -54,54 +109,71 @@ def send_tomorrow_reminders():
             f"- Advocate Office"
         )
 
-        send_whatsapp_message(phone, msg)
+        send_whatsapp_message(phone, msg, transport)
+
+    if not sent_any:
+        print("No hearings tomorrow.")
 
 def main():
-    # schedule the job every day at 09:00
-    #schedule.every().day.at("13:15").do(send_tomorrow_reminders)
-    schedule.every(1).minutes.do(send_all_reminders)
+    from reminder_scheduler import ReminderScheduler
 
+    # Each reminder fires at its own time (09:00 for D-2/D-1, a few hours
+    # before the hearing on D-0); the process sleeps in between
+    scheduler = ReminderScheduler("cases.db", [2, 1, 0])
 
     print("Scheduler started. Waiting for next run...")
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
-        
-        
-
-def send_all_reminders():
-    today = dt.date.today()
-
-    conn = sqlite3.connect("cases.db")
-    cur = conn.cursor()
-
-    cur.execute("SELECT client_name, phone, case_id, hearing_date, hearing_time FROM cases")
-    rows = cur.fetchall()
-
-    for client, phone, case_id, hearing_date, hearing_time in rows:
-
-        hearing_dt = dt.datetime.strptime(hearing_date, "%Y-%m-%d").date()
-        delta = (hearing_dt - today).days
-
-        if delta == 2:
-            msg = f"Reminder: Your hearing for Case {case_id} is in 2 days."
-            send_whatsapp_message(phone, msg)
-
-        elif delta == 1:
-            msg = f"Reminder: Your hearing for Case {case_id} is tomorrow at {hearing_time}."
-            send_whatsapp_message(phone, msg)
-
-        elif delta == 0:
-            msg = f"Today is your hearing for Case {case_id} at {hearing_time}."
-            send_whatsapp_message(phone, msg)
-
-    conn.close()
-
+    scheduler.run_forever(send_reminder_batch)
+
+
+def send_all_reminders(transport: Transport = None):
+    """
+    D-2 / D-1 / D-0 reminders from cases.db. One planner query returns only
+    reminders not yet sent (reminder_log), so running this every minute
+    does not re-send anything.
+    """
+    now = dt.datetime.now()
+    conn = get_connection("cases.db")
+
+    # one message per client, even with several hearings / offsets due
+    for batch in coalesce_by_recipient(plan_due_reminders(conn, now, [2, 1, 0])):
+        send_reminder_batch(batch, now, transport)
+
+
+def send_reminder_batch(batch: RecipientBatch, now: dt.datetime, transport: Transport = None):
+    """
+    Send one client's reminders as one message and record the outcome in
+    reminder_log (failures are retried with backoff by the planner).
+    `now` is when the batch was planned; the ledger gets the time of each step.
+    """
+    conn = get_connection("cases.db")
+    lines = []
+    for r in batch.reminders:
+        if r.days_before == 2:
+            lines.append(f"Reminder: Your hearing for Case {r.case_id} is in 2 days.")
+        elif r.days_before == 1:
+            lines.append(f"Reminder: Your hearing for Case {r.case_id} is tomorrow at {r.hearing_time}.")
+        else:
+            lines.append(f"Today is your hearing for Case {r.case_id} at {r.hearing_time}.")
+    msg = "\n".join(lines)
+
+    try:
+        for r in batch.reminders:
+            mark_reminder_sending(conn, r.key, dt.datetime.now())
+        send_whatsapp_message(batch.phone, msg, transport)
+        sent_at = dt.datetime.now()
+        for r in batch.reminders:
+            mark_reminder_sent(conn, r.key, sent_at)
+    except Exception as e:
+        failed_at = dt.datetime.now()
+        for r in batch.reminders:
+            mark_reminder_failed(conn, r.key, failed_at, str(e))
+        print(f"Failed for {batch.phone}: {e}")
 
 
 
 #if __name__ == "__main__":
     #main()
 if __name__ == "__main__":
+    ensure_schema("cases.db")
     #send_tomorrow_reminders()
     send_all_reminders()
@@ -0,0 +1,243 @@
+# sender_pool.py
+# Concurrent multi-session sender pool for bulk reminder fan-out.
+#
+# One Chrome session sends roughly one reminder every few seconds. The pool
+# runs N sessions (separate Chrome profiles, i.e. separate WhatsApp logins or
+# linked devices), each on its own thread with its own transport and its own
+# rate limit. Jobs are sharded by recipient (stable hash of the last 10 phone
+# digits), so all messages to one client go out in order through the same
+# session; a session that keeps failing is skipped and its recipients move to
+# the next healthy one. After UNHEALTHY_COOLDOWN_SECONDS it gets one probe job
+# (restarting its transport if it never came up) and rejoins the rotation if
+# that succeeds. Throughput scales ~linearly with the session count.
+#
+#   pool = SenderPool([selenium_session_factory("profiles/s1"),
+#                      selenium_session_factory("profiles/s2")], per_minute=12)
+#   pool.start()
+#   fut = pool.submit(phone, lambda transport: transport.send(phone, text))
+#   ...
+#   pool.shutdown()
+
+import queue
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+
+from phone_index import phone_last10
+from transport import Transport
+
+# A session with this many consecutive failures stops receiving new jobs...
+UNHEALTHY_AFTER_FAILURES = 3
+# ...until this long after its last failure, when one job probes it again
+UNHEALTHY_COOLDOWN_SECONDS = 5 * 60
+
+_STOP = object()
+_PROBING = float("inf")      # SenderSession.probe_at while a probe job is in flight
+
+
+class RateLimiter:
+    """
+    Spaces operations at least 60/per_minute seconds apart (per session).
+    """
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if now < self._next:
+            time.sleep(self._next - now)
+            now = self._next
+        self._next = now + self.interval
+
+
+class SenderSession:
+    """
+    One browser (or mock) session: a worker thread draining its own queue.
+    The transport is created inside the worker thread, because a Selenium
+    driver must only be used from the thread that owns it.
+    """
+
+    def __init__(self, index: int, factory: Callable[[], Transport], per_minute: float,
+                 cooldown: float = UNHEALTHY_COOLDOWN_SECONDS):
+        self.index = index
+        self.factory = factory
+        self.cooldown = cooldown
+        self.limiter = RateLimiter(per_minute)
+        self.jobs: "queue.Queue" = queue.Queue()
+        self.transport: Optional[Transport] = None
+        self.consecutive_failures = 0
+        self.probe_at: Optional[float] = None     # unhealthy: monotonic time of the next probe
+        self._probe_lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"sender-{index}", daemon=True)
+
+    @property
+    def healthy(self) -> bool:
+        return self.consecutive_failures < UNHEALTHY_AFTER_FAILURES
+
+    def claim_probe(self) -> bool:
+        """
+        True (once per cooldown) if this unhealthy session is due for a probe:
+        the caller routes its next job here. Other jobs keep avoiding the
+        session until the probe has succeeded.
+        """
+        with self._probe_lock:
+            if self.probe_at is None or time.monotonic() < self.probe_at:
+                return False
+            self.probe_at = _PROBING
+            return True
+
+    def _mark_unhealthy(self):
+        self.consecutive_failures = max(self.consecutive_failures, UNHEALTHY_AFTER_FAILURES)
+        self.probe_at = time.monotonic() + self.cooldown
+
+    def _record_failure(self):
+        self.consecutive_failures += 1
+        if not self.healthy:
+            self._mark_unhealthy()
+
+    def _record_success(self):
+        if not self.healthy:
+            print(f"[SENDER {self.index}] session recovered")
+        self.consecutive_failures = 0
+        self.probe_at = None
+
+    def _start_transport(self) -> bool:
+        try:
+            self.transport = self.factory()
+        except Exception as e:
+            print(f"[SENDER {self.index}] session failed to start: {e}")
+            self._mark_unhealthy()
+            return False
+        return True
+
+    def _run(self):
+        self._start_transport()
+        self.ready.set()
+
+        while True:
+            item = self.jobs.get()
+            if item is _STOP:
+                break
+            job, fut = item
+            if not fut.set_running_or_notify_cancel():
+                if self.probe_at == _PROBING:
+                    self.probe_at = time.monotonic()      # probe cancelled: let the next job probe
+                continue
+            if self.transport is None:
+                # Never came up: only a probe job retries the factory
+                if self.probe_at != _PROBING or not self._start_transport():
+                    fut.set_exception(RuntimeError(f"sender session {self.index} is not available"))
+                    continue
+
+            self.limiter.wait()
+            try:
+                result = job(self.transport)
+            except Exception as e:
+                self.failed += 1
+                self._record_failure()
+                fut.set_exception(e)
+            else:
+                self.sent += 1
+                self._record_success()
+                fut.set_result(result)
+
+        if self.transport is not None:
+            try:
+                self.transport.close()
+            except Exception:
+                pass
+
+
+class SenderPool:
+    """
+    factories:  one zero-arg callable per session, returning a Transport
+    per_minute: rate limit per session (sends per minute)
+    cooldown:   seconds an unhealthy session is skipped before it is probed again
+    """
+
+    def __init__(self, factories: List[Callable[[], Transport]], per_minute: float = 12,
+                 cooldown: float = UNHEALTHY_COOLDOWN_SECONDS):
+        if not factories:
+            raise ValueError("SenderPool needs at least one session factory")
+        self.sessions = [SenderSession(i, f, per_minute, cooldown) for i, f in enumerate(factories)]
+        self._started = False
+
+    def start(self, wait_ready: bool = True):
+        for s in self.sessions:
+            s.thread.start()
+        if wait_ready:
+            for s in self.sessions:
+                s.ready.wait()
+        self._started = True
+
+    def _session_for(self, phone: str) -> SenderSession:
+        key = (phone_last10(phone) or phone or "").encode("utf-8")
+        start = zlib.crc32(key) % len(self.sessions)
+        for step in range(len(self.sessions)):
+            session = self.sessions[(start + step) % len(self.sessions)]
+            if session.healthy or session.claim_probe():
+                return session
+        return self.sessions[start]   # all unhealthy: keep the shard, job will report the error
+
+    def submit(self, phone: str, job: Callable[[Transport], object]) -> Future:
+        """
+        Queue `job(transport)` on the session that owns `phone`'s shard.
+        """
+        if not self._started:
+            raise RuntimeError("SenderPool.start() must be called first")
+        fut: Future = Future()
+        self._session_for(phone).jobs.put((job, fut))
+        return fut
+
+    def pending(self) -> int:
+        return sum(s.jobs.qsize() for s in self.sessions)
+
+    def stats(self) -> List[dict]:
+        return [
+            {
+                "session": s.index,
+                "healthy": s.healthy,
+                "queued": s.jobs.qsize(),
+                "sent": s.sent,
+                "failed": s.failed,
+            }
+            for s in self.sessions
+        ]
+
+    def shutdown(self, wait: bool = True):
+        for s in self.sessions:
+            s.jobs.put(_STOP)
+        if wait:
+            for s in self.sessions:
+                if s.thread.is_alive():
+                    s.thread.join()
+        self._started = False
+
+
+# ==========================================================
+#                 SESSION FACTORIES
+# ==========================================================
+def selenium_session_factory(profile_dir: str, nav_mode: str = "auto", login_timeout: int = 120):
+    """
+    Factory for a Chrome session with its own user-data dir. Log each profile
+    in once (scan its QR); the login then persists in that directory.
+    """
+    def build() -> Transport:
+        from transport import SeleniumTransport
+        from whatsapp_web import build_driver, wait_for_whatsapp_ready
+
+        driver = build_driver(profile_dir=profile_dir)
+        driver.get("https://web.whatsapp.com")
+        wait_for_whatsapp_ready(driver, timeout=login_timeout)
+        return SeleniumTransport(driver, nav_mode=nav_mode)
+
+    return build
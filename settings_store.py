@@ -0,0 +1,142 @@
+# settings_store.py
+# In-process copy of the `settings` table (admin toggles + tunables).
+#
+# is_audio_enabled() used to query `settings` on every incoming message and
+# every scheduler tick. SettingsStore loads the table once into typed values
+# and re-reads it only when the DB changed:
+#
+#   SETTINGS = SettingsStore(DB_FILE, [
+#       Setting("audio_enabled", True, parse_bool),
+#       Setting("reminder_days", [2, 1, 0], parse_int_list),
+#   ])
+#   SETTINGS.get("audio_enabled")   -> True   (dict lookup)
+#
+# Like PhoneIndex, change detection is a DataVersionWatcher (db_pool), but
+# checked at most once per CHECK_INTERVAL_SECONDS, so most get() calls do no
+# SQLite call at all and an admin toggle still applies within a second. Values missing from the table (or unparsable) fall back
+# to the code default. on_change() callbacks rebuild derived state (e.g. the
+# intent matcher when voice_keywords changes).
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple
+
+from db_pool import DataVersionWatcher
+from metrics import incr
+
+# Max staleness of a value after an admin change
+CHECK_INTERVAL_SECONDS = 1.0
+
+
+class Setting(NamedTuple):
+    key: str
+    default: Any
+    parse: Callable[[str], Any]      # stored TEXT -> typed value; raises ValueError if invalid
+
+
+def parse_bool(value: str) -> bool:
+    v = value.strip().lower()
+    if v in ("true", "1", "yes", "on"):
+        return True
+    if v in ("false", "0", "no", "off"):
+        return False
+    raise ValueError(f"not a boolean: {value!r}")
+
+
+def parse_float(value: str) -> float:
+    return float(value.strip())
+
+
+def parse_str_list(value: str) -> List[str]:
+    """
+    JSON list ('["case", "కేసు"]') or comma-separated ('case, hearing').
+    """
+    v = value.strip()
+    if v.startswith("["):
+        items = json.loads(v)
+        if not isinstance(items, list):
+            raise ValueError(f"not a list: {value!r}")
+    else:
+        items = v.split(",")
+    return [str(item).strip() for item in items if str(item).strip()]
+
+
+def parse_int_list(value: str) -> List[int]:
+    return [int(item) for item in parse_str_list(value)]
+
+
+class SettingsStore:
+    def __init__(self, db_file: str, settings: Iterable[Setting],
+                 check_interval: float = CHECK_INTERVAL_SECONDS):
+        self.db_file = db_file
+        self.check_interval = check_interval
+        self._specs: Dict[str, Setting] = {s.key: s for s in settings}
+        self._values: Dict[str, Any] = {k: s.default for k, s in self._specs.items()}
+        self._callbacks: Dict[str, List[Callable[[Any], None]]] = {}
+        self._lock = threading.Lock()
+        self._watcher = DataVersionWatcher(db_file)
+        self._next_check = 0.0
+        self.version = 0                 # bumped whenever a value changes
+
+    def refresh(self, force: bool = False):
+        """
+        Reload the table if the DB changed (checked at most every check_interval).
+        """
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return
+
+        changed: Dict[str, Any] = {}
+        with self._lock:
+            self._next_check = now + self.check_interval
+            if not self._watcher.changed() and not force:
+                return
+            conn = self._watcher.connection()
+
+            try:
+                stored = dict(conn.execute("SELECT key, value FROM settings").fetchall())
+            except sqlite3.OperationalError:
+                stored = {}      # no settings table yet: defaults
+            incr("settings.reload")
+
+            values = {}
+            for key, spec in self._specs.items():
+                raw = stored.get(key)
+                values[key] = spec.default
+                if raw is None:
+                    continue
+                try:
+                    values[key] = spec.parse(str(raw))
+                except ValueError as e:
+                    print(f"[SETTINGS] Ignoring invalid {key}={raw!r} ({e}); using default")
+
+            changed = {k: v for k, v in values.items() if v != self._values[k]}
+            if changed:
+                self._values = values
+                self.version += 1
+
+        for key, value in changed.items():
+            print(f"[SETTINGS] {key} = {value!r}")
+            for callback in self._callbacks.get(key, ()):
+                callback(value)
+
+    def get(self, key: str) -> Any:
+        self.refresh()
+        return self._values[key]
+
+    def on_change(self, key: str, callback: Callable[[Any], None]):
+        """
+        Call callback(new_value) after every reload that changes `key`.
+        """
+        self._callbacks.setdefault(key, []).append(callback)
+
+    def snapshot(self) -> Dict[str, Any]:
+        self.refresh()
+        return dict(self._values)
+
+    def close(self):
+        with self._lock:
+            self._watcher.close()
+            self._next_check = 0.0
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+# The bot's modules live at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_pool import open_connection  # noqa: E402
+from db_setup import ensure_schema  # noqa: E402
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    path = str(tmp_path / "cases.db")
+    ensure_schema(path)
+    return path
+
+
+@pytest.fixture
+def conn(db_file):
+    c = open_connection(db_file)
+    yield c
+    c.close()
+
+
+def add_case(conn, case_id, phone, hearing_date, hearing_time="10:00", client_name="Client"):
+    with conn:
+        conn.execute(
+            "INSERT INTO cases (client_name, phone, case_id, hearing_date, hearing_time) VALUES (?, ?, ?, ?, ?)",
+            (client_name, phone, case_id, hearing_date, hearing_time),
+        )
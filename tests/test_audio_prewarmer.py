@@ -0,0 +1,85 @@
+import os
+import threading
+
+import pytest
+
+from tts_cache import AudioPrewarmer, StubTTSEngine, TTSCache
+
+
+class GatedEngine(StubTTSEngine):
+    """
+    Blocks every synthesis until `release` is set; fails while `fail` is set.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.fail = False
+
+    def synthesize(self, text, lang, slow, out_path):
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("gTTS unreachable")
+        super().synthesize(text, lang, slow, out_path)
+
+
+@pytest.fixture
+def engine():
+    return GatedEngine()
+
+
+@pytest.fixture
+def prewarmer(tmp_path, engine):
+    p = AudioPrewarmer(TTSCache(str(tmp_path / "audio"), engine=engine), workers=2)
+    yield p
+    engine.release.set()
+    p.shutdown()
+
+
+def test_duplicate_texts_are_synthesized_once(prewarmer, engine):
+    assert prewarmer.submit_many(["a", "b", "a", "a"]) == 4
+    assert prewarmer.pending() == 2
+    engine.release.set()
+    prewarmer.submit("a").result(timeout=5)
+    prewarmer.submit("b").result(timeout=5)
+    assert engine.calls == 2
+
+
+def test_ready_path_never_waits(prewarmer, engine):
+    assert prewarmer.ready_path("reminder") is None            # queued, still running
+    engine.release.set()
+    prewarmer.submit("reminder").result(timeout=5)
+    path = prewarmer.ready_path("reminder")
+    assert path and os.path.exists(path)
+
+
+def test_failure_is_raised_once_then_retried(prewarmer, engine):
+    engine.fail = True
+    engine.release.set()
+    with pytest.raises(RuntimeError):
+        prewarmer.submit("reminder").result(timeout=5)
+    with pytest.raises(RuntimeError):
+        prewarmer.ready_path("reminder")
+
+    engine.fail = False
+    prewarmer.submit("reminder").result(timeout=5)
+    assert prewarmer.ready_path("reminder")
+
+
+def test_evicted_file_is_synthesized_again(prewarmer, engine):
+    engine.release.set()
+    path = prewarmer.submit("reminder").result(timeout=5)
+    os.remove(path)                                             # cache evicted it
+    assert prewarmer.ready_path("reminder") is None
+    prewarmer.submit("reminder").result(timeout=5)
+    assert prewarmer.ready_path("reminder") == path
+    assert engine.calls == 2
+
+
+def test_forget_done_keeps_running_jobs(prewarmer, engine):
+    engine.release.set()
+    prewarmer.submit("done").result(timeout=5)
+    engine.release.clear()
+    prewarmer.submit("running")
+    prewarmer.forget_done()
+    assert list(prewarmer._futures) == ["running"]
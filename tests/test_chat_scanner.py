@@ -0,0 +1,75 @@
+import chat_scanner
+from chat_scanner import ChatScanner
+from message_observer import IncomingMessage
+
+GROUP_ID = "false_120363041234567890@g.us_3A1B_919640733498@c.us"
+
+
+class FakeRow:
+    def __init__(self, driver, title):
+        self.driver, self.title = driver, title
+
+    def click(self):
+        self.driver.open = self.title
+
+
+class FakeDriver:
+    """
+    Answers the scanner's scripts from a list of (title, unread, [data-id, ...]).
+    """
+
+    def __init__(self, chats):
+        self.chats = chats
+        self.open = None
+        self.opened = []
+
+    def execute_script(self, script, *args):
+        if script == chat_scanner._UNREAD_CHATS_JS:
+            return [[pos, title, unread] for pos, (title, unread, _) in enumerate(self.chats) if unread]
+        if script == chat_scanner._FIND_CHAT_ROW_JS:
+            return FakeRow(self, args[1])
+        if script == chat_scanner._CHAT_READY_JS:
+            self.opened.append(self.open)
+            return self.open == args[0]
+        raise AssertionError(script)
+
+
+class FakeObserver:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def claim_rendered(self, last_n):
+        ids = next(ids for title, _, ids in self.driver.chats if title == self.driver.open)
+        return [IncomingMessage(i, "next hearing") for i in ids[-last_n:]]
+
+
+def _scanner(chats):
+    driver = FakeDriver(chats)
+    return driver, ChatScanner(driver, FakeObserver(driver))
+
+
+def test_serves_oldest_chat_first():
+    _, scanner = _scanner([
+        ("+919640733498", 1, ["false_919640733498@c.us_A"]),
+        ("Read chat", 0, []),
+        ("+919640733499", 2, ["false_919640733499@c.us_B", "false_919640733499@c.us_C"]),
+    ])
+    chats = scanner.scan()
+    assert [c.title for c in chats] == ["+919640733499", "+919640733498"]
+    assert [m.data_id for m in scanner.open_and_claim(chats[0])] == [
+        "false_919640733499@c.us_B", "false_919640733499@c.us_C",
+    ]
+
+
+def test_group_chats_are_not_answered_and_not_revisited():
+    driver, scanner = _scanner([
+        ("Family", 1, [GROUP_ID]),
+        ("+919640733498", 1, ["false_919640733498@c.us_A"]),
+    ])
+    (client, group) = scanner.scan()
+    assert group.title == "Family"
+    assert scanner.open_and_claim(group) == []
+    assert len(scanner.open_and_claim(client)) == 1
+
+    assert [c.title for c in scanner.scan()] == ["+919640733498"]
+    assert driver.opened.count("Family") == 1
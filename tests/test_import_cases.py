@@ -0,0 +1,112 @@
+import pytest
+
+from import_cases import (
+    RowError,
+    import_file,
+    normalize_date,
+    normalize_phone,
+    normalize_time,
+)
+
+HEADER = "client_name,phone,case_id,hearing_date,hearing_time\n"
+
+
+@pytest.fixture
+def write_csv(tmp_path):
+    def write(*lines, name="cases.csv"):
+        path = tmp_path / name
+        path.write_text(HEADER + "".join(line + "\n" for line in lines), encoding="utf-8")
+        return str(path)
+    return write
+
+
+def _hearings(conn):
+    return conn.execute(
+        "SELECT client_name, phone, case_id, hearing_date, hearing_time FROM cases ORDER BY case_id, hearing_at"
+    ).fetchall()
+
+
+def test_normalization():
+    assert normalize_phone("96407 33498") == ("+919640733498", None)
+    assert normalize_phone("0091-9640733498") == ("+919640733498", None)
+    phone, warning = normalize_phone("+91958021418")
+    assert phone == "+91958021418" and warning
+    with pytest.raises(RowError):
+        normalize_phone("12345")
+
+    assert normalize_date("15/01/2026") == "2026-01-15"
+    assert normalize_date("2026-01-15 00:00:00") == "2026-01-15"
+    assert normalize_time("9:00") == "09:00"
+    assert normalize_time("2:30 PM") == "14:30"
+    with pytest.raises(RowError):
+        normalize_time("25:00")
+
+
+def test_reimport_is_incremental(db_file, conn, write_csv):
+    path = write_csv(
+        "Ravi,9640733498,100,2026-11-02,10:00",
+        "Ravi,9640733498,100,2026-11-02,15:00",         # same-day hearings both kept
+        "Sita,+91 96407 33499,200,02/11/2026,9:30",
+    )
+    first = import_file(path, db_file)
+    assert (first.inserted, first.rejected) == (3, 0)
+
+    again = import_file(path, db_file)
+    assert (again.inserted, again.updated, again.unchanged, again.removed) == (0, 0, 3, 0)
+
+    renamed = import_file(write_csv(
+        "Ravi Kumar,9640733498,100,2026-11-02,10:00",
+        "Ravi Kumar,9640733498,100,2026-11-02,15:00",
+        "Sita,+91 96407 33499,200,02/11/2026,9:30",
+    ), db_file)
+    assert (renamed.updated, renamed.unchanged) == (2, 1)
+    assert [r[0] for r in _hearings(conn)] == ["Ravi Kumar", "Ravi Kumar", "Sita"]
+
+
+def test_rescheduled_hearing_replaces_the_old_one(db_file, conn, write_csv):
+    import_file(write_csv(
+        "Ravi,9640733498,100,2026-11-02,10:00",
+        "Sita,9640733499,200,2026-11-03,10:00",
+    ), db_file)
+
+    report = import_file(write_csv("Ravi,9640733498,100,2026-11-20,11:00"), db_file)
+    assert (report.inserted, report.removed) == (1, 1)
+    assert _hearings(conn) == [
+        ("Ravi", "+919640733498", "100", "2026-11-20", "11:00"),
+        ("Sita", "+919640733499", "200", "2026-11-03", "10:00"),     # not in the file: kept
+    ]
+    changed = {row[0] for row in conn.execute("SELECT case_id FROM case_changes")}
+    assert "100" in changed
+
+
+def test_rejected_row_keeps_the_case_hearings(db_file, conn, write_csv):
+    import_file(write_csv(
+        "Ravi,9640733498,100,2026-11-02,10:00",
+        "Ravi,9640733498,100,2026-11-09,10:00",
+    ), db_file)
+
+    report = import_file(write_csv(
+        "Ravi,9640733498,100,2026-11-02,10:00",
+        "Ravi,9640733498,100,2026-13-40,10:00",
+    ), db_file)
+    assert (report.rejected, report.removed) == (1, 0)
+    assert len(_hearings(conn)) == 2
+    assert report.issues[0].startswith("line 3: rejected")
+
+
+def test_last_duplicate_in_a_file_wins(db_file, conn, write_csv):
+    import_file(write_csv(
+        "Old,9640733498,100,2026-11-02,10:00",
+        "New,9640733498,100,2026-11-02,10:00",
+    ), db_file)
+    assert [r[0] for r in _hearings(conn)] == ["New"]
+
+
+def test_failed_import_changes_nothing(db_file, conn, write_csv, monkeypatch):
+    import_file(write_csv("Ravi,9640733498,100,2026-11-02,10:00"), db_file)
+
+    import import_cases
+    monkeypatch.setattr(import_cases, "_DELETE_STALE_SQL", "SELECT no_such_column FROM cases")
+    with pytest.raises(Exception):
+        import_file(write_csv("Ravi,9640733498,100,2026-11-20,10:00"), db_file)
+    assert _hearings(conn) == [("Ravi", "+919640733498", "100", "2026-11-02", "10:00")]
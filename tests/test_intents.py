@@ -0,0 +1,47 @@
+import pytest
+
+from benchmark import INTENT_QUERIES, INTENT_VOICE_KEYWORDS, _padded_keywords, make_legacy_classifier
+from intents import INTENT_CASE, INTENT_HISTORY, INTENT_NEXT_HEARING, Intent, IntentMatcher
+
+
+@pytest.fixture
+def matcher():
+    return IntentMatcher(voice_keywords=INTENT_VOICE_KEYWORDS)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Case history please", Intent(INTENT_HISTORY, None, True)),
+    ("next hearing for 12345", Intent(INTENT_NEXT_HEARING, "12345", True)),
+    ("when is my hearing", Intent(INTENT_NEXT_HEARING, None, True)),
+    ("hearing history of 4567", Intent(INTENT_HISTORY, "4567", True)),     # history wins
+    ("status 12 and 987654", Intent(INTENT_CASE, "987654", False)),          # 3-10 digits only
+    ("call me at 12345678901", Intent(None, None, False)),
+    ("తదుపరి విచారణ", Intent(INTENT_NEXT_HEARING, None, True)),
+    ("", Intent(None, None, False)),
+    (None, Intent(None, None, False)),
+])
+def test_classify(matcher, text, expected):
+    assert matcher.classify(text) == expected
+
+
+@pytest.mark.parametrize("extra", [0, 50])
+def test_matches_the_old_chain(extra):
+    keywords = _padded_keywords(extra)
+    matcher = IntentMatcher(keywords=keywords, voice_keywords=INTENT_VOICE_KEYWORDS)
+    legacy = make_legacy_classifier(INTENT_VOICE_KEYWORDS, keywords)
+    for q in INTENT_QUERIES + [q.upper() for q in INTENT_QUERIES]:
+        assert tuple(matcher.classify(q)) == legacy(q)
+
+
+def test_overlapping_keywords_are_all_seen():
+    # "history" sits inside the longer voice keyword, and "hearing" overlaps both
+    m = IntentMatcher(voice_keywords=["case history"])
+    assert m.classify("case history").name == INTENT_HISTORY
+    assert m.classify("case history").voice
+    assert m.classify("hearing history").name == INTENT_HISTORY
+
+
+def test_add_keywords(matcher):
+    assert matcher.classify("సునావణి").name is None
+    matcher.add_keywords(INTENT_NEXT_HEARING, ["సునావణి"])
+    assert matcher.classify("సునావణి").name == INTENT_NEXT_HEARING
@@ -0,0 +1,151 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import db_setup
+from db_setup import SCHEMA_VERSION, _migrate_v1, ensure_schema
+from phone_index import phone_last10
+
+
+def _baseline_db(tmp_path, rows):
+    """
+    cases.db as the original bot created it (v1 table, user_version 0).
+    """
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    _migrate_v1(conn.cursor())
+    conn.executemany(
+        "INSERT INTO cases (client_name, phone, case_id, hearing_date, hearing_time) VALUES (?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _cases(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(
+            "SELECT client_name, case_id, hearing_date, hearing_time FROM cases ORDER BY id"
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def _invalid(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT client_name, hearing_date, hearing_time, reason FROM cases_invalid").fetchall()
+    finally:
+        conn.close()
+
+
+def test_same_day_hearings_survive(tmp_path):
+    path = _baseline_db(tmp_path, [
+        ("A", "+919640733498", "77777", "2026-11-02", "10:00"),
+        ("A", "+919640733498", "77777", "2026-11-02", "15:00"),
+        ("A", "+919640733498", "77777", "2026-11-02", "15:00"),     # exact duplicate
+    ])
+    assert ensure_schema(path) == SCHEMA_VERSION
+    assert _cases(path) == [
+        ("A", "77777", "2026-11-02", "10:00"),
+        ("A", "77777", "2026-11-02", "15:00"),
+    ]
+    assert _invalid(path) == []
+
+
+def test_same_day_hearings_in_mixed_date_formats_survive(tmp_path):
+    path = _baseline_db(tmp_path, [
+        ("A", "+919640733498", "77777", "02/11/2026", "10:00"),
+        ("A", "+919640733498", "77777", "2026-11-02", "3:00 PM"),
+    ])
+    ensure_schema(path)
+    assert _cases(path) == [
+        ("A", "77777", "2026-11-02", "10:00"),
+        ("A", "77777", "2026-11-02", "15:00"),
+    ]
+
+
+def test_conflicting_duplicates_move_to_cases_invalid(tmp_path):
+    path = _baseline_db(tmp_path, [
+        ("Old name", "+919640733498", "77777", "2026-11-02", "10:00"),
+        ("New name", "+919640733498", "77777", "2026-11-02", "10:00"),
+    ])
+    ensure_schema(path)
+    assert _cases(path) == [("New name", "77777", "2026-11-02", "10:00")]
+    (moved,) = _invalid(path)
+    assert moved[0] == "Old name"
+    assert moved[3].startswith("duplicate hearing")
+
+
+def test_unparsable_rows_move_to_cases_invalid(tmp_path):
+    path = _baseline_db(tmp_path, [
+        ("A", "+919640733498", "1", "2026-11-02", "10:00"),
+        ("B", "+919640733499", "2", "someday", "10:00"),
+        ("C", "+919640733490", "3", "2026-11-02", "25:99"),
+    ])
+    ensure_schema(path)
+    assert _cases(path) == [("A", "1", "2026-11-02", "10:00")]
+    assert sorted(row[0] for row in _invalid(path)) == ["B", "C"]
+
+
+def test_concurrent_startups_apply_each_step_once(tmp_path, monkeypatch):
+    path = _baseline_db(tmp_path, [("A", "+919640733498", "1", "2026-11-02", "10:00")])
+    applied = []
+
+    def counted(step):
+        def run(cur):
+            applied.append(step.__name__)
+            time.sleep(0.05)       # widen the race window
+            step(cur)
+        return run
+
+    monkeypatch.setattr(db_setup, "MIGRATIONS", [counted(m) for m in db_setup.MIGRATIONS])
+    results, errors = [], []
+
+    def start():
+        try:
+            results.append(ensure_schema(path))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=start) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert results == [SCHEMA_VERSION] * 3
+    assert len(applied) == len(set(applied)) == SCHEMA_VERSION
+    assert _cases(path) == [("A", "1", "2026-11-02", "10:00")]
+
+
+def test_write_triggers_reject_non_canonical_hearings(conn):
+    with pytest.raises(sqlite3.IntegrityError):
+        with conn:
+            conn.execute(
+                "INSERT INTO cases (client_name, phone, case_id, hearing_date, hearing_time)"
+                " VALUES ('A', '+919640733498', '1', '2026-02-30', '10:00')")
+    with pytest.raises(sqlite3.IntegrityError):
+        with conn:
+            conn.execute(
+                "INSERT INTO cases (client_name, phone, case_id, hearing_date, hearing_time)"
+                " VALUES ('A', '+919640733498', '1', '2026-02-03', '9:00')")
+
+
+@pytest.mark.parametrize("phone", [
+    "+919640733498", "+91 96407 33498", "+91-(964)073.3498", "+91 96407/33498", "+91\t9640733498",
+    "tel:+91 96407 33498", "+91\u202f96407\u202f33498", "9640733498 (mobile)",
+])
+def test_stored_phone_last10_matches_python(conn, phone):
+    with conn:
+        conn.execute(
+            "INSERT INTO cases (client_name, phone, case_id, hearing_date, hearing_time)"
+            " VALUES ('A', ?, '1', '2026-11-02', '10:00')", (phone,))
+    stored = conn.execute("SELECT phone_last10 FROM cases").fetchone()[0]
+    logged = conn.execute("SELECT phone_last10 FROM case_changes ORDER BY seq DESC LIMIT 1").fetchone()[0]
+    assert stored == logged == phone_last10(phone) == "9640733498"
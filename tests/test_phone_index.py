@@ -0,0 +1,87 @@
+import datetime
+
+import pytest
+
+from phone_index import PhoneIndex, phone_last10
+from reminders import ReminderKey, mark_reminder_sending, mark_reminder_sent
+
+from conftest import add_case
+
+
+@pytest.fixture
+def index(db_file):
+    idx = PhoneIndex(db_file)
+    yield idx
+    idx.close()
+
+
+def test_phone_last10():
+    assert phone_last10("+91 96407-33498") == "9640733498"
+    assert phone_last10("919640733498") == "9640733498"
+    assert phone_last10("tel:+91 96407 33498 (mobile)") == "9640733498"
+    assert phone_last10("12345") is None
+    assert phone_last10(None) is None
+
+
+def test_lookup_by_last10(conn, index):
+    add_case(conn, "1", "+91 96407 33498", "2026-11-02")
+    assert index.lookup("+919640733498") == "+91 96407 33498"
+    assert index.lookup("919640733499") is None
+
+
+def test_follows_case_changes(conn, index):
+    add_case(conn, "1", "+919640733498", "2026-11-02")
+    assert index.lookup("9640733498") == "+919640733498"
+
+    add_case(conn, "2", "+919640733499", "2026-11-02")
+    assert index.lookup("9640733499") == "+919640733499"
+
+    with conn:
+        conn.execute("UPDATE cases SET phone = '+919111111111' WHERE case_id = '1'")
+    assert index.lookup("9640733498") is None
+    assert index.lookup("9111111111") == "+919111111111"
+
+    with conn:
+        conn.execute("DELETE FROM cases WHERE case_id = '2'")
+    assert index.lookup("9640733499") is None
+
+
+def test_ledger_writes_do_not_rebuild(conn, index, monkeypatch):
+    add_case(conn, "1", "+919640733498", "2026-11-02")
+    index.refresh(force=True)
+
+    rebuilds = []
+    original = PhoneIndex._rebuild_locked
+    monkeypatch.setattr(PhoneIndex, "_rebuild_locked", lambda self, c: rebuilds.append(1) or original(self, c))
+
+    now = datetime.datetime(2026, 11, 1, 9, 0)
+    key = ReminderKey("+919640733498", "1", "2026-11-02", 1)
+    mark_reminder_sending(conn, key, now)
+    mark_reminder_sent(conn, key, now)
+    assert index.lookup("9640733498") == "+919640733498"
+    assert rebuilds == []
+
+
+def test_rebuilds_when_log_was_pruned(conn, index):
+    add_case(conn, "1", "+919640733498", "2026-11-02")
+    index.refresh(force=True)
+    add_case(conn, "2", "+919640733499", "2026-11-02")
+    with conn:
+        conn.execute("DELETE FROM case_changes")
+    add_case(conn, "3", "+919640733490", "2026-11-02")
+    assert index.lookup("9640733499") == "+919640733499"
+    assert index.lookup("9640733490") == "+919640733490"
+
+
+def test_short_phone_does_not_rebuild(conn, index, monkeypatch):
+    add_case(conn, "1", "+919640733498", "2026-11-02")
+    index.refresh(force=True)
+
+    rebuilds = []
+    original = PhoneIndex._rebuild_locked
+    monkeypatch.setattr(PhoneIndex, "_rebuild_locked", lambda self, c: rebuilds.append(1) or original(self, c))
+
+    add_case(conn, "2", "12345", "2026-11-02")
+    add_case(conn, "3", "+919640733499", "2026-11-02")
+    assert index.lookup("9640733499") == "+919640733499"
+    assert rebuilds == []
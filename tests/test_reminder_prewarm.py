@@ -0,0 +1,46 @@
+import datetime
+
+import pytest
+
+import interactive_bot_dec_22nd as bot
+from reminder_scheduler import FirePolicy, ReminderScheduler
+
+from conftest import add_case
+
+TODAY = datetime.date(2026, 11, 1)
+
+
+class RecordingPrewarmer:
+    def __init__(self):
+        self.texts = []
+
+    def forget_done(self):
+        pass
+
+    def submit_many(self, texts):
+        self.texts.extend(texts)
+
+
+@pytest.fixture
+def scheduler(db_file, monkeypatch):
+    s = ReminderScheduler(db_file, [2, 1, 0], FirePolicy(), per_minute=0)
+    monkeypatch.setattr(bot, "REMINDER_SCHEDULER", s)
+    monkeypatch.setattr(bot, "is_audio_enabled", lambda: True)
+    yield s
+    s.close()
+
+
+def test_prewarms_the_texts_the_scheduler_sends(conn, scheduler, monkeypatch):
+    prewarmer = RecordingPrewarmer()
+    monkeypatch.setattr(bot, "AUDIO_PREWARMER", prewarmer)
+    add_case(conn, "1", "+919640733498", TODAY.isoformat(), "14:00")        # D-0, fires 11:00
+    add_case(conn, "2", "+919640733498", "2026-11-02")                      # D-1, fires 09:00
+
+    assert bot.prewarm_reminder_audio(datetime.datetime.combine(TODAY, datetime.time.min)) == 2
+
+    sent = []
+    for hour in (9, 11):
+        now = datetime.datetime.combine(TODAY, datetime.time(hour))
+        sent.extend(bot.build_batch_telugu_reminder(b) for b in scheduler.pop_due(now))
+    assert len(sent) == 2
+    assert sorted(prewarmer.texts) == sorted(sent)
@@ -0,0 +1,93 @@
+import datetime
+
+import pytest
+
+from reminder_scheduler import FirePolicy, ReminderScheduler
+from reminders import DueReminder, mark_reminder_failed, mark_reminder_sending, mark_reminder_sent
+
+from conftest import add_case
+
+TODAY = datetime.date(2026, 11, 1)
+
+
+def at(hour, minute=0, second=0):
+    return datetime.datetime.combine(TODAY, datetime.time(hour, minute, second))
+
+
+def reminder(days_before, hearing_time="11:00"):
+    return DueReminder("+919640733498", "A", "1", TODAY.isoformat(), hearing_time, days_before)
+
+
+@pytest.fixture
+def scheduler(db_file):
+    s = ReminderScheduler(db_file, [2, 1, 0], FirePolicy(), per_minute=12, rescan_seconds=60)
+    yield s
+    s.close()
+
+
+def test_fire_at():
+    policy = FirePolicy(send_at=datetime.time(9, 0), hours_before=3, earliest=datetime.time(7, 0))
+    assert policy.fire_at(reminder(1), TODAY) == at(9)
+    assert policy.fire_at(reminder(2), TODAY) == at(9)
+    assert policy.fire_at(reminder(0, "11:30"), TODAY) == at(8, 30)
+    assert policy.fire_at(reminder(0, "08:00"), TODAY) == at(7)      # not before `earliest`
+    assert policy.fire_at(reminder(0, "later"), TODAY) == at(7)
+
+
+def test_sleeps_until_first_fire_time(conn, scheduler):
+    add_case(conn, "1", "+919640733498", "2026-11-02")
+    scheduler.refresh(at(8, 59, 30))
+    assert scheduler.pop_due(at(8, 59, 30)) == []
+    assert scheduler.next_wakeup(at(8, 59, 30)) == at(9)
+    assert [b.phone for b in scheduler.pop_due(at(9))] == ["+919640733498"]
+
+
+def test_spreads_a_wave_over_send_slots(conn, scheduler):
+    for i in range(5):
+        add_case(conn, str(i), f"+91964073349{i}", "2026-11-02")
+
+    sent = []
+    now = at(9)
+    while len(sent) < 5:
+        batches = scheduler.pop_due(now)
+        assert len(batches) <= 1
+        sent.extend((now, b) for b in batches)
+        now = scheduler.next_wakeup(now)
+    assert [t for t, _ in sent] == [at(9, 0, 5 * i) for i in range(5)]
+
+
+def test_one_batch_per_recipient_and_fire_time(conn, scheduler):
+    add_case(conn, "1", "+919640733498", "2026-11-02")
+    add_case(conn, "2", "+919640733498", "2026-11-03")
+    add_case(conn, "3", "+919640733498", TODAY.isoformat(), "14:00")
+    scheduler.refresh(at(0, 5))
+    pending = [(p.fire_at, sorted(r.case_id for r in p.batch.reminders)) for p in scheduler.pending()]
+    assert pending == [(at(9), ["1", "2"]), (at(11), ["3"])]
+
+
+def test_sent_reminders_are_not_rescheduled(conn, scheduler):
+    add_case(conn, "1", "+919640733498", "2026-11-02")
+    (batch,) = scheduler.pop_due(at(9))
+    for r in batch.reminders:
+        mark_reminder_sending(conn, r.key, at(9))
+        mark_reminder_sent(conn, r.key, at(9))
+    scheduler.refresh(at(9, 5))
+    assert scheduler.pending() == []
+
+
+def test_failed_reminder_fires_after_backoff(conn, scheduler):
+    add_case(conn, "1", "+919640733498", "2026-11-02")
+    (batch,) = scheduler.pop_due(at(9))
+    for r in batch.reminders:
+        mark_reminder_failed(conn, r.key, at(9), "boom")
+    scheduler.refresh(at(9, 1))      # next data check
+    assert [p.fire_at for p in scheduler.pending()] == [at(9, 1)]
+
+
+def test_reminder_days_change_rebuilds_the_timeline(conn, scheduler):
+    add_case(conn, "1", "+919640733498", "2026-11-02")
+    scheduler.refresh(at(8))
+    assert len(scheduler.pending()) == 1
+    scheduler.set_reminder_days([2, 0])
+    scheduler.refresh(at(8))
+    assert scheduler.pending() == []
@@ -0,0 +1,100 @@
+import datetime
+
+import reminders
+from reminders import (
+    MAX_SEND_ATTEMPTS,
+    SENDING_STALE_SECONDS,
+    coalesce_by_recipient,
+    mark_reminder_failed,
+    mark_reminder_queued,
+    mark_reminder_sending,
+    mark_reminder_sent,
+    plan_due_reminders,
+    plan_pending_reminders,
+    retry_delay_seconds,
+)
+
+from conftest import add_case
+
+NOW = datetime.datetime(2026, 11, 1, 9, 0)
+TOMORROW = "2026-11-02"
+
+
+def _planned(conn, now=NOW, days=(2, 1, 0)):
+    return [(r.case_id, r.days_before) for r in plan_due_reminders(conn, now, days)]
+
+
+def test_plans_each_offset_once(conn):
+    add_case(conn, "1", "+919640733498", "2026-11-01")
+    add_case(conn, "2", "+919640733498", TOMORROW)
+    add_case(conn, "3", "+919640733499", "2026-11-03")
+    add_case(conn, "4", "+919640733499", "2026-11-04")
+    assert sorted(_planned(conn)) == [("1", 0), ("2", 1), ("3", 2)]
+
+
+def test_sent_reminder_is_not_planned_again(conn):
+    add_case(conn, "1", "+919640733498", TOMORROW)
+    (r,) = plan_due_reminders(conn, NOW, [1])
+    mark_reminder_sending(conn, r.key, NOW)
+    mark_reminder_sent(conn, r.key, NOW)
+
+    assert _planned(conn, NOW + datetime.timedelta(hours=5)) == []
+    assert plan_pending_reminders(conn, NOW + datetime.timedelta(hours=5), [1]) == []
+
+
+def test_failed_reminder_waits_for_backoff(conn):
+    add_case(conn, "1", "+919640733498", TOMORROW)
+    (r,) = plan_due_reminders(conn, NOW, [1])
+    mark_reminder_sending(conn, r.key, NOW)
+    mark_reminder_failed(conn, r.key, NOW, "boom")
+
+    retry_at = NOW + datetime.timedelta(seconds=retry_delay_seconds(1))
+    assert _planned(conn, retry_at - datetime.timedelta(seconds=1)) == []
+    assert _planned(conn, retry_at) == [("1", 1)]
+
+    # The scheduler still sees it, with its retry time
+    ((pending, next_attempt_at),) = plan_pending_reminders(conn, NOW, [1])
+    assert pending.case_id == "1"
+    assert next_attempt_at == retry_at.isoformat(timespec="seconds")
+
+
+def test_backoff_grows_and_gives_up(conn):
+    assert [retry_delay_seconds(n) for n in (1, 2, 3)] == [60, 120, 240]
+    assert retry_delay_seconds(100) == reminders.RETRY_MAX_SECONDS
+
+    add_case(conn, "1", "+919640733498", TOMORROW)
+    (r,) = plan_due_reminders(conn, NOW, [1])
+    for _ in range(MAX_SEND_ATTEMPTS):
+        mark_reminder_failed(conn, r.key, NOW, "boom")
+    assert _planned(conn, NOW + datetime.timedelta(hours=12)) == []
+
+
+def test_stale_sending_row_is_retried(conn):
+    add_case(conn, "1", "+919640733498", TOMORROW)
+    (r,) = plan_due_reminders(conn, NOW, [1])
+    mark_reminder_sending(conn, r.key, NOW)
+
+    assert _planned(conn, NOW + datetime.timedelta(seconds=SENDING_STALE_SECONDS - 60)) == []
+    assert _planned(conn, NOW + datetime.timedelta(seconds=SENDING_STALE_SECONDS)) == [("1", 1)]
+
+
+def test_queued_row_is_only_retried_after_a_restart(conn, monkeypatch):
+    add_case(conn, "1", "+919640733498", TOMORROW)
+    (r,) = plan_due_reminders(conn, NOW, [1])
+    monkeypatch.setattr(reminders, "PROCESS_STARTED_AT", NOW - datetime.timedelta(hours=1))
+    mark_reminder_queued(conn, r.key, NOW)
+
+    # However long the sender queue takes, this process does not plan it again
+    assert _planned(conn, NOW + datetime.timedelta(hours=3)) == []
+
+    # A later process does
+    monkeypatch.setattr(reminders, "PROCESS_STARTED_AT", NOW + datetime.timedelta(hours=4))
+    assert _planned(conn, NOW + datetime.timedelta(hours=4)) == [("1", 1)]
+
+
+def test_coalesces_one_message_per_recipient(conn):
+    add_case(conn, "1", "+919640733498", TOMORROW)
+    add_case(conn, "2", "+91 96407 33498", "2026-11-03")
+    add_case(conn, "3", "+919640733499", TOMORROW)
+    batches = coalesce_by_recipient(plan_due_reminders(conn, NOW, [2, 1]))
+    assert sorted(sorted(r.case_id for r in b.reminders) for b in batches) == [["1", "2"], ["3"]]
@@ -0,0 +1,94 @@
+import pytest
+
+from reply_cache import ReplyCache, ReplyKey
+
+from conftest import add_case
+
+DAY = "2026-11-01"
+
+
+def key(last10, intent="next_hearing", case_id=None, day=DAY):
+    return ReplyKey(last10, intent, case_id, day)
+
+
+@pytest.fixture
+def cache(db_file):
+    c = ReplyCache(db_file, max_entries=3)
+    yield c
+    c.close()
+
+
+class Computer:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text):
+        def compute():
+            self.calls.append(text)
+            return text
+        return compute
+
+
+def test_second_lookup_is_a_hit(conn, cache):
+    add_case(conn, "1", "+919640733498", "2026-11-02")
+    compute = Computer()
+    assert cache.get_or_compute(key("9640733498"), compute("a")) == "a"
+    assert cache.get_or_compute(key("9640733498"), compute("b")) == "a"
+    assert compute.calls == ["a"]
+    assert cache.stats()["hits"] == 1
+
+
+def test_case_change_drops_only_the_affected_entries(conn, cache):
+    add_case(conn, "1", "+919640733498", "2026-11-02")
+    add_case(conn, "2", "+919640733499", "2026-11-02")
+    compute = Computer()
+    cache.get_or_compute(key("9640733498"), compute("mine"))
+    cache.get_or_compute(key("9640733499", "case", "2"), compute("other"))
+
+    add_case(conn, "3", "+919640733498", "2026-11-05")
+    assert cache.get_or_compute(key("9640733498"), compute("mine v2")) == "mine v2"
+    assert cache.get_or_compute(key("9640733499", "case", "2"), compute("x")) == "other"
+
+    with conn:
+        conn.execute("UPDATE cases SET hearing_time = '11:00' WHERE case_id = '2'")
+    assert cache.get_or_compute(key("9640733499", "case", "2"), compute("other v2")) == "other v2"
+
+
+def test_new_day_starts_empty(conn, cache):
+    compute = Computer()
+    cache.get_or_compute(key("9640733498"), compute("today"))
+    assert cache.get_or_compute(key("9640733498", day="2026-11-02"), compute("tomorrow")) == "tomorrow"
+    assert len(cache) == 1
+
+
+def test_least_recently_used_is_evicted(conn, cache):
+    compute = Computer()
+    for n in range(3):
+        cache.get_or_compute(key(f"964073349{n}"), compute(str(n)))
+    cache.get_or_compute(key("9640733490"), compute("again"))        # 0 is now the newest
+    cache.get_or_compute(key("9640733493"), compute("3"))
+    assert len(cache) == 3
+    assert cache.get_or_compute(key("9640733491"), compute("1 v2")) == "1 v2"
+    assert cache.get_or_compute(key("9640733490"), compute("x")) == "0"
+
+
+def test_reply_computed_across_a_change_is_not_cached(conn, cache):
+    add_case(conn, "1", "+919640733498", "2026-11-02")
+    cache.get_or_compute(key("9640733499"), Computer()("warm up"))
+
+    def compute_while_admin_edits():
+        add_case(conn, "2", "+919640733498", "2026-11-03")
+        return "stale"
+
+    assert cache.get_or_compute(key("9640733498"), compute_while_admin_edits) == "stale"
+    assert cache.get_or_compute(key("9640733498"), Computer()("fresh")) == "fresh"
+
+
+def test_log_pruned_past_the_cache_clears_everything(conn, cache):
+    compute = Computer()
+    cache.get_or_compute(key("9640733498"), compute("a"))
+    add_case(conn, "1", "+919640733498", "2026-11-02")      # never read by the cache...
+    with conn:
+        conn.execute("DELETE FROM case_changes")             # ...and pruned
+    add_case(conn, "2", "+919222222222", "2026-11-02")
+    assert cache.get_or_compute(key("9640733498"), compute("a v2")) == "a v2"
@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+from reply_dispatcher import Reply, ReplyDispatcher
+from transport import MockTransport
+
+
+@pytest.fixture
+def dispatcher():
+    d = ReplyDispatcher(lambda text, phone: Reply(f"re: {text}"), lambda text: f"/tmp/{text}.mp3")
+    d.start()
+    yield d
+    d.shutdown()
+
+
+def test_message_without_sender_is_dropped(dispatcher):
+    transport = MockTransport()
+    assert dispatcher.submit("next hearing", None) is False
+    assert dispatcher.flush_texts(transport, timeout=0.5) is None
+    assert transport.sent == []
+    assert dispatcher.in_flight() == 0
+
+
+def test_reply_goes_to_its_sender_after_a_chat_switch(dispatcher):
+    transport = MockTransport()
+    assert dispatcher.submit("next hearing", "+919640733498")
+    transport.open_chat("+919640733499")      # e.g. a reminder moved the browser on
+    dispatcher.flush_texts(transport, timeout=2)
+    assert [(m.phone, m.payload) for m in transport.sent] == [("+919640733498", "re: next hearing")]
+
+
+def test_replies_keep_submission_order(dispatcher):
+    transport = MockTransport()
+    for n in range(10):
+        dispatcher.submit(f"case {n}", "+919640733498")
+    dispatcher.flush_texts(transport, timeout=2)
+    assert [m.payload for m in transport.sent] == [f"re: case {n}" for n in range(10)]
+
+
+def test_flush_returns_once_texts_are_out_and_audio_follows():
+    release = threading.Event()
+
+    def synthesize(text):
+        release.wait(5)
+        return f"/tmp/{text}.mp3"
+
+    d = ReplyDispatcher(lambda text, phone: Reply(f"re: {text}", audio_text=text), synthesize)
+    d.start()
+    try:
+        transport = MockTransport()
+        d.submit("history", "+919640733498")
+        assert d.flush_texts(transport, timeout=2) is not None
+        assert [m.kind for m in transport.sent] == ["text"]
+        assert d.in_flight() == 1                  # the audio reply
+
+        release.set()
+        assert d.run_sends(transport, wait=2) == 1
+        assert [(m.kind, m.payload) for m in transport.sent][1] == ("audio", "/tmp/history.mp3")
+        assert d.in_flight() == 0
+    finally:
+        release.set()
+        d.shutdown()
+
+
+def test_failed_tts_still_sends_the_text():
+    def synthesize(text):
+        raise RuntimeError("gTTS unreachable")
+
+    d = ReplyDispatcher(lambda text, phone: Reply("re", audio_text="re"), synthesize)
+    d.start()
+    try:
+        transport = MockTransport()
+        d.submit("history", "+919640733498")
+        d.flush_texts(transport, timeout=2)
+        deadline = time.monotonic() + 2
+        while d.in_flight() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert [m.kind for m in transport.sent] == ["text"]
+        assert d.in_flight() == 0
+    finally:
+        d.shutdown()
+
+
+def test_no_reply_leaves_nothing_in_flight():
+    d = ReplyDispatcher(lambda text, phone: None, lambda text: text)
+    d.start()
+    try:
+        d.submit("thanks", "+919640733498")
+        assert d.flush_texts(MockTransport(), timeout=2) is None
+        assert d.in_flight() == 0
+    finally:
+        d.shutdown()
+
+
+def test_full_reply_queue_pushes_back_on_intake():
+    release = threading.Event()
+
+    def compute(text, phone):
+        release.wait(5)
+        return Reply(f"re: {text}")
+
+    d = ReplyDispatcher(compute, lambda text: text, reply_queue_size=1)
+    d.start()
+    try:
+        transport = MockTransport()
+        for n in range(3):                         # one computing, one queued, one waiting
+            d.submit(str(n), "+919640733498")
+        time.sleep(0.05)
+        assert not d.accepting()
+        assert d.flush_texts(transport, timeout=0.1) is None      # times out
+
+        release.set()
+        d.flush_texts(transport, timeout=2)
+        assert d.accepting()
+        assert [m.payload for m in transport.sent] == ["re: 0", "re: 1", "re: 2"]
+    finally:
+        release.set()
+        d.shutdown()
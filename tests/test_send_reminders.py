@@ -0,0 +1,61 @@
+import datetime
+
+import pytest
+
+import send_reminders
+from db_pool import get_connection, get_pool
+from db_setup import ensure_schema
+from reminders import coalesce_by_recipient, plan_due_reminders
+from transport import MockTransport
+
+from conftest import add_case
+
+PLANNED_AT = datetime.datetime(2026, 11, 1, 9, 0)
+
+
+@pytest.fixture
+def cases_db(tmp_path, monkeypatch):
+    # send_reminders works on ./cases.db
+    monkeypatch.chdir(tmp_path)
+    ensure_schema("cases.db")
+    yield get_connection("cases.db")
+    get_pool("cases.db").close_all()
+
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+def _ledger(conn):
+    return conn.execute("SELECT case_id, status, updated_at, sent_at FROM reminder_log ORDER BY case_id").fetchall()
+
+
+def test_ledger_records_when_the_send_happened(cases_db):
+    add_case(cases_db, "1", "+919640733498", "2026-11-02")
+    add_case(cases_db, "2", "+919640733498", "2026-11-03")
+    (batch,) = coalesce_by_recipient(plan_due_reminders(cases_db, PLANNED_AT, [2, 1]))
+
+    transport = MockTransport()
+    started = _now()
+    send_reminders.send_reminder_batch(batch, PLANNED_AT, transport)
+    finished = _now()
+
+    assert [m.phone for m in transport.sent] == ["+919640733498"]
+    rows = _ledger(cases_db)
+    assert [(case_id, status) for case_id, status, _, _ in rows] == [("1", "sent"), ("2", "sent")]
+    for _, _, updated_at, sent_at in rows:
+        assert sent_at == updated_at
+        assert started <= sent_at <= finished       # not the planning time
+
+
+def test_failed_send_is_recorded_for_retry(cases_db):
+    add_case(cases_db, "1", "+919640733498", "2026-11-02")
+    (batch,) = coalesce_by_recipient(plan_due_reminders(cases_db, PLANNED_AT, [1]))
+
+    started = _now()
+    send_reminders.send_reminder_batch(batch, PLANNED_AT, MockTransport(fail_phones=["+919640733498"]))
+    finished = _now()
+
+    ((case_id, status, updated_at, sent_at),) = _ledger(cases_db)
+    assert (case_id, status, sent_at) == ("1", "failed", None)
+    assert started <= updated_at <= finished
@@ -0,0 +1,108 @@
+import time
+
+import pytest
+
+from sender_pool import UNHEALTHY_AFTER_FAILURES, SenderPool
+from transport import MockTransport, TransportError
+
+COOLDOWN = 0.05
+
+
+def send_job(phone, text):
+    return lambda transport: transport.send(phone, text)
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(factories, cooldown=COOLDOWN):
+        pool = SenderPool(factories, per_minute=0, cooldown=cooldown)
+        pool.start()
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.shutdown()
+
+
+def phone_owned_by(pool, index):
+    for n in range(100):
+        phone = f"+91964073{n:04d}"
+        if pool._session_for(phone).index == index:
+            return phone
+    raise AssertionError("no phone for that shard")
+
+
+def test_one_recipient_keeps_one_session_and_order(make_pool):
+    transports = [MockTransport(), MockTransport()]
+    pool = make_pool([lambda t=t: t for t in transports])
+
+    futures = [pool.submit(phone, send_job(phone, f"#{i}"))
+               for i in range(5) for phone in ("+919640733498", "91 96407 33498")]
+    for f in futures:
+        f.result(timeout=5)
+
+    (busy,) = [t for t in transports if t.sent]
+    assert [m.payload for m in busy.sent] == [f"#{i}" for i in range(5) for _ in range(2)]
+
+
+def test_failing_session_is_skipped_then_probed_back(make_pool):
+    pool = make_pool([MockTransport, MockTransport])
+    phone = phone_owned_by(pool, 0)
+    session = pool.sessions[0]
+
+    def broken(transport):
+        raise TransportError("chat did not open")
+
+    for _ in range(UNHEALTHY_AFTER_FAILURES):
+        with pytest.raises(TransportError):
+            pool.submit(phone, broken).result(timeout=5)
+    assert not session.healthy
+    assert pool._session_for(phone).index == 1         # recipients move while it cools down
+
+    time.sleep(COOLDOWN)
+    probe = pool.submit(phone, send_job(phone, "probe"))
+    assert pool._session_for(phone).index == 1         # one probe at a time
+    probe.result(timeout=5)
+    assert session.healthy
+    assert pool._session_for(phone).index == 0
+
+
+def test_failed_probe_waits_another_cooldown(make_pool):
+    pool = make_pool([MockTransport, MockTransport], cooldown=60)
+    phone = phone_owned_by(pool, 0)
+    session = pool.sessions[0]
+
+    def broken(transport):
+        raise TransportError("logged out")
+
+    for _ in range(UNHEALTHY_AFTER_FAILURES):
+        with pytest.raises(TransportError):
+            pool.submit(phone, broken).result(timeout=5)
+
+    session.probe_at = time.monotonic()                 # cooldown over
+    with pytest.raises(TransportError):
+        pool.submit(phone, broken).result(timeout=5)
+    assert not session.healthy
+    assert not session.claim_probe()
+    assert session.probe_at > time.monotonic() + 30
+
+
+def test_session_that_failed_to_start_is_restarted_by_its_probe(make_pool):
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("chrome crashed")
+        return MockTransport()
+
+    pool = make_pool([factory])
+    session = pool.sessions[0]
+    assert not session.healthy and session.transport is None
+
+    time.sleep(COOLDOWN)
+    pool.submit("+919640733498", send_job("+919640733498", "hi")).result(timeout=5)
+    assert session.healthy and len(attempts) == 2
@@ -0,0 +1,91 @@
+import pytest
+
+from db_pool import DataVersionWatcher
+from settings_store import Setting, SettingsStore, parse_bool, parse_int_list, parse_str_list
+
+
+@pytest.fixture
+def settings_conn(conn):
+    with conn:
+        conn.execute("CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT)")
+    return conn
+
+
+def put(conn, key, value):
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
+
+
+@pytest.fixture
+def store(db_file):
+    s = SettingsStore(db_file, [
+        Setting("audio_enabled", True, parse_bool),
+        Setting("reminder_days", [2, 1, 0], parse_int_list),
+    ], check_interval=0)
+    yield s
+    s.close()
+
+
+def test_parsers():
+    assert parse_bool(" On ") is True and parse_bool("0") is False
+    assert parse_int_list("[2, 1]") == [2, 1]
+    assert parse_str_list("case, hearing ,") == ["case", "hearing"]
+    with pytest.raises(ValueError):
+        parse_bool("maybe")
+
+
+def test_watcher_sees_only_other_connections(db_file, conn):
+    watcher = DataVersionWatcher(db_file)
+    try:
+        assert not watcher.started
+        assert watcher.changed()              # first call
+        assert watcher.started and not watcher.changed()
+
+        with conn:
+            conn.execute("CREATE TABLE t (x)")
+        assert watcher.changed()
+        assert not watcher.changed()
+
+        with watcher.connection() as own:
+            own.execute("INSERT INTO t VALUES (1)")
+        assert not watcher.changed()
+    finally:
+        watcher.close()
+    assert not watcher.started
+
+
+def test_defaults_without_a_settings_table(store):
+    assert store.get("audio_enabled") is True
+    assert store.get("reminder_days") == [2, 1, 0]
+
+
+def test_follows_admin_changes(settings_conn, store):
+    seen = []
+    store.on_change("audio_enabled", seen.append)
+    assert store.get("audio_enabled") is True
+
+    put(settings_conn, "audio_enabled", "false")
+    assert store.get("audio_enabled") is False
+    assert seen == [False]
+
+    version = store.version
+    put(settings_conn, "unrelated", "x")
+    assert store.get("audio_enabled") is False
+    assert store.version == version and seen == [False]
+
+
+def test_invalid_value_falls_back_to_default(settings_conn, store):
+    put(settings_conn, "reminder_days", "[2, tomorrow]")
+    assert store.get("reminder_days") == [2, 1, 0]
+
+
+def test_checks_at_most_once_per_interval(db_file, settings_conn):
+    s = SettingsStore(db_file, [Setting("audio_enabled", True, parse_bool)], check_interval=3600)
+    try:
+        assert s.get("audio_enabled") is True
+        put(settings_conn, "audio_enabled", "off")
+        assert s.get("audio_enabled") is True      # within the interval
+        s.refresh(force=True)
+        assert s.get("audio_enabled") is False
+    finally:
+        s.close()
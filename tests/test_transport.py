@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+
+from transport import MockTransport, TransportError
+
+
+def test_records_text_and_audio_per_chat():
+    t = MockTransport()
+    t.send("+919640733498", "hello", audio_path="/tmp/hello.mp3")
+    t.send("+919640733499", "hi")
+    assert [(m.phone, m.kind, m.payload) for m in t.sent] == [
+        ("+919640733498", "text", "hello"),
+        ("+919640733498", "audio", "/tmp/hello.mp3"),
+        ("+919640733499", "text", "hi"),
+    ]
+    assert [m.payload for m in t.sent_to("+919640733499")] == ["hi"]
+    assert t.chats_opened == 2
+
+
+def test_fail_phones_always_fail():
+    t = MockTransport(fail_phones=["+919640733498"])
+    with pytest.raises(TransportError):
+        t.send("+919640733498", "hello")
+    t.send("+919640733499", "hi")
+    assert t.failures == 1
+    assert [m.phone for m in t.sent] == ["+919640733499"]
+
+
+def test_seeded_failures_are_reproducible():
+    def outcomes(seed):
+        t = MockTransport(failure_rate=0.3, seed=seed)
+        result = []
+        for n in range(50):
+            try:
+                t.send(f"+91964073{n:04d}", "x")
+                result.append(True)
+            except TransportError:
+                result.append(False)
+        return result
+
+    assert outcomes(7) == outcomes(7)
+    assert 0 < outcomes(7).count(False) < 50
+
+
+def test_latency_per_operation_kind():
+    calls = []
+    t = MockTransport(latency=lambda kind: calls.append(kind) or 0)
+    t.send("+919640733498", "hello", audio_path="/tmp/a.mp3")
+    assert calls == ["open_chat", "text", "audio"]
+
+
+def test_current_chat_is_per_thread():
+    t = MockTransport()
+    opened = threading.Barrier(2)
+
+    def sender(phone):
+        t.open_chat(phone)
+        opened.wait(5)            # both chats open before either sends
+        t.send_text(f"for {phone}")
+
+    threads = [threading.Thread(target=sender, args=(p,)) for p in ("+919640733498", "+919640733499")]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    assert sorted((m.phone, m.payload) for m in t.sent) == [
+        ("+919640733498", "for +919640733498"),
+        ("+919640733499", "for +919640733499"),
+    ]
+    t.reset()
+    assert (t.sent, t.chats_opened, t.failures) == ([], 0, 0)
@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+from tts_cache import StubTTSEngine, TTSCache
+
+
+class FailingEngine(StubTTSEngine):
+    def synthesize(self, text, lang, slow, out_path):
+        super().synthesize(text, lang, slow, out_path)
+        raise RuntimeError("gTTS: 429 Too Many Requests")
+
+
+def make_cache(tmp_path, **kwargs):
+    kwargs.setdefault("engine", StubTTSEngine())
+    return TTSCache(str(tmp_path / "audio"), **kwargs)
+
+
+def test_same_text_is_synthesized_once(tmp_path):
+    cache = make_cache(tmp_path)
+    first = cache.get("మీ కేసు రేపు ఉంది")
+    assert cache.get("మీ కేసు రేపు ఉంది") == first
+    assert cache.get("మీ కేసు రేపు ఉంది", slow=True) != first
+    assert cache.engine.calls == 2
+    assert cache.stats()["hits"] == 1
+
+
+def test_cache_survives_a_restart(tmp_path):
+    path = make_cache(tmp_path).get("hello")
+    restarted = make_cache(tmp_path)
+    assert restarted.get("hello") == path
+    assert restarted.engine.calls == 0
+
+
+def test_evicts_least_recently_used_beyond_the_size_bound(tmp_path):
+    cache = make_cache(tmp_path, min_age_seconds=0)
+    size = os.path.getsize(cache.get("a" * 100))
+    cache.max_bytes = 2 * size
+    a = cache.get("a" * 100)
+    b = cache.get("b" * 100)
+    cache.get("a" * 100)                   # a is now the most recent
+    c = cache.get("c" * 100)
+    assert os.path.exists(a) and os.path.exists(c) and not os.path.exists(b)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_recently_used_files_are_never_evicted(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=1, min_age_seconds=60)
+    paths = [cache.get(t) for t in ("one", "two", "three")]
+    assert all(os.path.exists(p) for p in paths)
+
+
+def test_failed_synthesis_leaves_no_file(tmp_path):
+    cache = make_cache(tmp_path, engine=FailingEngine())
+    with pytest.raises(RuntimeError):
+        cache.get("hello")
+    assert os.listdir(cache.cache_dir) == []
+    assert cache.stats()["files"] == 0
+
+
+def test_leftover_temp_files_are_removed_on_load(tmp_path):
+    audio = tmp_path / "audio"
+    audio.mkdir()
+    (audio / ".tmp-abc.mp3").write_bytes(b"partial")
+    cache = make_cache(tmp_path)
+    assert cache.stats()["files"] == 0
+    assert os.listdir(cache.cache_dir) == []
@@ -0,0 +1,218 @@
+# transport.py
+# Pluggable message transport.
+#
+#   SeleniumTransport  -> WhatsApp Web via the bot's Chrome session (text + MP3 attachment)
+#   PyWhatKitTransport -> pywhatkit.sendwhatmsg_instantly (text only, used by send_reminders.py)
+#   MockTransport      -> in-process, records sends; simulates latency and failures
+#
+# The reply path and the reminder fan-out only talk to a Transport, so they can
+# be driven at thousands of messages per second in CI with MockTransport.
+
+import random
+import threading
+import time
+from typing import Callable, Iterable, List, NamedTuple, Optional, Union
+
+
+class TransportError(Exception):
+    """
+    Raised by a transport when a send fails.
+    """
+
+
+class Transport:
+    """
+    Base interface. A transport has a notion of the "current chat":
+    open_chat(phone) selects it, send_text / send_audio deliver into it.
+    Replies to incoming messages are sent without open_chat (the sender's
+    chat is already open).
+    """
+
+    name = "base"
+    supports_audio = True
+
+    def open_chat(self, phone: str):
+        raise NotImplementedError
+
+    def send_text(self, text: str):
+        raise NotImplementedError
+
+    def send_audio(self, audio_path: str):
+        raise NotImplementedError
+
+    def send(self, phone: str, text: str, audio_path: Optional[str] = None):
+        """
+        Open the recipient's chat, then send text and (if given) the audio file.
+        """
+        self.open_chat(phone)
+        self.send_text(text)
+        if audio_path and self.supports_audio:
+            self.send_audio(audio_path)
+
+    def close(self):
+        pass
+
+
+# ==========================================================
+#                 SELENIUM (WhatsApp Web)
+# ==========================================================
+class SeleniumTransport(Transport):
+    name = "selenium"
+
+    def __init__(self, driver, nav_mode: str = "auto", observer=None):
+        # Imported here so MockTransport users don't need selenium installed
+        import whatsapp_web
+
+        self.driver = driver
+        self.nav_mode = nav_mode      # see whatsapp_web.open_chat
+        self.observer = observer      # message_observer.IncomingMessageObserver on this driver, if any
+        self._web = whatsapp_web
+        self.nav_counts = {}
+
+    def open_chat(self, phone: str):
+        used = self._web.open_chat(self.driver, phone, mode=self.nav_mode)
+        self.nav_counts[used] = self.nav_counts.get(used, 0) + 1
+        if self.observer is not None and used != "current":
+            # In-app navigation keeps the observer running: the chat's history
+            # just rendered and must not be taken for new incoming messages
+            self.observer.claim_rendered(0)
+
+    def send_text(self, text: str):
+        self._web.safe_send_text(self.driver, text)
+
+    def send_audio(self, audio_path: str):
+        self._web.send_audio_attachment(self.driver, audio_path)
+
+    def close(self):
+        self.driver.quit()
+
+
+# ==========================================================
+#                 PYWHATKIT
+# ==========================================================
+class PyWhatKitTransport(Transport):
+    """
+    Each send opens a fresh WhatsApp Web tab via pywhatkit. Text only.
+
+    pause_seconds is a minimum gap between sends, enforced before the next
+    send (so a single send, or the last one of a run, doesn't wait for nothing).
+    """
+
+    name = "pywhatkit"
+    supports_audio = False
+
+    def __init__(self, wait_time: int = 20, close_time: int = 3, pause_seconds: float = 5):
+        self.wait_time = wait_time
+        self.close_time = close_time
+        self.pause_seconds = pause_seconds
+        self._phone: Optional[str] = None
+        self._next_send_at = 0.0
+
+    def open_chat(self, phone: str):
+        self._phone = phone
+
+    def send_text(self, text: str):
+        if not self._phone:
+            raise TransportError("pywhatkit needs open_chat(phone) before send_text")
+
+        import pywhatkit
+
+        # avoid spamming too fast
+        gap = self._next_send_at - time.monotonic()
+        if gap > 0:
+            time.sleep(gap)
+
+        # instantly sends via web.whatsapp.com (must be logged in)
+        pywhatkit.sendwhatmsg_instantly(
+            phone_no=self._phone,
+            message=text,
+            wait_time=self.wait_time,   # seconds to wait while opening WhatsApp Web
+            tab_close=True,
+            close_time=self.close_time
+        )
+        self._next_send_at = time.monotonic() + self.pause_seconds
+
+    def send_audio(self, audio_path: str):
+        raise TransportError("pywhatkit transport cannot send audio attachments")
+
+
+# ==========================================================
+#                 MOCK (offline, load testing)
+# ==========================================================
+class SentMessage(NamedTuple):
+    phone: Optional[str]
+    kind: str            # "text" | "audio"
+    payload: str         # text, or audio file path
+    at: float            # time.time() when the send completed
+
+
+class MockTransport(Transport):
+    """
+    Records every send in `sent`. Thread-safe.
+
+    latency:      seconds per operation, or a callable(kind) -> seconds
+    failure_rate: probability (0..1) that any single operation raises TransportError
+    fail_phones:  phones whose sends always fail
+    seed:         makes the simulated failures reproducible
+    """
+
+    name = "mock"
+
+    def __init__(
+        self,
+        latency: Union[float, Callable[[str], float]] = 0.0,
+        failure_rate: float = 0.0,
+        fail_phones: Iterable[str] = (),
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.fail_phones = set(fail_phones)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.sent: List[SentMessage] = []
+        self.chats_opened = 0
+        self.failures = 0
+
+    def _simulate(self, kind: str):
+        delay = self.latency(kind) if callable(self.latency) else self.latency
+        if delay:
+            time.sleep(delay)
+
+        phone = getattr(self._local, "phone", None)
+        with self._lock:
+            failed = phone in self.fail_phones or (
+                self.failure_rate > 0 and self._rng.random() < self.failure_rate
+            )
+            if failed:
+                self.failures += 1
+        if failed:
+            raise TransportError(f"simulated {kind} failure for {phone}")
+        return phone
+
+    def open_chat(self, phone: str):
+        self._local.phone = phone
+        self._simulate("open_chat")
+        with self._lock:
+            self.chats_opened += 1
+
+    def send_text(self, text: str):
+        phone = self._simulate("text")
+        with self._lock:
+            self.sent.append(SentMessage(phone, "text", text, time.time()))
+
+    def send_audio(self, audio_path: str):
+        phone = self._simulate("audio")
+        with self._lock:
+            self.sent.append(SentMessage(phone, "audio", audio_path, time.time()))
+
+    def sent_to(self, phone: str) -> List[SentMessage]:
+        with self._lock:
+            return [m for m in self.sent if m.phone == phone]
+
+    def reset(self):
+        with self._lock:
+            self.sent = []
+            self.chats_opened = 0
+            self.failures = 0
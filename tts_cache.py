@@ -0,0 +1,299 @@
+# tts_cache.py
+# Content-addressed on-disk cache for TTS audio (Telugu replies + reminders).
+#
+# Identical texts ("You have no upcoming hearings.", the same reminder for the
+# same case/date, ...) are synthesized once and reused. Files are keyed by
+# sha256(lang, slow, text), written atomically (temp file + os.replace) and
+# evicted least-recently-used once the cache exceeds its size bound.
+#
+# Cached files are shared: callers must NOT delete the path they get back.
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+
+from metrics import incr, timed
+
+
+# ==========================================================
+#                 TTS ENGINES
+# ==========================================================
+class TTSEngine:
+    """
+    Writes speech for `text` to `out_path` (MP3).
+    """
+
+    name = "base"
+
+    def synthesize(self, text: str, lang: str, slow: bool, out_path: str):
+        raise NotImplementedError
+
+
+class GTTSEngine(TTSEngine):
+    name = "gtts"
+
+    def synthesize(self, text: str, lang: str, slow: bool, out_path: str):
+        from gtts import gTTS
+
+        gTTS(text=text, lang=lang, slow=slow).save(out_path)
+
+
+class StubTTSEngine(TTSEngine):
+    """
+    Offline engine for tests / load runs: writes a small deterministic file,
+    optionally sleeping to mimic gTTS latency.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def synthesize(self, text: str, lang: str, slow: bool, out_path: str):
+        if self.latency:
+            time.sleep(self.latency)
+        self.calls += 1
+        with open(out_path, "wb") as f:
+            f.write(f"STUB-MP3 {lang} {int(slow)}\n{text}".encode("utf-8"))
+
+
+# ==========================================================
+#                 CACHE
+# ==========================================================
+def audio_cache_key(text: str, lang: str, slow: bool) -> str:
+    h = hashlib.sha256()
+    h.update(f"{lang}\0{int(bool(slow))}\0".encode("utf-8"))
+    h.update(text.encode("utf-8"))
+    return h.hexdigest()
+
+
+class TTSCache:
+    """
+    cache = TTSCache("audio_cache", engine=GTTSEngine())
+    path = cache.get(telugu_text, lang="te")
+
+    max_bytes:       total size bound; LRU files are removed beyond it
+    min_age_seconds: files used more recently than this are never evicted,
+                     so a path handed out is not deleted while it is attached
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = "audio_cache",
+        engine: Optional[TTSEngine] = None,
+        max_bytes: int = 200 * 1024 * 1024,
+        min_age_seconds: float = 120.0,
+    ):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.engine = engine or GTTSEngine()
+        self.max_bytes = max_bytes
+        self.min_age_seconds = min_age_seconds
+
+        self._lock = threading.Lock()
+        # key -> (size, last_used); ordered oldest -> newest use
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        """
+        Create the directory and index existing files on first use (not at
+        import time of the bot module).
+        """
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._load_existing()
+            self._loaded = True
+
+    def _load_existing(self):
+        found = []
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(".tmp-"):
+                # leftover temp file from a crash mid-write (also ends in .mp3)
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+                continue
+            if not name.endswith(".mp3"):
+                continue
+            st = os.stat(os.path.join(self.cache_dir, name))
+            found.append((st.st_mtime, name[:-4], st.st_size))
+        for mtime, key, size in sorted(found):
+            self._entries[key] = (size, mtime)
+            self._total_bytes += size
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".mp3")
+
+    def get(self, text: str, lang: str = "te", slow: bool = False) -> str:
+        """
+        Absolute path of the MP3 for (text, lang, slow), synthesizing on a miss.
+        """
+        self._ensure_loaded()
+        key = audio_cache_key(text, lang, slow)
+        path = self.path_for(key)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and os.path.exists(path):
+                self._entries[key] = (entry[0], now)
+                self._entries.move_to_end(key)
+                self.hits += 1
+                hit = True
+            else:
+                self.misses += 1
+                hit = False
+        incr("tts_cache.hit" if hit else "tts_cache.miss")
+
+        if hit:
+            try:
+                os.utime(path, (now, now))   # keeps LRU order across restarts
+            except OSError:
+                pass
+            return path
+
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".mp3", dir=self.cache_dir)
+        os.close(fd)
+        try:
+            with timed(f"tts.{self.engine.name}"):
+                self.engine.synthesize(text, lang, slow, tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        size = os.path.getsize(path)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old[0]
+            self._entries[key] = (size, time.time())
+            self._total_bytes += size
+            self._evict_locked()
+        return path
+
+    def _evict_locked(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        cutoff = time.time() - self.min_age_seconds
+        for key in list(self._entries):
+            if self._total_bytes <= self.max_bytes:
+                break
+            size, last_used = self._entries[key]
+            if last_used > cutoff:
+                break   # everything after this is newer
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+            del self._entries[key]
+            self._total_bytes -= size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, float]:
+        self._ensure_loaded()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "files": len(self._entries),
+                "bytes": self._total_bytes,
+            }
+
+
+# ==========================================================
+#                 BACKGROUND PRE-WARMING
+# ==========================================================
+class AudioPrewarmer:
+    """
+    Synthesizes audio into a TTSCache on a thread pool, ahead of when it is
+    needed (gTTS is network bound, so threads are enough). The caller that
+    owns the browser only ever picks up finished files:
+
+        prewarmer.submit(text)            # any time, deduplicated
+        path = prewarmer.ready_path(text) # None while still synthesizing
+    """
+
+    def __init__(self, cache: TTSCache, workers: int = 4, lang: str = "te", slow: bool = False):
+        self.cache = cache
+        self.workers = workers
+        self.lang = lang
+        self.slow = slow
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Future] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tts")
+        return self._executor
+
+    def submit(self, text: str) -> Future:
+        with self._lock:
+            fut = self._futures.get(text)
+            if fut is None:
+                fut = self._pool().submit(self.cache.get, text, self.lang, self.slow)
+                self._futures[text] = fut
+            return fut
+
+    def submit_many(self, texts) -> int:
+        return len([self.submit(t) for t in texts])
+
+    def ready_path(self, text: str) -> Optional[str]:
+        """
+        Path if synthesis finished, None if still running (submits if needed).
+        Re-raises a synthesis error once and forgets it, so the next call retries.
+        A finished file the cache has since evicted is synthesized again.
+        """
+        fut = self.submit(text)
+        if not fut.done():
+            return None
+        if fut.exception() is not None:
+            with self._lock:
+                self._futures.pop(text, None)
+        path = fut.result()
+        if os.path.exists(path):
+            return path
+        with self._lock:
+            if self._futures.get(text) is fut:
+                del self._futures[text]
+        self.submit(text)
+        return None
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(1 for f in self._futures.values() if not f.done())
+
+    def forget_done(self):
+        """
+        Drop finished entries (e.g. at day rollover); the files stay cached.
+        """
+        with self._lock:
+            self._futures = {t: f for t, f in self._futures.items() if not f.done()}
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -0,0 +1,392 @@
+# whatsapp_web.py
+# Selenium helpers for WhatsApp Web (driver, chat navigation, text + MP3 attachment).
+#
+# Shared by the interactive bot and the Selenium transport (transport.py).
+
+import os
+import re
+from typing import Optional
+
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import SessionNotCreatedException
+
+from metrics import incr, timed
+
+
+# Chrome path (adjust if needed)
+CHROME_BINARY = r"C:\Program Files\Google\Chrome\Application\chrome.exe"
+
+# chromedriver: $CHROMEDRIVER_PATH wins; otherwise the path found by the last
+# webdriver_manager download is remembered in this file (no network check per start)
+CHROMEDRIVER_PATH_ENV = "CHROMEDRIVER_PATH"
+DRIVER_PATH_CACHE = ".chromedriver_path"
+
+
+def phone_to_whatsapp_send_number(db_phone: str) -> str:
+    """
+    WhatsApp send URL expects countrycode+number digits without '+'
+    Example: +919640733498 -> 919640733498
+    """
+    digits = re.sub(r"\D", "", db_phone)
+    return digits
+
+
+# ==========================================================
+#                 SELENIUM HELPERS
+# ==========================================================
+def build_driver(profile_dir: Optional[str] = None) -> webdriver.Chrome:
+    """
+    profile_dir: separate Chrome user-data dir (keeps that session's WhatsApp login);
+    used by the multi-session sender pool.
+    """
+    options = Options()
+    options.add_argument("--disable-infobars")
+    options.add_argument("--start-maximized")
+    if profile_dir:
+        options.add_argument(f"--user-data-dir={os.path.abspath(profile_dir)}")
+    options.binary_location = CHROME_BINARY
+
+    path = resolve_chromedriver_path()
+    try:
+        return webdriver.Chrome(service=Service(path), options=options)
+    except SessionNotCreatedException:
+        # Chrome updated itself past the cached driver: fetch a matching one, once
+        fresh = resolve_chromedriver_path(refresh=True)
+        if fresh == path:
+            raise
+        return webdriver.Chrome(service=Service(fresh), options=options)
+
+
+def _read_driver_path_cache() -> Optional[str]:
+    try:
+        with open(DRIVER_PATH_CACHE, encoding="utf-8") as f:
+            path = f.read().strip()
+    except OSError:
+        return None
+    return path if path and os.path.isfile(path) else None
+
+
+def resolve_chromedriver_path(refresh: bool = False) -> Optional[str]:
+    """
+    chromedriver executable to use:
+      1. $CHROMEDRIVER_PATH
+      2. the path cached from the last webdriver_manager install (offline, instant)
+      3. ChromeDriverManager().install() (version check / download; result cached)
+    Returns None if nothing is available (offline, first run): Selenium's own
+    driver manager then looks for one. refresh=True skips the cache.
+    """
+    env_path = os.environ.get(CHROMEDRIVER_PATH_ENV)
+    if env_path and os.path.isfile(env_path):
+        return env_path
+
+    cached = _read_driver_path_cache()
+    if cached and not refresh:
+        return cached
+
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        path = ChromeDriverManager().install()
+    except Exception as e:
+        print(f"[DRIVER] chromedriver check failed ({e}); using {cached or 'Selenium Manager'}")
+        return cached
+
+    try:
+        with open(DRIVER_PATH_CACHE, "w", encoding="utf-8") as f:
+            f.write(path)
+    except OSError:
+        pass
+    return path
+
+
+def wait_for_whatsapp_ready(driver: webdriver.Chrome, timeout: int = 120):
+    """
+    Wait until WhatsApp Web is loaded and the message box is available.
+    """
+    with timed("ui.ready"):
+        WebDriverWait(driver, timeout, poll_frequency=WAIT_POLL_SECONDS).until(
+            EC.presence_of_element_located((By.XPATH, "//div[@contenteditable='true' and @role='textbox']"))
+        )
+
+
+def get_input_box(driver: webdriver.Chrome, timeout: int = 30):
+    return WebDriverWait(driver, timeout, poll_frequency=WAIT_POLL_SECONDS).until(
+        EC.presence_of_element_located((By.XPATH, "//div[@contenteditable='true' and @role='textbox']"))
+    )
+
+
+# ==========================================================
+#        SEND CONFIRMATION (condition-based, no fixed sleeps)
+# ==========================================================
+# What a send waits for before returning:
+#   "bubble" -> our new outgoing message row is in the chat (fast, default)
+#   "tick"   -> ...and it shows the sent/delivered tick (server ack)
+#   "none"   -> return right after pressing Enter / Send
+SEND_CONFIRM = "bubble"
+SEND_CONFIRM_TIMEOUT = 15
+
+# Poll interval for every WebDriverWait here (Selenium's default is 0.5s)
+WAIT_POLL_SECONDS = 0.05
+
+_LAST_OUTGOING_ID_JS = """
+var rows = document.querySelectorAll("#main div[data-id^='true_']");
+return rows.length ? rows[rows.length - 1].getAttribute('data-id') : null;
+"""
+
+_LAST_OUTGOING_TICK_JS = """
+var rows = document.querySelectorAll("#main div[data-id^='true_']");
+if (!rows.length) { return false; }
+return !!rows[rows.length - 1].querySelector(
+    "span[data-icon='msg-check'], span[data-icon='msg-dblcheck'], span[data-icon='msg-dblcheck-ack']");
+"""
+
+
+def last_outgoing_id(driver: webdriver.Chrome) -> Optional[str]:
+    return driver.execute_script(_LAST_OUTGOING_ID_JS)
+
+
+def wait_for_outgoing(driver: webdriver.Chrome, previous_id: Optional[str], step: str,
+                      confirm: str = None, timeout: float = None) -> bool:
+    """
+    Wait until a new outgoing bubble (different last data-id) is rendered, and
+    with confirm="tick" until it shows the sent tick. Times each phase into
+    the `<step>.bubble` / `<step>.tick` histograms. Returns False on timeout
+    (the message may still go out; callers log it rather than re-send).
+    """
+    confirm = confirm or SEND_CONFIRM
+    timeout = SEND_CONFIRM_TIMEOUT if timeout is None else timeout
+    if confirm == "none":
+        return True
+
+    try:
+        with timed(f"{step}.bubble"):
+            WebDriverWait(driver, timeout, poll_frequency=WAIT_POLL_SECONDS).until(
+                lambda d: d.execute_script(_LAST_OUTGOING_ID_JS) not in (None, previous_id)
+            )
+        if confirm == "tick":
+            with timed(f"{step}.tick"):
+                WebDriverWait(driver, timeout, poll_frequency=WAIT_POLL_SECONDS).until(
+                    lambda d: d.execute_script(_LAST_OUTGOING_TICK_JS)
+                )
+        return True
+    except Exception:
+        incr(f"{step}.unconfirmed")
+        print(f"[SEND] {step}: no confirmation within {timeout}s")
+        return False
+
+
+def safe_send_text(driver: webdriver.Chrome, text: str):
+    """
+    Avoid click-intercept issues by focusing via JS and using send_keys.
+    Returns once the message bubble is rendered (see SEND_CONFIRM).
+    """
+    with timed("send_text.total"):
+        with timed("send_text.input_box"):
+            box = get_input_box(driver)
+            driver.execute_script("arguments[0].focus();", box)
+            before = last_outgoing_id(driver)
+        with timed("send_text.type"):
+            box.send_keys(text)
+            box.send_keys(Keys.ENTER)
+        wait_for_outgoing(driver, before, "send_text")
+
+
+def send_audio_attachment(driver: webdriver.Chrome, audio_path: str, timeout: int = 30):
+    """
+    Reliable approach: send AUDIO as file attachment (MP3).
+    Each step waits for the UI state it needs instead of sleeping.
+    """
+    with timed("send_audio.total"):
+        before = last_outgoing_id(driver)
+
+        # Attach button -> menu with the file input
+        with timed("send_audio.attach_menu"):
+            attach = WebDriverWait(driver, timeout, poll_frequency=WAIT_POLL_SECONDS).until(
+                EC.element_to_be_clickable((By.XPATH, "//button[contains(@aria-label,'Attach')]"))
+            )
+            attach.click()
+            file_input = WebDriverWait(driver, timeout, poll_frequency=WAIT_POLL_SECONDS).until(
+                EC.presence_of_element_located((By.XPATH, "//input[@type='file']"))
+            )
+
+        # Upload preview present = its Send button becomes clickable
+        with timed("send_audio.preview"):
+            file_input.send_keys(audio_path)
+            send_btn = WebDriverWait(driver, timeout, poll_frequency=WAIT_POLL_SECONDS).until(
+                EC.element_to_be_clickable((By.XPATH, "//button[contains(@aria-label,'Send')]"))
+            )
+
+        # Send button for attachment preview (works reliably for files)
+        with timed("send_audio.send_click"):
+            driver.execute_script("arguments[0].click();", send_btn)
+            WebDriverWait(driver, timeout, poll_frequency=WAIT_POLL_SECONDS).until(
+                EC.staleness_of(send_btn)
+            )
+
+        wait_for_outgoing(driver, before, "send_audio")
+
+
+def open_chat_by_phone(driver: webdriver.Chrome, db_phone: str):
+    """
+    Opens chat using WhatsApp 'send' URL (best for automation).
+    """
+    num = phone_to_whatsapp_send_number(db_phone)
+    url = f"https://web.whatsapp.com/send?phone={num}&text&app_absent=0"
+    with timed("nav.url"):
+        driver.get(url)
+        wait_for_whatsapp_ready(driver, timeout=60)
+
+
+# ==========================================================
+#          IN-APP CHAT NAVIGATION (no full page reload)
+# ==========================================================
+# driver.get(".../send?phone=...") reloads the whole WhatsApp Web app for every
+# chat switch. The strategies below reuse the loaded SPA and only fall back to
+# the URL method when they cannot confirm the right chat opened.
+#
+#   "search" -> type the number into the chat-list search box, open the top hit
+#   "link"   -> inject a wa.me link into the page and click it (WhatsApp routes it in-app)
+#   "url"    -> open_chat_by_phone (full reload, always works)
+
+# Order tried by open_chat(..., mode="auto")
+NAV_STRATEGIES = ["search", "link", "url"]
+
+# How long an in-app strategy gets to show the right chat before falling back
+NAV_VERIFY_SECONDS = 3
+
+SEARCH_BOX_XPATH = "//div[@contenteditable='true' and (@data-tab='3' or contains(@aria-label,'Search'))]"
+
+# The open chat is the 1:1 chat with `num` (full number, digits only). Only the
+# chat's own message ids count: in a group, ids are
+# false_<group>@g.us_<msg>_<participant>@c.us and the header lists the members'
+# numbers, so "contains <num>@c.us" would accept a group the client posted in.
+# A chat without messages yet is accepted only if its title IS the number.
+_CHAT_MATCHES_JS = """
+var num = arguments[0], main = document.querySelector('#main');
+if (!main) { return false; }
+if (main.querySelector("div[data-id*='@g.us']")) { return false; }
+if (main.querySelector("div[data-id^='false_" + num + "@c.us_'], div[data-id^='true_" + num + "@c.us_']")) {
+    return true;
+}
+if (main.querySelector("div[data-id*='@c.us']")) { return false; }
+var title = main.querySelector('header span[title]');
+var text = title ? title.getAttribute('title') : '';
+if (!/^[+\\d\\s().-]+$/.test(text)) { return false; }
+return text.replace(/\\D/g, '').slice(-10) === num.slice(-10);
+"""
+
+_CLICK_LINK_JS = """
+var a = document.createElement('a');
+a.href = 'https://wa.me/' + arguments[0];
+a.style.display = 'none';
+(document.querySelector('#app') || document.body).appendChild(a);
+a.click();
+setTimeout(function () { a.remove(); }, 0);
+"""
+
+
+def _wait_for_chat(driver: webdriver.Chrome, num: str, timeout: float) -> bool:
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=WAIT_POLL_SECONDS).until(
+            lambda d: d.execute_script(_CHAT_MATCHES_JS, num)
+        )
+        return True
+    except Exception:
+        return False
+
+
+def open_chat_via_search(driver: webdriver.Chrome, db_phone: str, timeout: float = NAV_VERIFY_SECONDS) -> bool:
+    """
+    Open the chat through the chat-list search box. The top hit may be a
+    group or another contact, so it only counts once _CHAT_MATCHES_JS
+    confirms the client's own 1:1 chat. Returns False otherwise (unknown
+    contact, group hit, UI changed, ...) and the caller falls back.
+    """
+    num = phone_to_whatsapp_send_number(db_phone)
+    try:
+        box = WebDriverWait(driver, timeout).until(
+            EC.element_to_be_clickable((By.XPATH, SEARCH_BOX_XPATH))
+        )
+        driver.execute_script("arguments[0].focus();", box)
+        box.send_keys(Keys.CONTROL, "a")
+        box.send_keys(Keys.BACKSPACE)
+        box.send_keys(num[-10:])
+        # Let the result list filter, then open the top hit
+        WebDriverWait(driver, timeout, poll_frequency=WAIT_POLL_SECONDS).until(
+            lambda d: d.execute_script(
+                "return !!document.querySelector(\"#pane-side [role='listitem'], #pane-side [role='row']\");"
+            )
+        )
+        box.send_keys(Keys.ENTER)
+    except Exception:
+        _clear_search(driver)
+        return False
+    opened = _wait_for_chat(driver, num, timeout)
+    # A filtered chat list would hide other unread chats from the chat scanner
+    _clear_search(driver)
+    return opened
+
+
+def _clear_search(driver: webdriver.Chrome):
+    """
+    Empty the chat-list search box (the open chat stays open).
+    """
+    try:
+        for box in driver.find_elements(By.XPATH, SEARCH_BOX_XPATH):
+            if not box.text:
+                continue
+            driver.execute_script("arguments[0].focus();", box)
+            box.send_keys(Keys.CONTROL, "a")
+            box.send_keys(Keys.BACKSPACE)
+    except Exception as e:
+        print(f"[NAV] Could not clear the chat search box: {e}")
+
+
+def open_chat_via_link(driver: webdriver.Chrome, db_phone: str, timeout: float = NAV_VERIFY_SECONDS) -> bool:
+    """
+    Open the chat by clicking an injected wa.me link inside the running app.
+    """
+    num = phone_to_whatsapp_send_number(db_phone)
+    try:
+        driver.execute_script(_CLICK_LINK_JS, num)
+    except Exception:
+        return False
+    return _wait_for_chat(driver, num, timeout)
+
+
+def open_chat(driver: webdriver.Chrome, db_phone: str, mode: str = "auto") -> str:
+    """
+    Open the recipient's chat using `mode` ("search" | "link" | "url" | "auto").
+    In-app strategies fall back to the URL method. Returns the strategy that
+    worked ("current" if the chat was already open).
+    """
+    if mode != "url":
+        try:
+            if driver.execute_script(_CHAT_MATCHES_JS, phone_to_whatsapp_send_number(db_phone)):
+                return "current"
+        except Exception:
+            pass
+
+    strategies = NAV_STRATEGIES if mode == "auto" else [mode]
+    for strategy in strategies:
+        if strategy == "search":
+            with timed("nav.search"):
+                ok = open_chat_via_search(driver, db_phone)
+            if ok:
+                return "search"
+        if strategy == "link":
+            with timed("nav.link"):
+                ok = open_chat_via_link(driver, db_phone)
+            if ok:
+                return "link"
+        if strategy == "url":
+            break
+
+    open_chat_by_phone(driver, db_phone)
+    return "url"